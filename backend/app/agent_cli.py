@@ -6,6 +6,7 @@ Uses OPENAI_API_KEY or ANTHROPIC_API_KEY from env; no server or auth required.
 import argparse
 import os
 import sys
+import threading
 
 # Ensure app is importable when run as python -m app.agent_cli from backend
 if __name__ == "__main__" and os.path.dirname(os.path.abspath(__file__)) not in sys.path:
@@ -18,6 +19,53 @@ from app.services.agent_kernel import run_loop, execute_pending_and_continue
 PENDING_APPROVAL_KEY = "__pending_approval__"
 
 
+class _ReplyPrinter:
+    """Print the agent reply to stdout as it streams; finish() prints it whole if nothing was streamed."""
+
+    def __init__(self) -> None:
+        self.streamed = False
+
+    def __call__(self, text: str) -> None:
+        if not self.streamed:
+            sys.stdout.write("\nAgent: ")
+            self.streamed = True
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def finish(self, reply) -> None:
+        if self.streamed:
+            sys.stdout.write("\n\n")
+            sys.stdout.flush()
+        elif reply:
+            print(f"\nAgent: {reply}\n")
+
+
+def _call_agent(fn, **kwargs):
+    """
+    Run a blocking agent call on a daemon thread and wait for it. The main thread waits in an
+    interruptible join (no polling, zero idle CPU), so Ctrl-C abandons a long LLM call and returns
+    None instead of killing the CLI.
+    """
+    result: dict = {}
+
+    def _target() -> None:
+        try:
+            result["value"] = fn(**kwargs)
+        except BaseException as e:  # re-raised on the main thread
+            result["error"] = e
+
+    worker = threading.Thread(target=_target, daemon=True)
+    worker.start()
+    try:
+        worker.join()
+    except KeyboardInterrupt:
+        print("\n(Interrupted; agent call abandoned.)\n", file=sys.stderr)
+        return None
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Chat with the agent in the terminal (same kernel as web).")
     parser.add_argument(
@@ -43,8 +91,16 @@ def main() -> None:
         default="default",
         help="Agent style: 'opus_like' = reasoning-first, strict JSON (see docs/OPUS_LIKE_AGENT.md).",
     )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Print the agent reply only when it is complete instead of streaming it.",
+    )
     args = parser.parse_args()
 
+    def stream_kwargs(printer: _ReplyPrinter) -> dict:
+        return {} if args.no_stream else {"on_reply_chunk": printer}
+
     context = {"workspace_root": args.workspace.strip() or None}
     if context["workspace_root"]:
         if not os.path.isdir(context["workspace_root"]):
@@ -76,7 +132,12 @@ def main() -> None:
             break
 
         messages.append({"role": "user", "content": line})
-        updated, reply, pending, error_code = run_loop(messages=messages, context=context, max_turns=8)
+        printer = _ReplyPrinter()
+        out = _call_agent(run_loop, messages=messages, context=context, max_turns=8, **stream_kwargs(printer))
+        if out is None:
+            messages.pop()
+            continue
+        updated, reply, pending, error_code = out
         if error_code:
             print(f"\nAgent error ({error_code}): {reply}\n", file=sys.stderr)
             messages = updated
@@ -90,28 +151,36 @@ def main() -> None:
                 choice = input("Approve? [y/N]: ").strip().lower()
             except (EOFError, KeyboardInterrupt):
                 choice = "n"
+            printer = _ReplyPrinter()
             if choice == "y" or choice == "yes":
-                updated, reply, pending = execute_pending_and_continue(
+                out = _call_agent(
+                    execute_pending_and_continue,
                     messages=updated,
                     context=context,
                     approved_tool=pending.get("tool", ""),
                     approved_args=pending.get("args") or {},
                     max_turns_after=5,
+                    **stream_kwargs(printer),
                 )
+                if out is None:
+                    messages = updated
+                    continue
+                updated, reply, pending, _ = out
                 messages = updated
-                if reply:
-                    print(f"\nAgent: {reply}\n")
+                printer.finish(reply)
             else:
                 messages = updated + [{"role": "system", "content": "User declined the tool call."}]
-                updated2, reply, _, _ = run_loop(messages=messages, context=context, max_turns=3)
+                out = _call_agent(run_loop, messages=messages, context=context, max_turns=3, **stream_kwargs(printer))
+                if out is None:
+                    continue
+                updated2, reply, _, _ = out
                 messages = updated2
-                if reply:
-                    print(f"\nAgent: {reply}\n")
+                printer.finish(reply)
             continue
 
         messages = updated
-        if reply:
-            print(f"\nAgent: {reply}\n")
+        if reply or printer.streamed:
+            printer.finish(reply)
         elif pending:
             print("\n(Pending approval; use --autonomous to run without prompting.)\n", file=sys.stderr)
 
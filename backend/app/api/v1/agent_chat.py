@@ -2,35 +2,79 @@
 Agent chat endpoint: run the agent kernel (LLM + tools) and return the reply.
 Supports human-in-the-loop for edit_file and run_terminal.
 """
-from fastapi import APIRouter, Depends, status
+import logging
+import math
+from typing import Any, AsyncIterator, Callable, Optional
 
+import anyio
+from fastapi import APIRouter, Depends, Request, status
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core import json_codec
+from app.core.config import settings
 from app.models.user import User
 from app.core.security import get_current_active_user
+from app.db.database import get_db
 from app.schemas.agent_chat import (
     AgentChatRequest,
     AgentChatResponse,
     ExecutePendingRequest,
     PendingApproval,
 )
-from app.services.agent_kernel import run_loop, execute_pending_and_continue
+from app.services.agent_kernel import FALLBACK_REPLIES, run_loop, execute_pending_and_continue
+from app.services.response_cache import get_response_cache, response_cache_key
+
+logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# Chat responses carry the whole transcript (including tool results); orjson encodes it much faster
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 def _error_response(error_code: str, detail: str, status_code: int):
-    from fastapi.responses import JSONResponse
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={"detail": detail, "type": error_code},
     )
 
 
+async def _run_agent(request: Request, db: Session, fn: Callable[..., Any], **kwargs) -> Any:
+    """
+    Run a blocking agent call on a worker thread, bounded by the app's agent run limiter.
+    The request's session (used only for auth) is closed first, so a run that takes minutes does not
+    hold a pooled DB connection the whole time.
+    """
+    limiter = getattr(request.app.state, "agent_run_limiter", None)
+
+    def release_db_and_run():
+        db.close()
+        return fn(**kwargs)
+
+    return await anyio.to_thread.run_sync(release_db_and_run, limiter=limiter)
+
+
 @router.get("/config")
-def agent_config(current_user: User = Depends(get_current_active_user)):
+def agent_config(response: Response, current_user: User = Depends(get_current_active_user)):
     """Minimal config for the agent UI (no external integrations)."""
+    # Static per deployment: let the browser reuse it instead of asking on every page load
+    response.headers["Cache-Control"] = "private, max-age=300"
     return {}
 
 
+def _chat_cache_key(user_id: int, messages: list, context: dict) -> Optional[str]:
+    """Reply cache key (per user), or None when the reply may depend on the workspace (file tools)."""
+    if (context.get("workspace_root") or "").strip():
+        return None
+    llm_config = (settings.USE_LOCAL_LLM, settings.LOCAL_MODEL_NAME, settings.OPENAI_MODEL, settings.ANTHROPIC_MODEL)
+    payload = {"user": user_id, "messages": messages, "context": context, "llm": llm_config}
+    return response_cache_key("chat", payload)
+
+
+def _without_system_prompt(messages: list) -> list:
+    """messages minus the leading system prompt run_loop inserts (or refreshes) at index 0."""
+    return messages[1:] if messages and messages[0].get("role") == "system" else messages
+
+
 def _pending_to_schema(p: dict):
     if not p or not p.get("tool"):
         return None
@@ -38,9 +82,11 @@ def _pending_to_schema(p: dict):
 
 
 @router.post("/chat", response_model=AgentChatResponse)
-def agent_chat(
+async def agent_chat(
     body: AgentChatRequest,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
 ):
     """
     Send messages to the agent. The agent can use tools; edit_file and run_terminal
@@ -48,33 +94,121 @@ def agent_chat(
     """
     messages = [{"role": m.role, "content": m.content} for m in body.messages]
     context = body.context or {}
-    updated_messages, reply, pending, error_code = run_loop(
+    cache = get_response_cache()
+    cache_key = _chat_cache_key(current_user.id, messages, context) if cache.enabled else None
+    if cache_key:
+        cached = await anyio.to_thread.run_sync(cache.get, cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+    updated_messages, reply, pending, error_code = await _run_agent(
+        request,
+        db,
+        run_loop,
         messages=messages,
         context=context,
         max_turns=5,
     )
     if error_code == "no_llm_configured":
-        raise _error_response(error_code, reply or "No LLM configured.", status.HTTP_503_SERVICE_UNAVAILABLE)
+        return _error_response(error_code, reply or "No LLM configured.", status.HTTP_503_SERVICE_UNAVAILABLE)
     if error_code == "workspace_not_allowed":
-        raise _error_response(error_code, reply or "Workspace not allowed.", status.HTTP_400_BAD_REQUEST)
+        return _error_response(error_code, reply or "Workspace not allowed.", status.HTTP_400_BAD_REQUEST)
     if error_code == "agent_timeout":
-        raise _error_response(error_code, reply or "Agent timed out.", status.HTTP_408_REQUEST_TIMEOUT)
-    return AgentChatResponse(
+        return _error_response(error_code, reply or "Agent timed out.", status.HTTP_408_REQUEST_TIMEOUT)
+    response = AgentChatResponse(
         reply=reply,
         messages=updated_messages,
         pending_approval=_pending_to_schema(pending) if pending else None,
     )
+    # Only plain answers: no approval pending, no tool turns, not a fallback for unusable LLM output
+    plain = len(_without_system_prompt(updated_messages)) == len(_without_system_prompt(messages))
+    if cache_key and plain and not pending and reply and reply not in FALLBACK_REPLIES:
+        body_bytes = json_codec.dumps_bytes(response.model_dump())
+        await anyio.to_thread.run_sync(cache.set, cache_key, body_bytes)
+        return Response(content=body_bytes, media_type="application/json")
+    return response
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json_codec.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def agent_chat_stream(
+    body: AgentChatRequest,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Same as /chat, streamed as Server-Sent Events: "delta" events ({"text": ...}) carry the reply as the
+    LLM generates it, then one "done" event carries the AgentChatResponse, or an "error" event
+    carries {"detail", "type"} (same error codes as /chat).
+    """
+    messages = [{"role": m.role, "content": m.content} for m in body.messages]
+    context = body.context or {}
+    send, receive = anyio.create_memory_object_stream(math.inf)
+
+    def emit(event: str) -> None:
+        # Called on the worker thread; once the client has gone away events are just dropped
+        try:
+            anyio.from_thread.run_sync(send.send_nowait, event)
+        except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+            pass
+
+    def run() -> None:
+        try:
+            updated_messages, reply, pending, error_code = run_loop(
+                messages=messages,
+                context=context,
+                max_turns=5,
+                on_reply_chunk=lambda text: emit(_sse("delta", {"text": text})),
+            )
+            if error_code:
+                emit(_sse("error", {"detail": reply or error_code, "type": error_code}))
+            else:
+                response = AgentChatResponse(
+                    reply=reply,
+                    messages=updated_messages,
+                    pending_approval=_pending_to_schema(pending) if pending else None,
+                )
+                emit(_sse("done", response.model_dump()))
+        except Exception:
+            logger.exception("Streaming agent chat failed")
+            emit(_sse("error", {"detail": "Agent failed.", "type": "internal_error"}))
+
+    async def produce() -> None:
+        # Same worker-thread budget and session release as /chat; closing send ends the stream
+        async with send:
+            await _run_agent(request, db, run)
+
+    async def event_stream() -> AsyncIterator[str]:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(produce)
+            async with receive:
+                async for event in receive:
+                    yield event
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/execute-pending", response_model=AgentChatResponse)
-def execute_pending(
+async def execute_pending(
     body: ExecutePendingRequest,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
 ):
     """Execute an approved edit_file or run_terminal and continue the agent."""
     messages = [{"role": m.role, "content": m.content} for m in body.messages]
     context = body.context or {}
-    updated_messages, reply, pending, error_code = execute_pending_and_continue(
+    updated_messages, reply, pending, error_code = await _run_agent(
+        request,
+        db,
+        execute_pending_and_continue,
         messages=messages,
         context=context,
         approved_tool=body.tool,
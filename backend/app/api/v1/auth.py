@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import jwt, JWTError
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime
 
+from app.core.config import settings
 from app.db.database import get_db
 from app.models.user import User
 from app.core.security import (
-    verify_password,
+    verify_and_update_password,
     get_password_hash,
     create_access_token,
     create_refresh_token
@@ -17,20 +20,9 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
-    
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email or username already registered"
-        )
-    
-    # Create new user
+    # One INSERT; the unique email/username constraints reject duplicates atomically (no check-then-insert race)
     hashed_password = get_password_hash(user_data.password)
     db_user = User(
         email=user_data.email,
@@ -40,8 +32,14 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email or username already registered"
+        )
     
     # Create tokens
     access_token = create_access_token(data={"sub": str(db_user.id)})
@@ -55,7 +53,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(
+def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -65,7 +63,10 @@ async def login(
         (User.username == form_data.username) | (User.email == form_data.username)
     ).first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = (
+        verify_and_update_password(form_data.password, user.hashed_password) if user else (False, None)
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -79,7 +80,9 @@ async def login(
         )
     
     # Update last login
-    user.last_login = datetime.utcnow()
+    if new_hash:
+        user.hashed_password = new_hash  # legacy bcrypt -> argon2id, in the same commit
+    user.last_login = func.now()  # database clock, timezone-aware, set in the same UPDATE
     db.commit()
     
     # Create tokens
@@ -94,12 +97,9 @@ async def login(
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
+def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
     """Refresh access token"""
     # Validate refresh token and create new access token
-    from jose import jwt, JWTError
-    from app.core.config import settings
-    
     try:
         payload = jwt.decode(refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
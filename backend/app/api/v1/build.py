@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse, HTMLResponse
-from sqlalchemy.orm import Session
-from typing import List
-import zipfile
-import io
-
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse, StreamingResponse
+from sqlalchemy import delete, lambda_stmt, select
+from sqlalchemy.orm import Session, raiseload, undefer_group
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+import functools
+import threading
+
+from app.core import json_codec
+from app.core.config import settings
+from app.db.database import SessionLocal, get_db
 from app.models.user import User
 from app.models.project import Project
 from app.core.security import get_current_active_user
@@ -22,10 +26,63 @@ from app.services.builder_service import (
     build_conversation_summary,
     suggest_questions,
 )
+from app.services.project_zips import cached_zip_path, discard_project_zips, iter_zip
+from app.services.response_cache import ResponseCache, make_response_cache, response_cache_key
 
 router = APIRouter()
 
 
+# Identical generate requests (same user, conversation, name and LLM config) within
+# BUILD_GENERATE_DEDUPE_SECONDS reuse the first result instead of re-running the LLM: client retries
+# and double submits cost one insert. Concurrent duplicates in this process wait on a per-key lock
+# (different requests never wait on each other); the entry is dropped once nobody holds or waits on it.
+_generate_inflight: Dict[str, "_InflightGenerate"] = {}
+_generate_inflight_guard = threading.Lock()
+
+
+class _InflightGenerate:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+@contextmanager
+def _generate_key_lock(key: str) -> Iterator[None]:
+    with _generate_inflight_guard:
+        entry = _generate_inflight.get(key)
+        if entry is None:
+            entry = _generate_inflight[key] = _InflightGenerate()
+        entry.users += 1
+    try:
+        with entry.lock:
+            yield
+    finally:
+        with _generate_inflight_guard:
+            entry.users -= 1
+            if not entry.users:
+                del _generate_inflight[key]
+
+
+@functools.lru_cache(maxsize=1)
+def _generate_dedupe_cache() -> ResponseCache:
+    return make_response_cache(ttl=getattr(settings, "BUILD_GENERATE_DEDUPE_SECONDS", 600), max_entries=256)
+
+
+def _generate_dedupe_key(user_id: int, messages: List[Dict[str, str]], project_name: Optional[str]) -> str:
+    config = (
+        settings.USE_LOCAL_LLM,
+        settings.LOCAL_MODEL_NAME,
+        settings.OPENAI_MODEL,
+        settings.ANTHROPIC_MODEL,
+        getattr(settings, "BUILD_SINGLE_FILE", True),
+    )
+    return response_cache_key(
+        "build-generate", {"user": user_id, "messages": messages, "name": project_name, "llm": config}
+    )
+
+
 @router.post("/suggest-question", response_model=SuggestQuestionResponse)
 def suggest_follow_up_questions(
     body: SuggestQuestionRequest,
@@ -57,15 +114,29 @@ def generate_project(
             detail="At least one message is required",
         )
 
-    spec = conversation_to_spec(messages)
-    if body.project_name:
-        spec["name"] = body.project_name
+    # Hand the pooled connection back while the LLM runs; the insert below opens a new transaction
+    user_id = current_user.id
+    db.close()
+
+    cache = _generate_dedupe_cache()
+    key = _generate_dedupe_key(user_id, messages, body.project_name)
+    # Concurrent duplicates wait here for the first run, then find its result in the cache
+    with _generate_key_lock(key) if cache.enabled else nullcontext():
+        cached = cache.get(key)
+        if cached is not None:
+            result = json_codec.loads(cached)
+            spec, files, summary = result["spec"], result["files"], result["summary"]
+        else:
+            spec = conversation_to_spec(messages)
+            if body.project_name:
+                spec["name"] = body.project_name
 
-    files = spec_to_code(spec)
-    summary = build_conversation_summary(messages)
+            files = spec_to_code(spec)
+            summary = build_conversation_summary(messages)
+            cache.set(key, json_codec.dumps_bytes({"spec": spec, "files": files, "summary": summary}))
 
     project = Project(
-        user_id=current_user.id,
+        user_id=user_id,
         name=spec.get("name", "MyApp"),
         spec=spec,
         files=files,
@@ -73,23 +144,68 @@ def generate_project(
     )
     db.add(project)
     db.commit()
-    db.refresh(project)
     return project
 
 
+_LIST_STREAM_BATCH = 500
+
+
+def _iter_project_list(stmt) -> Iterator[bytes]:
+    """
+    Encode (id, name, created_at) rows as one JSON array, fetched and sent _LIST_STREAM_BATCH rows at a time.
+    Uses its own session: the request's session is closed before the response body is streamed.
+    """
+    with SessionLocal() as db:
+        yield b"["
+        sep = b""
+        for rows in db.execute(stmt, execution_options={"yield_per": _LIST_STREAM_BATCH}).partitions():
+            items = [
+                {"id": r.id, "name": r.name, "created_at": r.created_at.isoformat() if r.created_at else None}
+                for r in rows
+            ]
+            yield sep + json_codec.dumps_bytes(items)[1:-1]
+            sep = b","
+        yield b"]"
+
+
 @router.get("/projects", response_model=List[ProjectListItem])
 def list_projects(
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Page size; omit for all projects"),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor header of the previous page"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
-    """List the current user's generated projects."""
-    projects = (
-        db.query(Project)
-        .filter(Project.user_id == current_user.id)
-        .order_by(Project.created_at.desc())
-        .all()
+    """
+    List the current user's generated projects, newest first.
+    With limit, pages are keyset-paginated: pass the X-Next-Cursor response header back as cursor for the
+    next page (absent on the last page). Each page is one index range scan however deep it is, unlike OFFSET.
+    """
+    # Select only the listed columns: full rows would load and decode every project's generated files.
+    # Newest first by id: ids follow insert order like created_at (server now()), and a single integer
+    # key compares exactly on every backend (SQLite stores server timestamps in a different text format).
+    # lambda_stmt: built and compiled once per shape (cursor / limit variants); later requests only
+    # swap in user_id, cursor and limit as bound parameters
+    user_id = current_user.id
+    stmt = lambda_stmt(
+        lambda: select(Project.id, Project.name, Project.created_at)
+        .where(Project.user_id == user_id)
+        .order_by(Project.id.desc())
     )
-    return projects
+    if cursor is not None:
+        stmt += lambda s: s.where(Project.id < cursor)
+    if not limit:
+        # Whole list: stream it in batches so memory stays flat however many projects there are
+        return StreamingResponse(_iter_project_list(stmt), media_type="application/json")
+    fetch = limit + 1  # one extra row tells whether there is a next page
+    stmt += lambda s: s.limit(fetch)
+    projects = db.execute(stmt).all()
+    headers = {}
+    if len(projects) > limit:
+        projects = projects[:limit]
+        headers["X-Next-Cursor"] = str(projects[-1].id)
+    # Rows come straight from the DB with exactly the ProjectListItem fields: encode them directly
+    # instead of validating each one through response_model (which still documents the schema)
+    return ORJSONResponse([row._asdict() for row in projects], headers=headers)
 
 
 @router.get("/projects/{project_id}", response_model=ProjectResponse)
@@ -99,7 +215,8 @@ def get_project(
   db: Session = Depends(get_db),
 ):
     """Get a single project by id."""
-    project = db.query(Project).filter(
+    # Everything ProjectResponse needs in one SELECT; any lazy load (e.g. a new relationship field) raises
+    project = db.query(Project).options(undefer_group("content"), raiseload("*")).filter(
         Project.id == project_id,
         Project.user_id == current_user.id,
     ).first()
@@ -115,24 +232,30 @@ def download_project(
     db: Session = Depends(get_db),
 ):
     """Download project as a zip of generated files. With BUILD_SINGLE_FILE, zip contains one index.html (open in browser)."""
-    project = db.query(Project).filter(
+    project = db.query(Project.name, Project.files).filter(
         Project.id == project_id,
         Project.user_id == current_user.id,
     ).first()
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        for filename, content in (project.files or {}).items():
-            zf.writestr(filename, content)
-
-    buf.seek(0)
+    files = project.files or {}
+    filename = f"{project.name}_project.zip"
+    path = cached_zip_path(project_id, files)
+    if path:
+        # The URL stays the same when the project is deleted or its id reused: browsers must revalidate
+        return FileResponse(
+            path,
+            media_type="application/zip",
+            filename=filename,
+            headers={"Cache-Control": "private, no-cache"},
+        )
     return StreamingResponse(
-        buf,
+        iter_zip(files),
         media_type="application/zip",
         headers={
-            "Content-Disposition": f'attachment; filename="{project.name}_project.zip"',
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "private, no-cache",
         },
     )
 
@@ -147,7 +270,7 @@ def open_project_in_browser(
     Return the generated app as a single HTML page (Synthesis-style).
     Open this URL in a browser to run the app with no download. Works when BUILD_SINGLE_FILE=true (single index.html).
     """
-    project = db.query(Project).filter(
+    project = db.query(Project.files).filter(
         Project.id == project_id,
         Project.user_id == current_user.id,
     ).first()
@@ -170,12 +293,14 @@ def delete_project(
     db: Session = Depends(get_db),
 ):
     """Delete a project."""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id,
-    ).first()
-    if not project:
+    # Ownership check folded into the DELETE: one statement, and the (large) files column is never loaded
+    deleted = db.execute(
+        delete(Project)
+        .where(Project.id == project_id, Project.user_id == current_user.id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
-    db.delete(project)
     db.commit()
+    discard_project_zips([project_id])
     return None
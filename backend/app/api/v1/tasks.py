@@ -0,0 +1,50 @@
+"""
+Task approval endpoints: approve, reject or cancel many of the current user's tasks in one request.
+Each call is one UPDATE ... RETURNING (see services.task_transitions), however many ids it carries.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.core.security import get_current_active_user
+from app.db.database import get_db
+from app.models.user import User
+from app.schemas.task import TaskBatchRequest, TaskBatchResponse
+from app.services.task_transitions import approve_tasks, cancel_tasks, reject_tasks
+
+router = APIRouter()
+
+
+@router.post("/batch/approve", response_model=TaskBatchResponse)
+def batch_approve(
+    body: TaskBatchRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Approve the given tasks that are awaiting approval; returns the ids that were approved."""
+    approved = approve_tasks(db, current_user.id, body.task_ids)
+    db.commit()
+    return {"task_ids": approved}
+
+
+@router.post("/batch/reject", response_model=TaskBatchResponse)
+def batch_reject(
+    body: TaskBatchRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Reject the given tasks that are awaiting approval; returns the ids that were rejected."""
+    rejected = reject_tasks(db, current_user.id, body.task_ids)
+    db.commit()
+    return {"task_ids": rejected}
+
+
+@router.post("/batch/cancel", response_model=TaskBatchResponse)
+def batch_cancel(
+    body: TaskBatchRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Cancel the given tasks that have not started; returns the ids that were cancelled."""
+    cancelled = cancel_tasks(db, current_user.id, body.task_ids)
+    db.commit()
+    return {"task_ids": cancelled}
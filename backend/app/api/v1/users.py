@@ -1,15 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session, selectinload
 from typing import List
 from pydantic import BaseModel
 
+from app.core import json_codec
 from app.db.database import get_db
+from app.models.agent import Agent
 from app.models.user import User
-from app.core.security import get_current_active_user, verify_password, get_password_hash
+from app.core.security import (
+    get_current_active_user,
+    get_current_user,
+    get_current_user_id,
+    verify_password,
+    get_password_hash,
+)
 from app.schemas.user import UserResponse, UserUpdate
+from app.services.project_zips import discard_project_zips
+from app.services.response_cache import ResponseCache
 
 router = APIRouter()
 
+# Serialized GET /me bodies by user id. Loaded on nearly every page, so a hit skips loading and encoding
+# the user row (only is_active is re-read, so a deleted or deactivated account is refused at once);
+# dropped on profile changes here (other workers may serve the old profile fields for up to the TTL).
+_ME_CACHE_TTL_SECONDS = 30
+_me_cache = ResponseCache(ttl=_ME_CACHE_TTL_SECONDS, max_entries=10000)
+
 
 class PasswordUpdate(BaseModel):
     current_password: str
@@ -17,40 +36,80 @@ class PasswordUpdate(BaseModel):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
-    """Get current user information"""
-    return current_user
+def get_current_user_info(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    """Get current user information (ETag; 304 when the client's copy is current)"""
+    body = _me_cache.get(user_id)
+    if body is not None:
+        # Same checks as get_current_user, on one indexed column instead of the full row
+        is_active = db.scalar(select(User.is_active).where(User.id == user_id))
+        if not is_active:
+            _me_cache.delete(user_id)
+            body = None
+    if body is None:
+        user = get_current_user(user_id, db)
+        body = json_codec.dumps_bytes(UserResponse.model_validate(user).model_dump(mode="json"))
+        _me_cache.set(user_id, body)
+    headers = {
+        "ETag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        "Cache-Control": f"private, max-age={_ME_CACHE_TTL_SECONDS}",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.put("/me", response_model=UserResponse)
-async def update_current_user(
+def update_current_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Update current user information"""
-    if user_update.email and user_update.email != current_user.email:
-        existing = db.query(User).filter(User.email == user_update.email).first()
-        if existing:
+    new_email = user_update.email if user_update.email and user_update.email != current_user.email else None
+    new_username = (
+        user_update.username
+        if user_update.username and user_update.username != current_user.username
+        else None
+    )
+
+    # Check both uniqueness constraints in one round-trip
+    clashes = []
+    if new_email:
+        clashes.append(User.email == new_email)
+    if new_username:
+        clashes.append(User.username == new_username)
+    if clashes:
+        # Both columns are unique, so at most one row per clash
+        taken = db.query(User.email, User.username).filter(or_(*clashes)).limit(2).all()
+        if new_email and any(row.email == new_email for row in taken):
             raise HTTPException(status_code=400, detail="Email already in use")
-        current_user.email = user_update.email
-    
-    if user_update.username and user_update.username != current_user.username:
-        existing = db.query(User).filter(User.username == user_update.username).first()
-        if existing:
+        if new_username and any(row.username == new_username for row in taken):
             raise HTTPException(status_code=400, detail="Username already in use")
-        current_user.username = user_update.username
-    
+    values = {}
+    if new_email:
+        values["email"] = new_email
+    if new_username:
+        values["username"] = new_username
     if user_update.full_name is not None:
-        current_user.full_name = user_update.full_name
-    
+        values["full_name"] = user_update.full_name
+    if not values:
+        return current_user
+
+    # One UPDATE ... RETURNING instead of attribute writes + flush + refresh SELECT
+    updated = db.execute(
+        update(User).where(User.id == current_user.id).values(**values).returning(User)
+    ).scalar_one()
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    _me_cache.delete(str(current_user.id))
+    return updated
 
 
 @router.put("/me/password")
-async def update_password(
+def update_password(
     password_data: PasswordUpdate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -69,11 +128,27 @@ async def update_password(
 
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_current_user(
+def delete_current_user(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Delete current user account"""
+    # The delete cascades to every owned row. Load them first with one IN query per table; lazy loading
+    # would issue a query per collection plus one per agent for its tasks.
+    owner = db.execute(
+        select(User)
+        .where(User.id == current_user.id)
+        .options(
+            selectinload(User.agents).options(selectinload(Agent.tasks), selectinload(Agent.metrics)),
+            selectinload(User.tasks),
+            selectinload(User.integrations),
+            selectinload(User.preferences),
+            selectinload(User.projects),
+        )
+    ).scalar_one()
+    project_ids = [project.id for project in owner.projects]
     db.delete(current_user)
     db.commit()
+    _me_cache.delete(str(current_user.id))
+    discard_project_zips(project_ids)
     return None
@@ -1,79 +1,119 @@
 """
 Workspace API for the IDE: list directory and read file.
-Uses the same path rules as the agent (workspace_root, allowlist).
+Uses the same path rules as the agent (workspace_root, allowlist: app.services.workspace_paths).
+Handlers are async and do disk I/O through anyio (worker threads), so concurrent reads run in parallel
+without tying up the event loop. File content is streamed in chunks, so a read holds at most one chunk
+in memory however large the file is.
 """
 import os
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, AsyncIterator, Dict, List
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
 
 from app.models.user import User
+from app.core import json_codec
 from app.core.security import get_current_active_user
 from app.core.config import settings
+from app.services.workspace_paths import safe_path, validate_workspace_allowed
 
 router = APIRouter()
 
+_READ_CHUNK_CHARS = 64 * 1024
 
-def _safe_path(root: str, path: str) -> Optional[str]:
-    """Resolve path under workspace_root; return None if outside."""
-    if not root or not os.path.isabs(root):
-        return None
-    full = os.path.normpath(os.path.join(root, path.lstrip("/").replace("\\", "/")))
-    root_abs = os.path.abspath(root)
-    if not full.startswith(root_abs):
-        return None
-    return full
-
-
-def _validate_workspace_allowed(workspace_root: str) -> bool:
-    allowed = getattr(settings, "WORKSPACE_ALLOWED_ROOTS", None) or []
-    if not allowed:
-        return True
-    root_abs = os.path.abspath(workspace_root)
-    for allowed_dir in allowed:
-        if not allowed_dir:
-            continue
-        if root_abs.startswith(os.path.abspath(allowed_dir)):
-            return True
-    return False
+def _scan_dir(full: str) -> List[Dict[str, Any]]:
+    """Name, type and size of every entry in one pass: os.scandir reports the type with the listing."""
+    items = []
+    with os.scandir(full) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                size = 0 if is_dir else entry.stat().st_size
+            except OSError:  # broken symlink or removed while listing
+                is_dir, size = False, 0
+            items.append({"name": entry.name, "is_dir": is_dir, "size": size})
+    return items
 
 
 @router.get("/list")
-def workspace_list(
+async def workspace_list(
     root: str,
     path: str = ".",
     current_user: User = Depends(get_current_active_user),
 ):
-    """List directory entries. root = workspace_root (absolute path), path = relative path."""
-    if not _validate_workspace_allowed(root):
+    """
+    List directory entries. root = workspace_root (absolute path), path = relative path.
+    entries are the names; items add is_dir and size so clients need no extra request per entry.
+    """
+    if not validate_workspace_allowed(root):
         raise HTTPException(status_code=400, detail="Workspace not allowed")
-    full = _safe_path(root, path)
+    full = safe_path(root, path)
     if not full:
         raise HTTPException(status_code=400, detail="Path outside workspace")
     if not os.path.isdir(full):
         raise HTTPException(status_code=400, detail="Not a directory")
     try:
-        entries = os.listdir(full)
-        return {"path": path, "entries": entries}
+        items = await anyio.to_thread.run_sync(_scan_dir, full)
+        return {"path": path, "entries": [item["name"] for item in items], "items": items}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/read")
-def workspace_read(
+async def workspace_read(
     root: str,
     path: str,
+    raw: bool = Query(False, description="Return the file bytes as text/plain instead of JSON"),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Read file content. root = workspace_root, path = relative path to file."""
-    if not _validate_workspace_allowed(root):
+    """
+    Read file content. root = workspace_root, path = relative path to file.
+    raw=true sends the file as-is (no decode, JSON escaping or re-encode; conditional requests via ETag).
+    """
+    if not validate_workspace_allowed(root):
         raise HTTPException(status_code=400, detail="Workspace not allowed")
-    full = _safe_path(root, path)
+    full = safe_path(root, path)
     if not full:
         raise HTTPException(status_code=400, detail="Path outside workspace")
     if not os.path.isfile(full):
         raise HTTPException(status_code=400, detail="Not a file")
     try:
-        with open(full, "r", encoding="utf-8", errors="replace") as f:
-            return {"path": path, "content": f.read()}
+        stat = await anyio.to_thread.run_sync(os.stat, full)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    max_bytes = settings.WORKSPACE_MAX_READ_BYTES
+    if max_bytes and stat.st_size > max_bytes:
+        raise HTTPException(
+            status_code=413, detail=f"File too large to read ({stat.st_size} bytes, limit {max_bytes})"
+        )
+    if raw:
+        return FileResponse(
+            full,
+            media_type="text/plain",  # Starlette appends charset=utf-8 to text/*
+            filename=os.path.basename(full),
+            content_disposition_type="inline",
+            stat_result=stat,
+        )
+    try:
+        f = await anyio.open_file(full, "r", encoding="utf-8", errors="replace")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(_iter_read_json(path, f), media_type="application/json")
+
+
+async def _iter_read_json(path: str, f) -> AsyncIterator[bytes]:
+    """
+    Encode {"path": path, "content": <file text>} chunk by chunk: the same document as a JSON response,
+    but the content string is escaped and sent one chunk at a time. Closes f when done.
+    """
+    try:
+        yield b'{"path":' + json_codec.dumps_bytes(path) + b',"content":"'
+        while True:
+            chunk = await f.read(_READ_CHUNK_CHARS)
+            if not chunk:
+                break
+            yield json_codec.dumps_bytes(chunk)[1:-1]
+        yield b'"}'
+    finally:
+        await f.aclose()
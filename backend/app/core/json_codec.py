@@ -0,0 +1,34 @@
+"""
+JSON encode/decode for hot paths (LLM output parsing, tool results, cache keys, JSON logs).
+Uses orjson when installed (several times faster, native datetime/UUID support); falls back to the
+stdlib json module with the same compact output. Decode errors are json.JSONDecodeError either way
+(orjson.JSONDecodeError subclasses it), so callers keep catching json.JSONDecodeError.
+"""
+import json
+from typing import Any, Union
+
+ORJSON_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys).encode("utf-8")
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """Serialize obj to a compact JSON string."""
+    return dumps_bytes(obj, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
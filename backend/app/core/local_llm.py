@@ -2,20 +2,96 @@
 Local LLM Service - Support for running models locally
 Supports: Ollama, GPT4All, Llama.cpp
 """
+import functools
+import glob
 import logging
-from typing import Optional, Dict, Any
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, Iterator
+
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def resolve_model_name(backend: str, model: str, quant: str) -> str:
+    """Apply the LOCAL_LLM_QUANT tag to the configured model name (see Settings.LOCAL_LLM_QUANT)."""
+    if not quant or quant.lower() in model.lower():
+        return model
+    if backend == "llama-cpp":
+        if not os.path.isdir(model):
+            return model
+        matches = sorted(
+            path for path in glob.glob(os.path.join(model, "*.gguf"))
+            if quant.lower() in os.path.basename(path).lower()
+        )
+        if not matches:
+            logger.warning(f"No {quant} .gguf file in {model}")
+            return model
+        return matches[0]
+    if backend == "gpt4all":
+        # GPT4All model names already carry their quantization (e.g. *.Q4_0.gguf)
+        return model
+    # Ollama: quantized variants are published as tag suffixes (e.g. qwen3:8b-q4_K_M)
+    if ":" not in model:
+        logger.warning(f"LOCAL_LLM_QUANT needs a sized Ollama tag (e.g. {model}:8b); using {model}")
+        return model
+    return f"{model}-{quant}"
+
+
+# In-process model weights are loaded once per (model, options) and shared by every LocalLLMService
+# in the process; the lock keeps concurrent first calls from loading the same multi-GB file twice.
+_model_load_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=4)
+def _ollama_client(host: str, timeout: float):
+    """One pooled HTTP client per Ollama host: keep-alive connections are reused across calls and threads."""
+    import httpx
+    import ollama
+    return ollama.Client(
+        host=host,
+        timeout=timeout,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _load_gpt4all(model_name: str):
+    from gpt4all import GPT4All
+    # Model will be downloaded automatically if not present
+    return GPT4All(model_name)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_llama_cpp(model_path: str, n_threads: int):
+    from llama_cpp import Llama
+    return Llama(
+        model_path=model_path,
+        n_ctx=2048,
+        n_threads=n_threads,
+        n_gpu_layers=0  # Set > 0 for GPU support
+    )
+
+
 class LocalLLMService:
     """Service for interacting with local LLMs"""
     
     def __init__(self):
         self.backend = settings.LOCAL_LLM_BACKEND
-        self.model = settings.LOCAL_MODEL_NAME
+        self.quantization = (settings.LOCAL_LLM_QUANT or "").strip()
+        self.model = resolve_model_name(self.backend, settings.LOCAL_MODEL_NAME, self.quantization)
+        self.temperature = settings.LOCAL_MODEL_TEMPERATURE
         self.client = None
+        # Ollama is a separate server: is_available() probes it, cached for LOCAL_LLM_PROBE_TTL_SECONDS
+        self._probe_server = False
+        self._available: Optional[bool] = None
+        self._available_until = 0.0
+        self._probe_lock = threading.Lock()
+        # Backend-specific generate method, resolved once so generate() doesn't re-dispatch per call
+        self._generate_impl = self._generate_ollama
+        self._stream_impl = self._stream_ollama
         self._initialize_backend()
     
     def _initialize_backend(self):
@@ -24,8 +100,12 @@ class LocalLLMService:
             self._initialize_ollama()
         elif self.backend == "gpt4all":
             self._initialize_gpt4all()
+            self._generate_impl = self._generate_gpt4all
+            self._stream_impl = self._stream_gpt4all
         elif self.backend == "llama-cpp":
             self._initialize_llama_cpp()
+            self._generate_impl = self._generate_llama_cpp
+            self._stream_impl = self._stream_llama_cpp
         else:
             logger.warning(f"Unknown backend: {self.backend}, falling back to Ollama")
             self._initialize_ollama()
@@ -33,8 +113,8 @@ class LocalLLMService:
     def _initialize_ollama(self):
         """Initialize Ollama client"""
         try:
-            import ollama
-            self.client = ollama
+            self.client = _ollama_client(settings.OLLAMA_HOST, settings.OLLAMA_TIMEOUT_SECONDS)
+            self._probe_server = True
             logger.info(f"Initialized Ollama with model: {self.model}")
         except ImportError:
             logger.error("Ollama not installed. Install with: pip install ollama")
@@ -43,9 +123,8 @@ class LocalLLMService:
     def _initialize_gpt4all(self):
         """Initialize GPT4All"""
         try:
-            from gpt4all import GPT4All
-            # Model will be downloaded automatically if not present
-            self.client = GPT4All(self.model)
+            with _model_load_lock:
+                self.client = _load_gpt4all(self.model)
             logger.info(f"Initialized GPT4All with model: {self.model}")
         except ImportError:
             logger.error("GPT4All not installed. Install with: pip install gpt4all")
@@ -54,14 +133,9 @@ class LocalLLMService:
     def _initialize_llama_cpp(self):
         """Initialize Llama.cpp"""
         try:
-            from llama_cpp import Llama
             # Expecting model path in LOCAL_MODEL_NAME
-            self.client = Llama(
-                model_path=self.model,
-                n_ctx=2048,
-                n_threads=settings.LOCAL_MODEL_THREADS,
-                n_gpu_layers=0  # Set > 0 for GPU support
-            )
+            with _model_load_lock:
+                self.client = _load_llama_cpp(self.model, settings.LOCAL_MODEL_THREADS)
             logger.info(f"Initialized Llama.cpp with model: {self.model}")
         except ImportError:
             logger.error("llama-cpp-python not installed. Install with: pip install llama-cpp-python")
@@ -74,19 +148,28 @@ class LocalLLMService:
             return ""
         
         max_tokens = max_tokens or settings.LOCAL_MODEL_MAX_TOKENS
-        temperature = kwargs.get("temperature", settings.LOCAL_MODEL_TEMPERATURE)
+        temperature = kwargs.get("temperature", self.temperature)
         
         try:
-            if self.backend == "ollama":
-                return self._generate_ollama(prompt, max_tokens, temperature)
-            elif self.backend == "gpt4all":
-                return self._generate_gpt4all(prompt, max_tokens, temperature)
-            elif self.backend == "llama-cpp":
-                return self._generate_llama_cpp(prompt, max_tokens, temperature)
+            return self._generate_impl(prompt, max_tokens, temperature)
         except Exception as e:
             logger.error(f"Generation failed: {e}")
             return ""
     
+    def generate_stream(self, prompt: str, max_tokens: Optional[int] = None, **kwargs) -> Iterator[str]:
+        """Yield text chunks as the local LLM produces them"""
+        if not self.client:
+            logger.error("No LLM client initialized")
+            return
+        
+        max_tokens = max_tokens or settings.LOCAL_MODEL_MAX_TOKENS
+        temperature = kwargs.get("temperature", self.temperature)
+        
+        try:
+            yield from self._stream_impl(prompt, max_tokens, temperature)
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {e}")
+    
     def _generate_ollama(self, prompt: str, max_tokens: int, temperature: float) -> str:
         """Generate using Ollama"""
         response = self.client.generate(
@@ -122,15 +205,73 @@ class LocalLLMService:
         )
         return response["choices"][0]["text"]
     
+    def _stream_ollama(self, prompt: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        """Stream using Ollama"""
+        for chunk in self.client.generate(
+            model=self.model,
+            prompt=prompt,
+            options={
+                "num_predict": max_tokens,
+                "temperature": temperature,
+            },
+            stream=True,
+        ):
+            yield chunk.get("response", "")
+    
+    def _stream_gpt4all(self, prompt: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        """Stream using GPT4All"""
+        yield from self.client.generate(
+            prompt,
+            max_tokens=max_tokens,
+            temp=temperature,
+            top_k=40,
+            top_p=0.9,
+            repeat_penalty=1.1,
+            streaming=True,
+        )
+    
+    def _stream_llama_cpp(self, prompt: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        """Stream using Llama.cpp"""
+        for chunk in self.client(
+            prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop=["</s>", "\n\n"],
+            echo=False,
+            stream=True,
+        ):
+            yield chunk["choices"][0]["text"]
+    
     def is_available(self) -> bool:
-        """Check if local LLM is available"""
-        return self.client is not None
+        """Check if local LLM is available (Ollama: server reachable; cached for LOCAL_LLM_PROBE_TTL_SECONDS)"""
+        if self.client is None:
+            return False
+        if not self._probe_server:
+            return True
+        if self._available is not None and time.monotonic() < self._available_until:
+            return self._available
+        with self._probe_lock:
+            now = time.monotonic()
+            if self._available is None or now >= self._available_until:
+                self._available = self._probe_ollama()
+                self._available_until = now + settings.LOCAL_LLM_PROBE_TTL_SECONDS
+            return self._available
+    
+    def _probe_ollama(self) -> bool:
+        """One cheap request to the Ollama server"""
+        try:
+            self.client.list()
+            return True
+        except Exception as e:
+            logger.warning(f"Ollama server not reachable: {e}")
+            return False
     
     def get_info(self) -> Dict[str, Any]:
         """Get information about the local LLM"""
         return {
             "backend": self.backend,
             "model": self.model,
+            "quantization": self.quantization or "default",
             "available": self.is_available(),
             "host": settings.OLLAMA_HOST if self.backend == "ollama" else "local"
         }
@@ -138,11 +279,14 @@ class LocalLLMService:
 
 # Singleton instance
 _local_llm_service: Optional[LocalLLMService] = None
+_local_llm_lock = threading.Lock()
 
 
 def get_local_llm() -> LocalLLMService:
     """Get or create the local LLM service singleton"""
     global _local_llm_service
     if _local_llm_service is None:
-        _local_llm_service = LocalLLMService()
+        with _local_llm_lock:
+            if _local_llm_service is None:
+                _local_llm_service = LocalLLMService()
     return _local_llm_service
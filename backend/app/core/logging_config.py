@@ -1,26 +1,27 @@
-import json
 import logging
+import re
 import sys
+from app.core import json_codec
 from app.core.config import settings
+from app.core.middleware import request_id_ctx
 
 # Keys to redact in log messages (case-insensitive substring match)
 _SECRET_SUBSTRINGS = (
     "api_key", "apikey", "secret", "password", "token", "authorization",
     "openai", "anthropic", "stripe", "bearer ",
 )
+# All substrings in one case-insensitive pattern: a single scan per message, no lowercased copy
+_SECRET_RE = re.compile("|".join(map(re.escape, _SECRET_SUBSTRINGS)), re.IGNORECASE)
 
 
 class SecretsRedactionFilter(logging.Filter):
     """Redact secret-like values in log records."""
 
     def filter(self, record: logging.LogRecord) -> bool:
-        if hasattr(record, "msg") and isinstance(record.msg, str):
-            msg = record.msg
-            for sub in _SECRET_SUBSTRINGS:
-                if sub.lower() in msg.lower():
-                    # Replace potential key=value or "key": "value" patterns with redacted
-                    record.msg = "[REDACTED]"
-                    break
+        msg = getattr(record, "msg", None)
+        if isinstance(msg, str) and _SECRET_RE.search(msg):
+            # Replace potential key=value or "key": "value" patterns with redacted
+            record.msg = "[REDACTED]"
         return True
 
 
@@ -28,21 +29,33 @@ class RequestIDFilter(logging.Filter):
     """Add request_id to log record if set (from middleware context)."""
 
     def filter(self, record: logging.LogRecord) -> bool:
-        try:
-            from app.core.middleware import request_id_ctx
-            rid = request_id_ctx.get()
-            record.request_id = rid or ""
-        except Exception:
-            record.request_id = ""
+        record.request_id = request_id_ctx.get() or ""
         return True
 
 
 class JsonFormatter(logging.Formatter):
     """JSON log format for production (log aggregators)."""
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (whole second, formatted timestamp): a datefmt has one-second resolution, so records logged within
+        # the same second share one strftime call. Without one, formatTime appends milliseconds: no caching.
+        # A tuple so threads swap it atomically.
+        self._ts_cache = (None, "")
+
+    def _timestamp(self, record: logging.LogRecord) -> str:
+        if not self.datefmt:
+            return self.formatTime(record)
+        second = int(record.created)
+        cached_second, text = self._ts_cache
+        if cached_second != second:
+            text = self.formatTime(record, self.datefmt)
+            self._ts_cache = (second, text)
+        return text
+
     def format(self, record: logging.LogRecord) -> str:
         log = {
-            "timestamp": self.formatTime(record, self.datefmt),
+            "timestamp": self._timestamp(record),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -51,7 +64,7 @@ class JsonFormatter(logging.Formatter):
             log["request_id"] = record.request_id
         if record.exc_info:
             log["exception"] = self.formatException(record.exc_info)
-        return json.dumps(log)
+        return json_codec.dumps(log)
 
 
 def setup_logging():
@@ -64,7 +77,7 @@ def setup_logging():
     secrets_filter = SecretsRedactionFilter()
 
     if is_production:
-        formatter = JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S")
+        formatter = JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S")  # whole seconds: see JsonFormatter._timestamp
     else:
         formatter = logging.Formatter(
             "%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s",
@@ -1,110 +1,226 @@
 """
-Robustness middleware: request body size limit, rate limiting, request ID.
+Robustness middleware: request body size limit, rate limiting, request ID, response compression.
+Plain ASGI middleware (like Starlette's CORSMiddleware): BaseHTTPMiddleware would add a task group and a
+memory stream per request. Rate limits are counted in process by default; RATE_LIMIT_BACKEND=redis shares the counts across workers
+(optional: the in-process counts are used when the redis package is missing or the server is unreachable).
 """
+import logging
+import os
 import time
-import uuid
 from contextvars import ContextVar
-from collections import defaultdict
-from typing import Callable, List, Optional, Tuple
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.config import settings
 
-# In-memory rate limit store: key -> list of timestamps (prune older than 1 min)
-_rate_store: dict = defaultdict(list)
+logger = logging.getLogger(__name__)
+
+_REDIS_AVAILABLE = False
+try:
+    import redis.asyncio as aioredis
+    _REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+
+# In-memory rate limit store: key -> request times in the current window, oldest first.
+# Least recently seen keys are evicted past _RATE_STORE_MAX_KEYS so one-off client IPs cannot grow it forever.
+_rate_store: "OrderedDict[str, Deque[float]]" = OrderedDict()
+_RATE_STORE_MAX_KEYS = 10_000
+_RATE_KEY_PREFIX = "rl:"
+# After a Redis error, count in process for this long before trying Redis again
+_REDIS_RETRY_SECONDS = 30.0
 # Paths that have stricter rate limits
-RATE_LIMIT_PATHS: List[Tuple[str, int]] = [
+RATE_LIMIT_PATHS: Tuple[Tuple[str, int], ...] = (
     ("/api/v1/agent/chat", getattr(settings, "RATE_LIMIT_AGENT_CHAT_PER_MINUTE", 30)),
+    ("/api/v1/agent/chat/stream", getattr(settings, "RATE_LIMIT_AGENT_CHAT_PER_MINUTE", 30)),
     ("/api/v1/agent/execute-pending", getattr(settings, "RATE_LIMIT_AGENT_CHAT_PER_MINUTE", 30)),
     ("/api/v1/build/generate", getattr(settings, "RATE_LIMIT_BUILD_GENERATE_PER_MINUTE", 10)),
-]
+)
 
+# Lookup table built once at import: every request (limited or not) checks its path here.
+# Both spellings (with and without trailing slash) are keys, so a lookup is one dict hit with no string work.
+_RATE_LIMIT_BY_PATH: Dict[str, int] = {
+    spelling: limit
+    for prefix, limit in RATE_LIMIT_PATHS
+    for spelling in (prefix.rstrip("/"), prefix.rstrip("/") + "/")
+}
 
-def _client_ip(request: Request) -> str:
-    return request.client.host if request.client else "unknown"
 
+def _client_ip(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
 
-def _get_rate_limit_for_path(path: str) -> Optional[int]:
-    for prefix, limit in RATE_LIMIT_PATHS:
-        if path == prefix or path.rstrip("/") == prefix.rstrip("/"):
-            return limit
+
+def _header(scope: Scope, name: bytes) -> Optional[bytes]:
+    """First value of the (lower-case) request header name, read from the raw ASGI header list."""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
     return None
 
 
-class RequestBodySizeLimitMiddleware(BaseHTTPMiddleware):
+def _get_rate_limit_for_path(path: str) -> Optional[int]:
+    return _RATE_LIMIT_BY_PATH.get(path)
+
+
+def _take_rate_slot(key: str, now: float, limit: int, window_sec: float) -> bool:
+    """Record a request for key at now unless limit requests already fell in the window; amortized O(1)."""
+    hits = _rate_store.get(key)
+    if hits is None:
+        hits = _rate_store[key] = deque()
+        if len(_rate_store) > _RATE_STORE_MAX_KEYS:
+            _rate_store.popitem(last=False)
+    else:
+        _rate_store.move_to_end(key)
+    cutoff = now - window_sec
+    while hits and hits[0] <= cutoff:
+        hits.popleft()
+    if len(hits) >= limit:
+        return False
+    hits.append(now)
+    return True
+
+
+def _redis_rate_client():
+    """redis.asyncio client for REDIS_URL when RATE_LIMIT_BACKEND=redis, else None (connects on first use)."""
+    if getattr(settings, "RATE_LIMIT_BACKEND", "memory") != "redis":
+        return None
+    if not _REDIS_AVAILABLE:
+        logger.warning("RATE_LIMIT_BACKEND=redis but the redis package is not installed; using in-process limits")
+        return None
+    return aioredis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+class RequestBodySizeLimitMiddleware:
     """Reject requests with body larger than REQUEST_BODY_MAX_BYTES (413)."""
 
-    def __init__(self, app, max_bytes: int | None = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, max_bytes: int | None = None):
+        self.app = app
         self.max_bytes = max_bytes or getattr(settings, "REQUEST_BODY_MAX_BYTES", 1_048_576)
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        content_length = request.headers.get("content-length")
-        if content_length:
-            try:
-                if int(content_length) > self.max_bytes:
-                    return JSONResponse(
-                        status_code=413,
-                        content={
-                            "detail": f"Request body too large (max {self.max_bytes} bytes)",
-                            "type": "payload_too_large",
-                        },
-                    )
-            except ValueError:
-                pass
-        return await call_next(request)
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Per-IP rate limit for expensive endpoints. Returns 429 when exceeded."""
-
-    def __init__(self, app):
-        super().__init__(app)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            content_length = _header(scope, b"content-length")
+            if content_length:
+                try:
+                    if int(content_length) > self.max_bytes:
+                        response = JSONResponse(
+                            status_code=413,
+                            content={
+                                "detail": f"Request body too large (max {self.max_bytes} bytes)",
+                                "type": "payload_too_large",
+                            },
+                        )
+                        await response(scope, receive, send)
+                        return
+                except ValueError:
+                    pass
+        await self.app(scope, receive, send)
+
+
+class RateLimitMiddleware:
+    """Per-IP, per-path rate limit for expensive endpoints. Returns 429 when exceeded."""
+
+    def __init__(self, app: ASGIApp, redis_client=None):
+        self.app = app
         self.window_sec = 60
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        path = request.url.path
+        self._redis = redis_client if redis_client is not None else _redis_rate_client()
+        self._redis_retry_at = 0.0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
         limit = _get_rate_limit_for_path(path)
         if limit is None:
-            return await call_next(request)
-
-        key = _client_ip(request)
-        now = time.time()
-        # Prune old entries
-        self._prune(key, now)
-        if len(_rate_store[key]) >= limit:
-            return JSONResponse(
+            await self.app(scope, receive, send)
+            return
+
+        # Same key in both backends: each limited path has its own count per client
+        route = path.rstrip("/")
+        ip = _client_ip(scope)
+        now = time.monotonic()  # wall-clock jumps (NTP, DST) must not reset or extend the window
+        allowed = None
+        if self._redis is not None and now >= self._redis_retry_at:
+            try:
+                allowed = await self._take_redis_slot(route, ip, limit)
+            except Exception as e:
+                logger.warning("Redis rate limit unavailable (%s); counting in process for %ss", e, _REDIS_RETRY_SECONDS)
+                self._redis_retry_at = now + _REDIS_RETRY_SECONDS
+        if allowed is None:
+            allowed = _take_rate_slot(f"{route}:{ip}", now, limit, self.window_sec)
+        if not allowed:
+            response = JSONResponse(
                 status_code=429,
                 content={
                     "detail": f"Rate limit exceeded (max {limit} requests per minute)",
                     "type": "rate_limit_exceeded",
                 },
             )
-        _rate_store[key].append(now)
-        return await call_next(request)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def _take_redis_slot(self, path: str, ip: str, limit: int) -> bool:
+        """Fixed window shared by all workers: INCR this minute's counter (wall clock, common to every process)."""
+        bucket = int(time.time() // self.window_sec)
+        key = f"{_RATE_KEY_PREFIX}{path}:{ip}:{bucket}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            count, _ = await pipe.incr(key).expire(key, self.window_sec).execute()
+        return count <= limit
 
-    def _prune(self, key: str, now: float) -> None:
-        cutoff = now - self.window_sec
-        _rate_store[key] = [t for t in _rate_store[key] if t > cutoff]
+
+class PathGZipMiddleware:
+    """
+    GZipMiddleware for requests under the given path prefixes only. Elsewhere it would hold back SSE
+    events in the compressor (agent chat stream) and recompress project zips for nothing.
+    """
+
+    def __init__(self, app: ASGIApp, prefixes: Tuple[str, ...], minimum_size: int = 1024, compresslevel: int = 5):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.prefixes):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
 
 
 # ContextVar for request ID (so logging can include it without passing request)
 request_id_ctx: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
+class RequestIDMiddleware:
     """Assign X-Request-ID, set request.state.request_id and request_id_ctx for logging."""
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
-        request.state.request_id = request_id
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        raw = _header(scope, b"x-request-id")
+        # 16 random bytes as 32 hex chars: same entropy as a uuid4, without building a UUID object
+        request_id = raw.decode("latin-1") if raw else os.urandom(16).hex()
+        # request.state reads scope["state"]
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["x-request-id"] = request_id
+            await send(message)
+
         token = request_id_ctx.set(request_id)
         try:
-            response = await call_next(request)
-            response.headers["x-request-id"] = request_id
-            return response
+            await self.app(scope, receive, send_with_request_id)
         finally:
             request_id_ctx.reset(token)
@@ -1,29 +1,73 @@
-from sqlalchemy import create_engine
+import enum
+from typing import Any, Type
+
+from sqlalchemy import JSON, CheckConstraint, String, TypeDecorator, create_engine
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from app.core import json_codec
 from app.core.config import settings
 
-# Create database engine (SQLite-friendly for simplified local run)
-_engine_kw: dict = {"pool_pre_ping": True}
+
+# Create database engine (SQLite-friendly for simplified local run).
+# JSON columns (project spec and generated files) are encoded/decoded with json_codec (orjson when installed).
+_engine_kw: dict = {
+    "pool_pre_ping": True,
+    "json_serializer": json_codec.dumps,
+    "json_deserializer": json_codec.loads,
+}
 if "sqlite" in settings.DATABASE_URL:
     _engine_kw["connect_args"] = {"check_same_thread": False}
 else:
-    _engine_kw["pool_size"] = 10
-    _engine_kw["max_overflow"] = 20
+    _engine_kw["pool_size"] = settings.DB_POOL_SIZE
+    _engine_kw["max_overflow"] = settings.DB_MAX_OVERFLOW
+    _engine_kw["pool_recycle"] = settings.DB_POOL_RECYCLE_SECONDS
 
 engine = create_engine(settings.DATABASE_URL, **_engine_kw)
 
-# Create session maker
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create session maker. expire_on_commit=False: objects stay loaded after commit, so building the
+# response does not re-SELECT every row that was just written.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Base class for models
 Base = declarative_base()
 
+# JSON document column: binary jsonb on Postgres (parsed once on write, GIN-indexable for @> lookups),
+# plain JSON text elsewhere (SQLite)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+class EnumString(TypeDecorator):
+    """
+    VARCHAR column for a str-valued enum, stored as the member's name ("PENDING") like sqlalchemy.Enum, so
+    existing rows and native Postgres enum labels stay valid. Binds accept members, names or values; rows
+    come back as members through one dict lookup, without sqlalchemy.Enum's per-type processing chain.
+    Pair with enum_check for the allowed names.
+    """
+    impl = String
+    cache_ok = True
+
+    def __init__(self, enum_cls: Type[enum.Enum], length: int = 20):
+        super().__init__(length)
+        self.enum_cls = enum_cls
+        # str-enum members hash like their values, so this also maps members to names
+        self._names = {**{m.value: m.name for m in enum_cls}, **{m.name: m.name for m in enum_cls}}
+        self._members = enum_cls.__members__
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Any:
+        return None if value is None else self._names.get(value, value)
+
+    def process_result_value(self, value: Any, dialect: Any) -> Any:
+        return None if value is None else self._members.get(value, value)
+
+
+def enum_check(column: str, enum_cls: Type[enum.Enum], name: str) -> CheckConstraint:
+    """CHECK constraint limiting an EnumString column to enum_cls's names (NULL still allowed)."""
+    allowed = ", ".join(f"'{member.name}'" for member in enum_cls)
+    return CheckConstraint(f"{column} IN ({allowed})", name=name)
+
 
 def get_db() -> Session:
-    """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+    """Dependency to get database session (returned to the pool on exit, even if the request fails)"""
+    with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,16 +1,26 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
 import logging
+import time
+from typing import Optional
 
-from sqlalchemy import text
+import anyio
+
+from sqlalchemy import Connection, text
 
 from app.core.config import settings
-from app.core.middleware import RateLimitMiddleware, RequestBodySizeLimitMiddleware, RequestIDMiddleware
-from app.api.v1 import auth, users, build, agent_chat, workspace
-from app.db.database import engine, Base
+from app.core.middleware import (
+    PathGZipMiddleware,
+    RateLimitMiddleware,
+    RequestBodySizeLimitMiddleware,
+    RequestIDMiddleware,
+)
+from app.api.v1 import auth, users, build, agent_chat, tasks, workspace
+from app.db.database import engine, Base, SessionLocal
+from app.services.agent_metrics import refresh_agent_metrics
 from app.core.logging_config import setup_logging
 
 # Setup logging
@@ -18,6 +28,77 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
+def _create_tables() -> None:
+    Base.metadata.create_all(bind=engine)
+
+
+def _ping_db() -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+# Session-level advisory lock: on Postgres only the API worker holding it runs the periodic refresh
+_AGENT_METRICS_LOCK_KEY = 0x6167656E74  # "agent"
+
+
+def _claim_agent_metrics_lock() -> Optional[Connection]:
+    """A dedicated connection holding the agent-metrics advisory lock, or None if another worker holds it."""
+    conn = engine.connect()
+    try:
+        claimed = conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": _AGENT_METRICS_LOCK_KEY}
+        ).scalar()
+        conn.commit()
+    except Exception:
+        conn.close()
+        raise
+    if claimed:
+        return conn
+    conn.close()
+    return None
+
+
+def _release_agent_metrics_lock(conn: Connection) -> None:
+    # Invalidate rather than return to the pool: closing the DBAPI connection ends the session, which
+    # releases the lock even if the connection is broken (a pooled one would keep holding it)
+    conn.invalidate()
+    conn.close()
+
+
+def _refresh_agent_metrics(conn: Optional[Connection] = None) -> None:
+    with SessionLocal(bind=conn) if conn is not None else SessionLocal() as db:
+        refresh_agent_metrics(db)
+        db.commit()
+
+
+async def _agent_metrics_loop(interval: float) -> None:
+    """
+    Recount agent_metrics from tasks every interval seconds until cancelled (a failed run is retried next tick).
+    On Postgres only the worker holding the advisory lock refreshes, on the lock's connection; the others try
+    to claim it each tick, so another worker takes over when the holder exits or its connection drops.
+    """
+    leader: Optional[Connection] = None
+    single_process = engine.dialect.name != "postgresql"
+    try:
+        while True:
+            await anyio.sleep(interval)
+            try:
+                if leader is None and not single_process:
+                    leader = await anyio.to_thread.run_sync(_claim_agent_metrics_lock)
+                    if leader is None:
+                        continue
+                await anyio.to_thread.run_sync(_refresh_agent_metrics, leader)
+            except Exception as e:
+                logger.warning("Agent metrics refresh failed: %s", e)
+                if leader is not None:
+                    # The lock may have gone with the connection; give it up and re-claim next tick
+                    _release_agent_metrics_lock(leader)
+                    leader = None
+    finally:
+        if leader is not None:
+            _release_agent_metrics_lock(leader)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
@@ -29,15 +110,21 @@ async def lifespan(app: FastAPI):
         cors = getattr(settings, "CORS_ORIGINS", [])
         if "*" in cors or (isinstance(cors, str) and cors == "*"):
             logger.warning("CORS_ORIGINS includes '*' in production; set explicit origins for credentials")
-    # Create database tables and verify connectivity
+    # Create database tables and verify connectivity (blocking driver calls: on a worker thread)
     try:
-        Base.metadata.create_all(bind=engine)
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        if settings.DB_CREATE_TABLES:
+            await anyio.to_thread.run_sync(_create_tables)
+        await anyio.to_thread.run_sync(_ping_db)
     except Exception as e:
         logger.error("Database connectivity check failed: %s", e)
         raise
-    yield
+    # Created inside the running loop (anyio limiters bind to it); used by the agent chat endpoints
+    app.state.agent_run_limiter = anyio.CapacityLimiter(settings.AGENT_MAX_CONCURRENT_RUNS)
+    async with anyio.create_task_group() as tg:
+        if settings.AGENT_METRICS_REFRESH_SECONDS > 0:
+            tg.start_soon(_agent_metrics_loop, settings.AGENT_METRICS_REFRESH_SECONDS)
+        yield
+        tg.cancel_scope.cancel()
     logger.info("Shutting down Agentic AI Life Assistant API")
 
 
@@ -46,14 +133,19 @@ app = FastAPI(
     description="Proactive AI agent system for autonomous task management",
     version="1.0.0",
     lifespan=lifespan,
+    # Every route (and the error handlers below) encodes with orjson instead of the stdlib json module
+    default_response_class=ORJSONResponse,
     docs_url="/api/docs",
     redoc_url="/api/redoc"
 )
 
-# Robustness middleware (first added = outermost; request sees: CORS -> RequestID -> BodySize -> RateLimit -> route)
+# Robustness middleware (request sees: CORS -> GZip -> RequestID -> BodySize -> RateLimit -> route)
 app.add_middleware(RateLimitMiddleware)
 app.add_middleware(RequestBodySizeLimitMiddleware)
 app.add_middleware(RequestIDMiddleware)
+# Workspace file reads are whole source files: highly compressible, and the network is the bottleneck
+# for a remote IDE
+app.add_middleware(PathGZipMiddleware, prefixes=("/api/v1/workspace/",))
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -74,20 +166,30 @@ async def health_check():
     }
 
 
+# A successful readiness ping is reused for this long: probes from every replica/kubelet (often 1 Hz)
+# then cost at most one DB round-trip per window. Failures are never cached.
+_READY_CACHE_SECONDS = 2.0
+_ready_until = 0.0
+
+
 # Readiness: can we serve traffic? (DB ping)
 @app.get("/health/ready")
 async def health_ready():
     """Readiness probe: DB connectivity. Returns 503 if DB is unreachable."""
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+    global _ready_until
+    if time.monotonic() < _ready_until:
         return {"status": "ready"}
+    try:
+        # Blocking driver call: keep it off the event loop
+        await anyio.to_thread.run_sync(_ping_db)
     except Exception as e:
         logger.warning("Readiness check failed: %s", e)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={"status": "not_ready", "detail": "Database unreachable"},
         )
+    _ready_until = time.monotonic() + _READY_CACHE_SECONDS
+    return {"status": "ready"}
 
 
 # Root endpoint
@@ -107,12 +209,13 @@ app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(workspace.router, prefix="/api/v1/workspace", tags=["Workspace"])
 app.include_router(build.router, prefix="/api/v1/build", tags=["Build"])
 app.include_router(agent_chat.router, prefix="/api/v1/agent", tags=["Agent"])
+app.include_router(tasks.router, prefix="/api/v1/tasks", tags=["Tasks"])
 
 
 # Validation error handler (consistent JSON shape)
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={
             "detail": exc.errors(),
@@ -125,7 +228,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error("Unhandled exception: %s", exc, exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "detail": "An internal server error occurred",
@@ -136,9 +239,13 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 if __name__ == "__main__":
     import uvicorn
+    # "auto" picks uvloop and httptools (both installed by uvicorn[standard]) and falls back to
+    # asyncio/h11 where they are unavailable (uvloop does not support Windows)
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        loop="auto",
+        http="auto",
     )
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Computed, Index, Integer, String, Boolean, DateTime, ForeignKey, Text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 
-from app.db.database import Base
+from app.db.database import Base, EnumString, JSONType, enum_check
 
 
 class AgentType(str, enum.Enum):
@@ -24,36 +24,89 @@ class AgentStatus(str, enum.Enum):
 
 class Agent(Base):
     __tablename__ = "agents"
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Agent details
-    agent_type = Column(Enum(AgentType), nullable=False)
-    name = Column(String, nullable=False)
-    description = Column(String)
-    status = Column(Enum(AgentStatus), default=AgentStatus.ACTIVE)
+    agent_type = Column(EnumString(AgentType), nullable=False)
+    name = Column(String(255), nullable=False)
+    description = Column(Text)
+    status = Column(EnumString(AgentStatus), default=AgentStatus.ACTIVE)
     
     # Configuration
-    config = Column(JSON, default={})
-    permissions = Column(JSON, default={})
+    config = Column(JSONType, default=dict, server_default="{}")
+    permissions = Column(JSONType, default=dict, server_default="{}")
     
     # Capabilities
     can_execute_autonomously = Column(Boolean, default=False)
     requires_approval = Column(Boolean, default=True)
     max_daily_tasks = Column(Integer, default=10)
     
-    # Metrics
-    tasks_completed = Column(Integer, default=0)
-    tasks_pending = Column(Integer, default=0)
-    tasks_failed = Column(Integer, default=0)
-    success_rate = Column(Integer, default=0)
-    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    last_active = Column(DateTime(timezone=True), nullable=True)
+
+    # Per-user agent listings / metrics (WHERE user_id = ? ORDER BY id); a user's agents in one status
+    __table_args__ = (
+        Index("ix_agents_user_id_pk", user_id, id),
+        Index("ix_agents_user_status", user_id, status),
+        enum_check("agent_type", AgentType, "ck_agents_agent_type"),
+        enum_check("status", AgentStatus, "ck_agents_status"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="agents")
     tasks = relationship("Task", back_populates="agent", cascade="all, delete-orphan")
+    metrics = relationship("AgentMetrics", back_populates="agent", uselist=False, cascade="all, delete-orphan")
+
+    # Read-through to agent_metrics (zeros until the agent's first task is counted); load with
+    # joinedload(Agent.metrics) when serializing many agents
+    @property
+    def tasks_completed(self) -> int:
+        return self.metrics.tasks_completed if self.metrics is not None else 0
+
+    @property
+    def tasks_pending(self) -> int:
+        return self.metrics.tasks_pending if self.metrics is not None else 0
+
+    @property
+    def tasks_failed(self) -> int:
+        return self.metrics.tasks_failed if self.metrics is not None else 0
+
+    @property
+    def success_rate(self) -> int:
+        return self.metrics.success_rate if self.metrics is not None else 0
+
+    @property
+    def last_active(self):
+        return self.metrics.last_active if self.metrics is not None else None
+
+
+class AgentMetrics(Base):
+    """
+    Task counters per agent, kept off the agents row so counting a task never rewrites (or row-locks) the
+    agent. Rebuilt from tasks by agent_metrics.refresh_agent_metrics; record_task_result bumps it in between.
+    """
+    __tablename__ = "agent_metrics"
+    __mapper_args__ = {"eager_defaults": True}
+
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), primary_key=True)
+    tasks_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    tasks_pending = Column(Integer, nullable=False, default=0, server_default="0")
+    tasks_failed = Column(Integer, nullable=False, default=0, server_default="0")
+    # Derived by the database (GENERATED ALWAYS ... STORED): never written by the app, always consistent
+    # with the counters even when several workers update them concurrently
+    success_rate = Column(
+        Integer,
+        Computed(
+            "CASE WHEN tasks_completed + tasks_failed = 0 THEN 0 "
+            "ELSE (tasks_completed * 100) / (tasks_completed + tasks_failed) END",
+            persisted=True,
+        ),
+    )
+    last_active = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    agent = relationship("Agent", back_populates="metrics")
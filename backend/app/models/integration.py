@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, JSON, Text
+from sqlalchemy import Column, Index, Integer, String, Boolean, DateTime, ForeignKey, Text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 
-from app.db.database import Base
+from app.db.database import Base, EnumString, JSONType, enum_check
 
 
 class IntegrationType(str, enum.Enum):
@@ -24,15 +24,16 @@ class IntegrationStatus(str, enum.Enum):
 
 class Integration(Base):
     __tablename__ = "integrations"
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Integration details
-    integration_type = Column(Enum(IntegrationType), nullable=False)
-    provider = Column(String, nullable=False)  # e.g., "gmail", "outlook", "google_calendar"
-    name = Column(String, nullable=False)
-    status = Column(Enum(IntegrationStatus), default=IntegrationStatus.PENDING)
+    integration_type = Column(EnumString(IntegrationType), nullable=False)
+    provider = Column(String(64), nullable=False)  # e.g., "gmail", "outlook", "google_calendar"
+    name = Column(String(255), nullable=False)
+    status = Column(EnumString(IntegrationStatus), default=IntegrationStatus.PENDING)
     
     # Authentication
     access_token = Column(Text, nullable=True)  # Should be encrypted
@@ -40,8 +41,8 @@ class Integration(Base):
     token_expires_at = Column(DateTime(timezone=True), nullable=True)
     
     # Configuration
-    config = Column(JSON, default={})
-    permissions = Column(JSON, default=[])
+    config = Column(JSONType, default=dict, server_default="{}")
+    permissions = Column(JSONType, default=list, server_default="[]")
     
     # Sync status
     last_sync = Column(DateTime(timezone=True), nullable=True)
@@ -50,6 +51,14 @@ class Integration(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Per-user lookups by provider (existing-connection checks); a user's integrations by type and status
+    __table_args__ = (
+        Index("ix_integrations_user_provider", user_id, provider),
+        Index("ix_integrations_user_type_status", user_id, integration_type, status),
+        enum_check("integration_type", IntegrationType, "ck_integrations_integration_type"),
+        enum_check("status", IntegrationStatus, "ck_integrations_status"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="integrations")
@@ -57,13 +66,14 @@ class Integration(Base):
 
 class UserPreference(Base):
     __tablename__ = "user_preferences"
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Preferences
     key = Column(String, nullable=False)
-    value = Column(JSON, nullable=False)
+    value = Column(JSONType, nullable=False)
     category = Column(String, nullable=True)
     
     # Timestamps
@@ -1,27 +1,40 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, Index, Integer, String, DateTime, ForeignKey, JSON, Text
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
-from app.db.database import Base
+from app.db.database import Base, JSONType
 
 
 class Project(Base):
     """Generated app project from conversational build."""
     __tablename__ = "projects"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     name = Column(String(255), nullable=False)
     """Project/app name."""
-    spec = Column(JSON, default=dict)
+    # Bulky content is deferred (group "content"): loading a Project for ownership/name checks does not
+    # pull tens of KB of generated code; get_project undefers the group, download/open select files only.
+    spec = deferred(Column(JSONType, default=dict, server_default="{}"), group="content")
     """Structured spec: type, features, persistence, theme, etc."""
-    files = Column(JSON, default=dict)
+    # files stays text JSON: never filtered, and jsonb would not keep the file order
+    files = deferred(Column(JSON, default=dict, server_default="{}"), group="content")
     """Generated files: { "index.html": "...", "styles.css": "...", "app.js": "..." }."""
-    conversation_summary = Column(Text, nullable=True)
+    conversation_summary = deferred(Column(Text, nullable=True), group="content")
     """Short summary of the conversation that led to this project."""
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # list_projects: WHERE user_id = ? [AND id < cursor] ORDER BY id DESC is one index range scan, no sort;
+    # spec containment lookups (spec @> '{"type": ...}', Postgres only)
+    __table_args__ = (
+        Index("ix_projects_user_id", user_id, id.desc()),
+        Index(
+            "ix_projects_spec_gin", "spec", postgresql_using="gin", postgresql_ops={"spec": "jsonb_path_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
     user = relationship("User", back_populates="projects")
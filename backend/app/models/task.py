@@ -1,9 +1,9 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Enum, JSON, Text
+from sqlalchemy import Boolean, Column, Index, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 
-from app.db.database import Base
+from app.db.database import Base, EnumString, JSONType, enum_check
 
 
 class TaskStatus(str, enum.Enum):
@@ -26,22 +26,24 @@ class TaskPriority(str, enum.Enum):
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Server-side defaults (created_at, updated_at) come back in the INSERT/UPDATE's RETURNING, not a later SELECT
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
     
     # Task details
-    title = Column(String, nullable=False)
+    title = Column(String(255), nullable=False)
     description = Column(Text)
-    task_type = Column(String, nullable=False)
-    status = Column(Enum(TaskStatus), default=TaskStatus.PENDING)
-    priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
+    task_type = Column(String(64), nullable=False)
+    status = Column(EnumString(TaskStatus), default=TaskStatus.PENDING)
+    priority = Column(EnumString(TaskPriority), default=TaskPriority.MEDIUM)
     
     # Task data
-    input_data = Column(JSON, default={})
-    output_data = Column(JSON, default={})
-    task_metadata = Column(JSON, default={}, name="metadata")
+    input_data = Column(JSONType, default=dict, server_default="{}")
+    output_data = Column(JSONType, default=dict, server_default="{}")
+    task_metadata = Column(JSONType, default=dict, server_default="{}", name="metadata")
     
     # Execution details
     requires_approval = Column(Boolean, default=True)
@@ -61,6 +63,24 @@ class Task(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Per-user listings, newest first, optionally filtered by status; due work per user and status in
+    # schedule order; an agent's tasks (FK lookups, cascades) optionally by status; containment lookups
+    # on input_data (input_data @> '{"customer_id": ...}', Postgres only)
+    __table_args__ = (
+        Index("ix_tasks_user_created", user_id, created_at.desc()),
+        Index("ix_tasks_user_status_created", user_id, status, created_at.desc()),
+        Index("ix_tasks_user_status_scheduled", user_id, status, scheduled_for),
+        Index("ix_tasks_agent_status", agent_id, status),
+        Index(
+            "ix_tasks_input_data_gin",
+            input_data,
+            postgresql_using="gin",
+            postgresql_ops={"input_data": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+        enum_check("status", TaskStatus, "ck_tasks_status"),
+        enum_check("priority", TaskPriority, "ck_tasks_priority"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="tasks")
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 
-from app.db.database import Base
+from app.db.database import Base, EnumString, enum_check
 
 
 class SubscriptionTier(str, enum.Enum):
@@ -14,18 +14,19 @@ class SubscriptionTier(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
-    username = Column(String, unique=True, index=True, nullable=False)
-    full_name = Column(String)
-    hashed_password = Column(String, nullable=False)
+    email = Column(String(320), unique=True, index=True, nullable=False)
+    username = Column(String(64), unique=True, index=True, nullable=False)
+    full_name = Column(String(255))
+    hashed_password = Column(String(128), nullable=False)  # argon2 / bcrypt encodings are under 100 chars
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
     
     # Subscription
     subscription_tier = Column(
-        Enum(SubscriptionTier),
+        EnumString(SubscriptionTier),
         default=SubscriptionTier.FREE,
         nullable=False
     )
@@ -37,6 +38,8 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (enum_check("subscription_tier", SubscriptionTier, "ck_users_subscription_tier"),)
     
     # Relationships
     agents = relationship("Agent", back_populates="user", cascade="all, delete-orphan")
@@ -1,11 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict
 from datetime import datetime
 
 
 class AgentBase(BaseModel):
     agent_type: str
-    name: str
+    name: str = Field(..., max_length=255)
     description: Optional[str] = None
     config: Optional[Dict] = {}
     permissions: Optional[Dict] = {}
@@ -19,7 +19,7 @@ class AgentCreate(AgentBase):
 
 
 class AgentUpdate(BaseModel):
-    name: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=255)
     description: Optional[str] = None
     config: Optional[Dict] = None
     permissions: Optional[Dict] = None
@@ -41,5 +41,4 @@ class AgentResponse(AgentBase):
     updated_at: Optional[datetime]
     last_active: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 
@@ -14,9 +14,10 @@ class TokenData(BaseModel):
 
 
 class UserCreate(BaseModel):
-    email: str
-    username: str
-    full_name: Optional[str] = None
+    # Bounded like the users columns, so an oversized value is a validation error rather than a DB error
+    email: str = Field(..., max_length=320)
+    username: str = Field(..., max_length=64)
+    full_name: Optional[str] = Field(None, max_length=255)
     password: str
 
 
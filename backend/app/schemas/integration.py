@@ -1,12 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, List
 from datetime import datetime
 
 
 class IntegrationBase(BaseModel):
     integration_type: str
-    provider: str
-    name: str
+    provider: str = Field(..., max_length=64)
+    name: str = Field(..., max_length=255)
     config: Optional[Dict] = {}
 
 
@@ -15,7 +15,7 @@ class IntegrationCreate(IntegrationBase):
 
 
 class IntegrationUpdate(BaseModel):
-    name: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=255)
     config: Optional[Dict] = None
     status: Optional[str] = None
 
@@ -30,5 +30,4 @@ class IntegrationResponse(IntegrationBase):
     created_at: datetime
     updated_at: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
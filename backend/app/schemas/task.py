@@ -1,12 +1,12 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
 class TaskBase(BaseModel):
-    title: str
+    title: str = Field(..., max_length=255)
     description: Optional[str] = None
-    task_type: str
+    task_type: str = Field(..., max_length=64)
     priority: str = "medium"
     input_data: Optional[Dict] = {}
     requires_approval: bool = True
@@ -19,7 +19,7 @@ class TaskCreate(TaskBase):
 
 
 class TaskUpdate(BaseModel):
-    title: Optional[str] = None
+    title: Optional[str] = Field(None, max_length=255)
     description: Optional[str] = None
     priority: Optional[str] = None
     status: Optional[str] = None
@@ -42,5 +42,13 @@ class TaskResponse(TaskBase):
     created_at: datetime
     updated_at: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TaskBatchRequest(BaseModel):
+    task_ids: List[int] = Field(..., max_length=1000)
+
+
+class TaskBatchResponse(BaseModel):
+    """Ids that changed state; the rest were missing, not owned or in another state."""
+    task_ids: List[int]
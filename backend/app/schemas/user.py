@@ -1,11 +1,11 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional
 
 
 class UserBase(BaseModel):
     email: EmailStr
-    username: str
-    full_name: Optional[str] = None
+    username: str = Field(..., max_length=64)
+    full_name: Optional[str] = Field(None, max_length=255)
 
 
 class UserCreate(UserBase):
@@ -19,8 +19,8 @@ class UserLogin(BaseModel):
 
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
-    username: Optional[str] = None
-    full_name: Optional[str] = None
+    username: Optional[str] = Field(None, max_length=64)
+    full_name: Optional[str] = Field(None, max_length=255)
 
 
 class UserResponse(UserBase):
@@ -29,5 +29,4 @@ class UserResponse(UserBase):
     subscription_tier: str
     subscription_status: str
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -7,40 +7,59 @@ import logging
 import os
 import re
 import difflib
+import heapq
 import subprocess
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from app.core import json_codec
 from app.core.config import settings
 from app.services.builder_service import (
     _get_llm,
     _generate,
+    _generate_stream,
     suggest_questions,
     conversation_to_spec,
     spec_to_code,
     build_conversation_summary,
     _extract_json_object,
 )
+from app.services.workspace_paths import safe_path, validate_workspace_allowed
 
 logger = logging.getLogger(__name__)
 
+
+def _to_json(obj: Any) -> str:
+    """Serialize a tool result compactly; results are replayed into every later prompt, so spaces cost tokens."""
+    return json_codec.dumps(obj)
+
+
 # When a tool returns this key, the loop returns pending_approval instead of executing
 PENDING_APPROVAL_KEY = "__pending_approval__"
 
+# Replies run_loop gives when the LLM output was unusable; not real answers, so never cache them
+_NO_RESPONSE_REPLY = "I couldn't generate a response. Check your LLM configuration."
+_BAD_FORMAT_REPLY = "I didn't understand the response format."
+_PARSE_ERROR_REPLY = "I couldn't parse my own response. Please try again."
+_TURN_LIMIT_REPLY = "I hit the turn limit. Please try a shorter conversation or rephrase."
+FALLBACK_REPLIES = frozenset({_NO_RESPONSE_REPLY, _BAD_FORMAT_REPLY, _PARSE_ERROR_REPLY, _TURN_LIMIT_REPLY})
+
 # Tool: name, description, function(context, **args) -> str or pending_approval dict
 ToolSpec = Dict[str, Any]
 
 
 def _tool_suggest_questions(context: Dict[str, Any], messages: List[Dict[str, str]]) -> str:
     qs = suggest_questions(messages, max_questions=2)
-    return json.dumps({"questions": qs})
+    return _to_json({"questions": qs})
 
 
 def _tool_generate_app(context: Dict[str, Any], messages: List[Dict[str, str]]) -> str:
     spec = conversation_to_spec(messages)
     files = spec_to_code(spec)
     summary = build_conversation_summary(messages)
-    return json.dumps({
+    return _to_json({
         "spec": spec,
         "files": list(files.keys()),
         "summary": summary,
@@ -48,30 +67,6 @@ def _tool_generate_app(context: Dict[str, Any], messages: List[Dict[str, str]])
     })
 
 
-def _safe_path(root: str, path: str) -> Optional[str]:
-    """Resolve path under workspace_root; return None if outside. O(1) path ops."""
-    if not root:
-        return None
-    full = os.path.normpath(os.path.join(root, path.lstrip("/")))
-    if not full.startswith(os.path.abspath(root)):
-        return None
-    return full
-
-
-def _validate_workspace_allowed(workspace_root: str) -> bool:
-    """If WORKSPACE_ALLOWED_ROOTS is set, workspace_root must be under one of them."""
-    allowed = getattr(settings, "WORKSPACE_ALLOWED_ROOTS", None) or []
-    if not allowed:
-        return True
-    root_abs = os.path.abspath(workspace_root)
-    for allowed_dir in allowed:
-        if not allowed_dir:
-            continue
-        if root_abs.startswith(os.path.abspath(allowed_dir)):
-            return True
-    return False
-
-
 # Commands that are always blocked (dangerous patterns)
 _BLOCKED_COMMAND_PATTERNS = [
     r"rm\s+-rf\s+/?\s*$",  # rm -rf /
@@ -83,13 +78,15 @@ _BLOCKED_COMMAND_PATTERNS = [
     r"wget\s+.*\s+\|\s*sh",
     r">\s*/dev/sd[a-z]",  # write to block device
 ]
+# Compiled once; _is_command_blocked runs for every terminal preview and execution
+_BLOCKED_COMMAND_RES = tuple((p, re.compile(p, re.IGNORECASE)) for p in _BLOCKED_COMMAND_PATTERNS)
 
 
 def _is_command_blocked(command: str) -> Optional[str]:
     """Return reason string if command is blocked, else None."""
     cmd = (command or "").strip()
-    for pattern in _BLOCKED_COMMAND_PATTERNS:
-        if re.search(pattern, cmd, re.IGNORECASE):
+    for pattern, regex in _BLOCKED_COMMAND_RES:
+        if regex.search(cmd):
             return f"Command blocked by policy (pattern: {pattern})"
     return None
 
@@ -97,73 +94,117 @@ def _is_command_blocked(command: str) -> Optional[str]:
 def _tool_read_file(context: Dict[str, Any], path: str) -> str:
     root = context.get("workspace_root") or ""
     if not root:
-        return json.dumps({"error": "Workspace not configured. Set workspace_root in context."})
-    full = _safe_path(root, path)
+        return _to_json({"error": "Workspace not configured. Set workspace_root in context."})
+    full = safe_path(root, path)
     if not full:
-        return json.dumps({"error": "Path outside workspace."})
+        return _to_json({"error": "Path outside workspace."})
     try:
         with open(full, "r", encoding="utf-8", errors="replace") as f:
-            return json.dumps({"path": path, "content": f.read()})
+            return _to_json({"path": path, "content": f.read()})
     except Exception as e:
-        return json.dumps({"error": str(e)})
+        return _to_json({"error": str(e)})
 
 
 def _tool_list_dir(context: Dict[str, Any], path: str = ".") -> str:
     root = context.get("workspace_root") or ""
     if not root:
-        return json.dumps({"error": "Workspace not configured. Set workspace_root in context."})
-    full = _safe_path(root, path)
+        return _to_json({"error": "Workspace not configured. Set workspace_root in context."})
+    full = safe_path(root, path)
     if not full:
-        return json.dumps({"error": "Path outside workspace."})
+        return _to_json({"error": "Path outside workspace."})
     try:
         entries = os.listdir(full)
-        return json.dumps({"path": path, "entries": entries})
+        return _to_json({"path": path, "entries": entries})
     except Exception as e:
-        return json.dumps({"error": str(e)})
+        return _to_json({"error": str(e)})
+
+
+# Text extensions to search; skip binary and large files
+_SEARCH_TEXT_EXT = (".py", ".js", ".ts", ".tsx", ".jsx", ".html", ".css", ".json", ".md", ".txt", ".yml", ".yaml", ".toml", ".sh", ".bat", ".env")
+_SEARCH_MAX_FILE_SIZE = 500_000
+
+
+def _search_patterns(base_full: str, patterns: List[str], max_matches: int = 100) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Search several literal patterns in one walk of base_full. Returns pattern -> matches
+    (path, line, content), at most max_matches per pattern. Stops once every pattern is full.
+    """
+    matches: Dict[str, List[Dict[str, Any]]] = {p: [] for p in patterns}
+    open_patterns = list(dict.fromkeys(p for p in patterns if p))
+    for dirpath, _dirnames, filenames in os.walk(base_full):
+        if not open_patterns:
+            break
+        rel_dir = os.path.relpath(dirpath, base_full) if dirpath != base_full else "."
+        for name in filenames:
+            if not open_patterns:
+                break
+            if not (name.endswith(_SEARCH_TEXT_EXT) or "." not in name):
+                continue
+            full_path = os.path.join(dirpath, name)
+            try:
+                size = os.path.getsize(full_path)
+                if size > _SEARCH_MAX_FILE_SIZE:
+                    continue
+                rel_path = (os.path.join(rel_dir, name) if rel_dir != "." else name).replace("\\", "/")
+                with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+                    for line_no, line in enumerate(f, 1):
+                        for pattern in open_patterns:
+                            if pattern in line:
+                                hits = matches[pattern]
+                                hits.append({"path": rel_path, "line": line_no, "content": line.rstrip()[:200]})
+                                if len(hits) >= max_matches:
+                                    open_patterns = [p for p in open_patterns if p != pattern]
+                        if not open_patterns:
+                            break
+            except (OSError, UnicodeDecodeError):
+                continue
+    return matches
 
 
 def _tool_search_files(context: Dict[str, Any], pattern: str, path: str = ".") -> str:
     """Search for pattern in workspace files (literal substring). Returns path, line_no, line."""
     root = context.get("workspace_root") or ""
     if not root:
-        return json.dumps({"error": "Workspace not configured. Set workspace_root in context."})
-    base_full = _safe_path(root, path)
+        return _to_json({"error": "Workspace not configured. Set workspace_root in context."})
+    base_full = safe_path(root, path)
     if not base_full:
-        return json.dumps({"error": "Path outside workspace."})
+        return _to_json({"error": "Path outside workspace."})
     if not pattern:
-        return json.dumps({"error": "pattern is required."})
-    # Text extensions to search; skip binary and large dirs
-    text_ext = (".py", ".js", ".ts", ".tsx", ".jsx", ".html", ".css", ".json", ".md", ".txt", ".yml", ".yaml", ".toml", ".sh", ".bat", ".env")
-    max_matches = 100
-    max_file_size = 500_000
-    matches: List[Dict[str, Any]] = []
+        return _to_json({"error": "pattern is required."})
     try:
-        for dirpath, _dirnames, filenames in os.walk(base_full):
-            if len(matches) >= max_matches:
-                break
-            rel_dir = os.path.relpath(dirpath, base_full) if dirpath != base_full else "."
-            for name in filenames:
-                if len(matches) >= max_matches:
-                    break
-                if not (name.endswith(text_ext) or "." not in name):
-                    continue
-                full_path = os.path.join(dirpath, name)
-                try:
-                    size = os.path.getsize(full_path)
-                    if size > max_file_size:
-                        continue
-                    with open(full_path, "r", encoding="utf-8", errors="replace") as f:
-                        for line_no, line in enumerate(f, 1):
-                            if pattern in line:
-                                rel_path = os.path.join(rel_dir, name) if rel_dir != "." else name
-                                matches.append({"path": rel_path.replace("\\", "/"), "line": line_no, "content": line.rstrip()[:200]})
-                                if len(matches) >= max_matches:
-                                    break
-                except (OSError, UnicodeDecodeError):
-                    continue
-        return json.dumps({"pattern": pattern, "path": path, "matches": matches})
+        matches = _search_patterns(base_full, [pattern], max_matches=100)[pattern]
+        return _to_json({"pattern": pattern, "path": path, "matches": matches})
     except Exception as e:
-        return json.dumps({"error": str(e)})
+        return _to_json({"error": str(e)})
+
+
+_HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@")
+
+
+def _replacement_diff(path: str, current: str, old_string: str, new_string: str, context_lines: int = 3) -> str:
+    """
+    Unified diff for replacing the first old_string with new_string. Only the lines around the
+    replacement are diffed (difflib is super-linear in file size); hunk headers use file line numbers.
+    """
+    idx = current.index(old_string)
+    new_content = current[:idx] + new_string + current[idx + len(old_string):]
+    old_lines = current.splitlines()
+    new_lines = new_content.splitlines()
+    # Lines before the match start and after the match end are identical in both versions
+    first = len(current[:idx].splitlines())
+    last = len(current[: idx + len(old_string)].splitlines())
+    lo = max(0, first - 1 - context_lines)
+    hi_old = min(len(old_lines), last + 1 + context_lines)
+    hi_new = hi_old + len(new_lines) - len(old_lines)
+    out = []
+    for line in difflib.unified_diff(
+        old_lines[lo:hi_old], new_lines[lo:hi_new], lineterm="", fromfile=path, tofile=path, n=context_lines
+    ):
+        m = _HUNK_HEADER_RE.match(line)
+        if m:
+            line = f"@@ -{int(m.group(1)) + lo}{m.group(2) or ''} +{int(m.group(3)) + lo}{m.group(4) or ''} @@"
+        out.append(line)
+    return "\n".join(out)
 
 
 def _tool_edit_file_preview(context: Dict[str, Any], path: str, old_string: str, new_string: str) -> Dict[str, Any]:
@@ -171,7 +212,7 @@ def _tool_edit_file_preview(context: Dict[str, Any], path: str, old_string: str,
     root = context.get("workspace_root") or ""
     if not root:
         return {PENDING_APPROVAL_KEY: True, "tool": "edit_file", "args": {"path": path, "old_string": old_string, "new_string": new_string}, "preview": "Workspace not configured.", "error": True}
-    full = _safe_path(root, path)
+    full = safe_path(root, path)
     if not full:
         return {PENDING_APPROVAL_KEY: True, "tool": "edit_file", "args": {"path": path, "old_string": old_string, "new_string": new_string}, "preview": "Path outside workspace.", "error": True}
     try:
@@ -181,28 +222,27 @@ def _tool_edit_file_preview(context: Dict[str, Any], path: str, old_string: str,
         return {PENDING_APPROVAL_KEY: True, "tool": "edit_file", "args": {"path": path, "old_string": old_string, "new_string": new_string}, "preview": f"Cannot read file: {e}", "error": True}
     if old_string not in current:
         return {PENDING_APPROVAL_KEY: True, "tool": "edit_file", "args": {"path": path, "old_string": old_string, "new_string": new_string}, "preview": "old_string not found in file (file may have changed).", "error": True}
-    new_content = current.replace(old_string, new_string, 1)
-    diff = "\n".join(difflib.unified_diff(current.splitlines(), new_content.splitlines(), lineterm="", fromfile=path, tofile=path))
+    diff = _replacement_diff(path, current, old_string, new_string)
     preview = diff[:4000] + ("..." if len(diff) > 4000 else "")
     return {PENDING_APPROVAL_KEY: True, "tool": "edit_file", "args": {"path": path, "old_string": old_string, "new_string": new_string}, "preview": preview}
 
 
 def _execute_edit_file(context: Dict[str, Any], path: str, old_string: str, new_string: str) -> str:
     """Actually perform the edit. Call after user approval."""
-    full = _safe_path(context.get("workspace_root") or "", path)
+    full = safe_path(context.get("workspace_root") or "", path)
     if not full:
-        return json.dumps({"error": "Path outside workspace or workspace not set."})
+        return _to_json({"error": "Path outside workspace or workspace not set."})
     try:
         with open(full, "r", encoding="utf-8", errors="replace") as f:
             content = f.read()
         if old_string not in content:
-            return json.dumps({"error": "old_string not found in file."})
+            return _to_json({"error": "old_string not found in file."})
         new_content = content.replace(old_string, new_string, 1)
         with open(full, "w", encoding="utf-8") as f:
             f.write(new_content)
-        return json.dumps({"path": path, "status": "updated"})
+        return _to_json({"path": path, "status": "updated"})
     except Exception as e:
-        return json.dumps({"error": str(e)})
+        return _to_json({"error": str(e)})
 
 
 def _extract_code_block(text: str) -> str:
@@ -221,36 +261,32 @@ def _tool_suggest_fix(context: Dict[str, Any], error: str, code: Optional[str] =
     """
     error = (error or "").strip()
     if not error:
-        return json.dumps({"error": "error is required (e.g. the traceback or error message)."})
+        return _to_json({"error": "error is required (e.g. the traceback or error message)."})
     code = (code or "").strip()
     if code:
-        prompt = f"""Fix this Python code that has an error:
+        prompt = f"""Fix this Python code. Reply with the fixed code in a code block (brief explanation after it at most).
 
 Code:
 {code}
 
 Error:
-{error}
-
-Provide the fixed code only (no explanation, or a brief one after the code). Use a code block."""
+{error}"""
     else:
-        prompt = f"""The following error occurred. Suggest fixed code or a command to resolve it.
+        prompt = f"""Suggest fixed code (in a code block) or a command to resolve this error.
 
 Error:
-{error}
-
-Provide the fix (use a code block for code, or clear instructions)."""
+{error}"""
 
     llm_type, llm = _get_llm()
     if not llm:
-        return json.dumps({"error": "No LLM configured. Set OPENAI_API_KEY or ANTHROPIC_API_KEY.", "suggested_fix": ""})
+        return _to_json({"error": "No LLM configured. Set OPENAI_API_KEY or ANTHROPIC_API_KEY.", "suggested_fix": ""})
     raw = _generate(llm_type, llm, prompt, max_tokens=1500)
     if not raw:
-        return json.dumps({"error": "LLM produced no response.", "suggested_fix": ""})
+        return _to_json({"error": "LLM produced no response.", "suggested_fix": ""})
     suggested = _extract_code_block(raw)
     if not suggested:
         suggested = raw[:2000].strip()
-    return json.dumps({"suggested_fix": suggested, "raw_preview": raw[:500]})
+    return _to_json({"suggested_fix": suggested, "raw_preview": raw[:500]})
 
 
 def _tool_run_terminal_preview(context: Dict[str, Any], command: str, cwd: Optional[str] = None) -> Dict[str, Any]:
@@ -274,11 +310,11 @@ def _execute_run_terminal(context: Dict[str, Any], command: str, cwd: Optional[s
     """Actually run the command. Call after user approval. Blocks dangerous commands."""
     blocked = _is_command_blocked(command)
     if blocked:
-        return json.dumps({"error": blocked})
+        return _to_json({"error": blocked})
     root = context.get("workspace_root") or ""
     run_cwd = root
     if cwd:
-        run_cwd = _safe_path(root, cwd) or root
+        run_cwd = safe_path(root, cwd) or root
     try:
         result = subprocess.run(
             command,
@@ -288,20 +324,19 @@ def _execute_run_terminal(context: Dict[str, Any], command: str, cwd: Optional[s
             text=True,
             timeout=60,
         )
-        return json.dumps({
+        return _to_json({
             "stdout": result.stdout[:8000],
             "stderr": result.stderr[:2000],
             "returncode": result.returncode,
         })
     except subprocess.TimeoutExpired:
-        return json.dumps({"error": "Command timed out after 60s."})
+        return _to_json({"error": "Command timed out after 60s."})
     except Exception as e:
-        return json.dumps({"error": str(e)})
+        return _to_json({"error": str(e)})
 
 
-def get_default_tools(context: Optional[Dict[str, Any]] = None) -> List[ToolSpec]:
-    """Tools available to the agent (read_file, edit_file, run_terminal, suggest_questions, generate_app, etc.)."""
-    context = context or {}
+def _build_default_tools() -> List[ToolSpec]:
+    """Build the default tool specs (called once at import; see _DEFAULT_TOOLS)."""
 
     def _suggest(ctx: Dict[str, Any], **kwargs: Any) -> str:
         msgs = kwargs.get("messages") or []
@@ -355,95 +390,232 @@ def get_default_tools(context: Optional[Dict[str, Any]] = None) -> List[ToolSpec
     ]
 
 
+# Tool specs don't depend on the request, so build them (and the lookup/description derived
+# from them) once instead of on every run_loop call.
+_DEFAULT_TOOLS: List[ToolSpec] = _build_default_tools()
+_DEFAULT_TOOL_MAP: Dict[str, ToolSpec] = {t["name"]: t for t in _DEFAULT_TOOLS}
+_DEFAULT_TOOL_DESCRIPTIONS = "\n".join(f"- {t['name']}: {t['description']}" for t in _DEFAULT_TOOLS)
+
+
+def get_default_tools(context: Optional[Dict[str, Any]] = None) -> List[ToolSpec]:
+    """Tools available to the agent (read_file, edit_file, run_terminal, suggest_questions, generate_app, etc.)."""
+    return list(_DEFAULT_TOOLS)
+
+
+def _keyword_context_lines(root: str, last_user: str) -> List[str]:
+    """Quick literal search for the first keywords of the last user message (no embeddings)."""
+    words = list(islice((w for w in last_user.replace(",", " ").split() if len(w) > 3), 2))
+    if not words:
+        return []
+    # One walk for both keywords; first keyword with hits wins
+    try:
+        hits_by_word = _search_patterns(os.path.normpath(root), words, max_matches=5)
+    except OSError:
+        return []
+    for w in words:
+        if hits_by_word.get(w):
+            return [
+                f"  {hit.get('path', '')}:{hit.get('line', '')} {hit.get('content', '')[:80]}"
+                for hit in hits_by_word[w]
+            ]
+    return []
+
+
+def _semantic_context_block(root: str, last_user: str) -> str:
+    """Semantic snippets (sentence_transformers); empty string when unavailable."""
+    try:
+        from app.services.semantic_context import format_semantic_block
+        return format_semantic_block(root, last_user, max_snippets=5)
+    except Exception as e:
+        logger.debug("Semantic context failed: %s", e)
+        return ""
+
+
 def _get_workspace_context_block(context: Dict[str, Any], messages: List[Dict[str, str]]) -> str:
-    """Build a short workspace context for the system prompt (Path 2 light: no embeddings)."""
+    """Build a short workspace context block appended to the agent prompt (Path 2 light: no embeddings)."""
     root = (context.get("workspace_root") or "").strip()
     if not root or not os.path.isdir(root):
         return ""
     lines = ["\nWorkspace context (workspace_root is set):"]
     try:
         entries = os.listdir(root)
-        # Top-level only, cap at 40 items
-        top = sorted(entries)[:40]
+        # Top-level only, cap at 40 items (partial sort: O(n log 40) for large directories)
+        top = heapq.nsmallest(40, entries)
         lines.append("Top-level files/dirs: " + ", ".join(top))
     except OSError:
         lines.append("(could not list workspace)")
-    # Optional: quick search using last user message keywords (no embeddings)
     last_user = None
     for m in reversed(messages):
         if m.get("role") == "user" and (m.get("content") or "").strip():
             last_user = (m.get("content") or "").strip()
             break
-    if last_user and context.get("inject_search_context") is not False:
-        words = [w for w in last_user.replace(",", " ").split() if len(w) > 3][:5]
-        if words:
-            for w in words[:2]:  # at most 2 quick searches
-                try:
-                    raw = _tool_search_files(context, w, ".")
-                    data = json.loads(raw)
-                    if data.get("matches"):
-                        for hit in data["matches"][:5]:
-                            lines.append(f"  {hit.get('path', '')}:{hit.get('line', '')} {hit.get('content', '')[:80]}")
-                        break  # one search is enough for context
-                except (json.JSONDecodeError, TypeError):
-                    pass
-    # Optional: semantic snippets (sentence_transformers); set context.use_semantic_context=True
-    if last_user and context.get("use_semantic_context"):
-        try:
-            from app.services.semantic_context import format_semantic_block
-            block = format_semantic_block(root, last_user, max_snippets=5)
-            if block:
-                lines.append(block)
-        except Exception as e:
-            logger.debug("Semantic context failed: %s", e)
-    return "\n".join(lines) if len(lines) > 1 else ""
+    if not last_user:
+        return "\n".join(lines)
+    # Optional: keyword search (default on) and semantic snippets (context.use_semantic_context=True)
+    want_search = context.get("inject_search_context") is not False
+    want_semantic = bool(context.get("use_semantic_context"))
+    semantic_block = ""
+    if want_search and want_semantic:
+        # Independent walks of the workspace: run them concurrently
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            search_future = pool.submit(_keyword_context_lines, root, last_user)
+            semantic_future = pool.submit(_semantic_context_block, root, last_user)
+            lines.extend(search_future.result())
+            semantic_block = semantic_future.result()
+    elif want_search:
+        lines.extend(_keyword_context_lines(root, last_user))
+    elif want_semantic:
+        semantic_block = _semantic_context_block(root, last_user)
+    if semantic_block:
+        lines.append(semantic_block)
+    return "\n".join(lines)
+
+
+# Substrings that identify a system turn produced by _build_system_prompt (either style)
+_SYSTEM_PROMPT_MARKERS = ("Reply with JSON only", "Output valid JSON only")
 
 
 def _build_system_prompt(
     context: Dict[str, Any],
     tool_descriptions: str,
     guidance_block: str,
-    workspace_block: str,
     approval_note: str,
 ) -> str:
-    """Build system prompt. Use context.agent_style == 'opus_like' for reasoning-first, strict JSON behavior."""
+    """
+    Build the static system prompt. Use context.agent_style == 'opus_like' for reasoning-first, strict JSON behavior.
+    Keep per-request data (workspace context) out of here so the prompt prefix stays byte-identical across calls
+    and provider prefix caching can hit; run_loop appends it after the conversation instead.
+    """
     if context.get("agent_style") == "opus_like":
         return f"""You are a precise coding and product assistant. Think step-by-step, then act. You have access to these tools:
 
 {tool_descriptions}
-{guidance_block}{workspace_block}
+{guidance_block}
 
 Rules:
 - Output valid JSON only. No markdown, no explanation outside the JSON.
 - Before every action: set "thought" to one short sentence explaining what you are doing and why.
 - To call a tool: {{"thought": "...", "tool": "tool_name", "args": {{...}}}}
   Use "messages" for the current conversation when a tool needs it (list of {{"role": "user"|"system", "content": "..."}}).
+- To run several read_file/list_dir/search_files calls at once: {{"thought": "...", "calls": [{{"tool": "read_file", "args": {{...}}}}, ...]}}
 - To reply to the user and finish: {{"thought": "...", "reply": "your reply text"}}
 - Keep thoughts and replies short. Prefer one tool call per step.{approval_note}"""
     # Default style
     return f"""You are a helpful coding and product assistant. You have access to these tools:
 
 {tool_descriptions}
-{guidance_block}{workspace_block}
+{guidance_block}
 
 Reply with JSON only. Either:
 1) To call a tool: {{"thought": "brief reasoning", "tool": "tool_name", "args": {{...}}}}
    Use "messages" for the current conversation when a tool needs it (list of {{"role": "user"|"system", "content": "..."}}).
+   To run several read_file/list_dir/search_files calls at once: {{"thought": "...", "calls": [{{"tool": "read_file", "args": {{...}}}}, ...]}}
 2) To reply to the user and finish: {{"thought": "brief reasoning", "reply": "your reply text"}}
 
 Be concise.{approval_note}"""
 
 
+class _ReplyFieldStreamer:
+    """Pull the "reply" string out of streamed JSON as it arrives and forward the decoded text."""
+
+    _START_RE = re.compile(r'"reply"\s*:\s*"')
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, on_text: Callable[[str], None]):
+        self.on_text = on_text
+        self._buf = ""
+        self._pos: Optional[int] = None  # next unread reply char in _buf; None until the field starts
+        self._done = False
+
+    def feed(self, chunk: str) -> None:
+        if self._done or not chunk:
+            return
+        self._buf += chunk
+        if self._pos is None:
+            m = self._START_RE.search(self._buf)
+            if not m:
+                return
+            self._pos = m.end()
+        buf, i, out = self._buf, self._pos, []
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._done = True
+                break
+            if ch == "\\":
+                if i + 1 >= len(buf):
+                    break  # escape split across chunks
+                esc = buf[i + 1]
+                if esc == "u":
+                    if i + 6 > len(buf):
+                        break
+                    try:
+                        out.append(chr(int(buf[i + 2 : i + 6], 16)))
+                    except ValueError:
+                        pass
+                    i += 6
+                    continue
+                out.append(self._ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
+        self._pos = i
+        if out:
+            self.on_text("".join(out))
+
+
+# Side-effect-free tools the model may batch in one step ("calls"); they run concurrently
+_PARALLEL_SAFE_TOOLS = ("read_file", "list_dir", "search_files")
+_MAX_PARALLEL_CALLS = 8
+
+
+def _invoke_tool(context: Dict[str, Any], tool_map: Dict[str, ToolSpec], tool_name: str, args: Dict[str, Any]) -> Any:
+    """Call a tool function; exceptions become a JSON error result."""
+    try:
+        return tool_map[tool_name]["function"](context, **args)
+    except Exception as e:
+        logger.exception("Tool %s failed", tool_name)
+        return _to_json({"error": str(e)})
+
+
+def _run_parallel_calls(
+    context: Dict[str, Any], tool_map: Dict[str, ToolSpec], calls: List[Any]
+) -> List[Dict[str, str]]:
+    """Run a batch of read-only tool calls concurrently; return one result turn per call, in request order."""
+    turns: List[Optional[Dict[str, str]]] = []
+    jobs = []
+    for call in calls[:_MAX_PARALLEL_CALLS]:
+        name = call.get("tool") if isinstance(call, dict) else None
+        if name not in _PARALLEL_SAFE_TOOLS or name not in tool_map:
+            turns.append({
+                "role": "system",
+                "content": f"[Invalid call: {name}. Batched calls allow: {list(_PARALLEL_SAFE_TOOLS)}]",
+            })
+            continue
+        jobs.append((len(turns), name, call.get("args") or {}))
+        turns.append(None)
+    if jobs:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [(i, name, pool.submit(_invoke_tool, context, tool_map, name, args)) for i, name, args in jobs]
+            for i, name, future in futures:
+                turns[i] = {"role": "system", "content": f"[Tool {name} result]: {future.result()}"}
+    return turns
+
+
 def run_loop(
     messages: List[Dict[str, str]],
     context: Optional[Dict[str, Any]] = None,
     tools: Optional[List[ToolSpec]] = None,
     max_turns: int = 5,
+    on_reply_chunk: Optional[Callable[[str], None]] = None,
 ) -> Tuple[List[Dict[str, str]], Optional[str], Optional[Dict[str, Any]], Optional[str]]:
     """
     Run the agent loop: LLM can call tools or return a final reply.
     Returns (updated_messages, final_reply_text, pending_approval, error_code).
     error_code when set: no_llm_configured, workspace_not_allowed, agent_timeout.
+    on_reply_chunk: if set, the LLM is streamed and the final reply text is passed to it as it is generated
+    (the full reply is still returned).
     """
     context = context or {}
     current = list(messages)
@@ -451,28 +623,29 @@ def run_loop(
 
     # Workspace allowlist (if configured)
     workspace_root = (context.get("workspace_root") or "").strip()
-    if workspace_root and not _validate_workspace_allowed(workspace_root):
+    if workspace_root and not validate_workspace_allowed(workspace_root):
         return current, "Workspace not allowed by server policy.", None, "workspace_not_allowed"
 
-    tools = tools or get_default_tools(context)
-    tool_map = {t["name"]: t for t in tools}
+    if tools:
+        tool_map = {t["name"]: t for t in tools}
+        tool_descriptions = "\n".join(f"- {t['name']}: {t['description']}" for t in tools)
+    else:
+        tool_map = _DEFAULT_TOOL_MAP
+        tool_descriptions = _DEFAULT_TOOL_DESCRIPTIONS
 
-    guidance_block = _get_codelearn_guidance_block(context)
     workspace_block = _get_workspace_context_block(context, messages)
-    tool_descriptions = "\n".join(
-        f"- {t['name']}: {t['description']}" for t in tools
-    )
 
     approval_note = " For file edits or running commands, use edit_file or run_terminal; the user will approve before they run."
     if context.get("autonomous"):
         approval_note = " Autonomous mode: edit_file and run_terminal will run immediately without asking."
 
-    system = _build_system_prompt(
-        context, tool_descriptions, "", workspace_block, approval_note
-    )
+    system = _build_system_prompt(context, tool_descriptions, "", approval_note)
 
+    # Reuse (or refresh) the system turn from a previous call so the prompt prefix is stable
     first_content = (current[0].get("content") or "") if current else ""
-    if not current or current[0].get("role") != "system" or "Reply with JSON only" not in first_content:
+    if current and current[0].get("role") == "system" and any(m in first_content for m in _SYSTEM_PROMPT_MARKERS):
+        current[0] = {"role": "system", "content": system}
+    else:
         current.insert(0, {"role": "system", "content": system})
 
     llm_type, llm = _get_llm()
@@ -480,39 +653,53 @@ def run_loop(
         return current, "I don't have an LLM configured. Set OPENAI_API_KEY or ANTHROPIC_API_KEY.", None, "no_llm_configured"
 
     loop_timeout_sec = getattr(settings, "AGENT_TIMEOUT_SECONDS", 120)
-    start_time = time.time()
+    start_time = time.monotonic()
 
+    # current only grows by appending inside the loop, so format each message once
+    conv_lines: List[str] = []
     for turn in range(max_turns):
-        if time.time() - start_time > loop_timeout_sec:
+        if time.monotonic() - start_time > loop_timeout_sec:
             return current, "Agent timed out. Please try a shorter conversation.", None, "agent_timeout"
 
-        conv_text = "\n".join(
-            f"{m['role'].upper()}: {m['content']}" for m in current
-        )
+        conv_lines.extend(f"{m['role'].upper()}: {m['content']}" for m in current[len(conv_lines):])
+        conv_text = "\n".join(conv_lines)
         prompt = f"""Current conversation:
 
 {conv_text}
+{workspace_block}
 
 Your next step (JSON only):"""
 
-        raw = _generate(llm_type, llm, prompt, max_tokens=600)
+        if on_reply_chunk is None:
+            raw = _generate(llm_type, llm, prompt, max_tokens=600)
+        else:
+            streamer = _ReplyFieldStreamer(on_reply_chunk)
+            parts: List[str] = []
+            for chunk in _generate_stream(llm_type, llm, prompt, max_tokens=600):
+                parts.append(chunk)
+                streamer.feed(chunk)
+            raw = "".join(parts)
         if not raw:
-            return current, "I couldn't generate a response. Check your LLM configuration.", None, None
+            return current, _NO_RESPONSE_REPLY, None, None
 
         json_str = _extract_json_object(raw.strip())
         if not json_str:
             if "reply" not in raw.lower() and "tool" not in raw.lower():
                 return current, raw[:1000], None, None
-            return current, "I didn't understand the response format.", None, None
+            return current, _BAD_FORMAT_REPLY, None, None
 
         try:
-            data = json.loads(json_str)
+            data = json_codec.loads(json_str)
         except json.JSONDecodeError:
-            return current, "I couldn't parse my own response. Please try again.", None, None
+            return current, _PARSE_ERROR_REPLY, None, None
 
         if data.get("reply"):
             return current, (data.get("reply") or "").strip(), None, None
 
+        if isinstance(data.get("calls"), list) and data["calls"]:
+            current.extend(_run_parallel_calls(context, tool_map, data["calls"]))
+            continue
+
         tool_name = data.get("tool")
         args = data.get("args") or {}
         if not tool_name or tool_name not in tool_map:
@@ -525,12 +712,7 @@ Your next step (JSON only):"""
         if tool_name in ("suggest_questions", "generate_app") and "messages" not in args:
             args["messages"] = [{"role": m["role"], "content": m["content"]} for m in current]
 
-        fn = tool_map[tool_name]["function"]
-        try:
-            result = fn(context, **args)
-        except Exception as e:
-            result = json.dumps({"error": str(e)})
-            logger.exception("Tool %s failed", tool_name)
+        result = _invoke_tool(context, tool_map, tool_name, args)
 
         if isinstance(result, dict) and result.get(PENDING_APPROVAL_KEY):
             if context.get("autonomous") and tool_name in ("edit_file", "run_terminal"):
@@ -556,7 +738,7 @@ Your next step (JSON only):"""
             "content": f"[Tool {tool_name} result]: {result}",
         })
 
-    return current, "I hit the turn limit. Please try a shorter conversation or rephrase.", None, None
+    return current, _TURN_LIMIT_REPLY, None, None
 
 
 def execute_pending_and_continue(
@@ -565,6 +747,7 @@ def execute_pending_and_continue(
     approved_tool: str,
     approved_args: Dict[str, Any],
     max_turns_after: int = 3,
+    on_reply_chunk: Optional[Callable[[str], None]] = None,
 ) -> Tuple[List[Dict[str, str]], Optional[str], Optional[Dict[str, Any]], Optional[str]]:
     """
     Execute an approved edit_file or run_terminal, append result to messages, run the loop again.
@@ -586,7 +769,7 @@ def execute_pending_and_continue(
             approved_args.get("cwd"),
         )
     else:
-        result_str = json.dumps({"error": f"Unknown tool: {approved_tool}"})
+        result_str = _to_json({"error": f"Unknown tool: {approved_tool}"})
 
     # Build state: use messages that the frontend sent (full history including system/tool turns)
     current = list(messages)
@@ -599,6 +782,7 @@ def execute_pending_and_continue(
         messages=current,
         context=context,
         max_turns=max_turns_after,
+        on_reply_chunk=on_reply_chunk,
     )  # returns 4-tuple; pass through
 
 
@@ -0,0 +1,110 @@
+"""
+Agent task metrics (agent_metrics table, one row per agent). The counters live off the agents row so task
+bookkeeping never writes the agent. refresh_agent_metrics rebuilds every row from tasks in one
+INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE (run periodically, see AGENT_METRICS_REFRESH_SECONDS);
+record_task_result bumps one row in between with server-side arithmetic, so concurrent workers never lose
+increments to an ORM read-modify-write. success_rate is a generated column and is never written here.
+"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.agent import Agent, AgentMetrics
+from app.models.task import Task, TaskStatus
+
+# Counted as pending: not finished yet (rejected / cancelled tasks are neither pending nor finished)
+_PENDING = (TaskStatus.PENDING, TaskStatus.AWAITING_APPROVAL, TaskStatus.APPROVED, TaskStatus.IN_PROGRESS)
+_COUNTERS = ("tasks_completed", "tasks_pending", "tasks_failed")
+
+
+def _upsert(db: Session):
+    """Dialect insert() with on_conflict_do_update (Postgres and SQLite share the ON CONFLICT syntax)."""
+    return pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+
+def refresh_agent_metrics(db: Session) -> int:
+    """
+    Recount every agent's tasks by status into agent_metrics in one statement. Idempotent, so several
+    workers may run it. Runs in the caller's transaction (caller commits). Returns the number of rows written.
+    """
+    # SQLite needs a WHERE on an upsert's SELECT (else ON CONFLICT parses as a join constraint)
+    counts = select(
+        Task.agent_id,
+        func.count(Task.id).filter(Task.status == TaskStatus.COMPLETED),
+        func.count(Task.id).filter(Task.status.in_(_PENDING)),
+        func.count(Task.id).filter(Task.status == TaskStatus.FAILED),
+        func.max(Task.completed_at),
+    ).where(Task.agent_id.is_not(None)).group_by(Task.agent_id)
+    stmt = _upsert(db)(AgentMetrics).from_select(["agent_id", *_COUNTERS, "last_active"], counts)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AgentMetrics.agent_id],
+        set_={
+            **{name: stmt.excluded[name] for name in _COUNTERS},
+            "last_active": func.coalesce(stmt.excluded.last_active, AgentMetrics.last_active),
+            "updated_at": func.now(),
+        },
+    )
+    return db.execute(stmt).rowcount
+
+
+def record_task_result(db: Session, agent_id: int, success: bool) -> bool:
+    """
+    Count one finished task for agent_id: completed or failed +1, pending -1 (not below 0), last_active = now.
+    Runs in the caller's transaction (caller commits). Returns False if the agent does not exist.
+    """
+    done, failed = (1, 0) if success else (0, 1)
+    source = select(Agent.id, literal(done), literal(0), literal(failed), func.now()).where(Agent.id == agent_id)
+    stmt = _upsert(db)(AgentMetrics).from_select(["agent_id", *_COUNTERS, "last_active"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AgentMetrics.agent_id],
+        set_={
+            "tasks_completed": AgentMetrics.tasks_completed + done,
+            "tasks_failed": AgentMetrics.tasks_failed + failed,
+            "tasks_pending": case((AgentMetrics.tasks_pending > 0, AgentMetrics.tasks_pending - 1), else_=0),
+            "last_active": func.now(),
+            "updated_at": func.now(),
+        },
+    )
+    return db.execute(stmt).rowcount == 1
+
+
+def fetch_agent_metrics(db: Session, user_id: Optional[int] = None) -> List[Any]:
+    """
+    Per-agent counters as lightweight rows (id, name, tasks_completed, tasks_failed, tasks_pending,
+    success_rate), selected in one query without hydrating Agent objects. Agents without a metrics row read 0.
+    """
+    stmt = (
+        select(
+            Agent.id,
+            Agent.name,
+            func.coalesce(AgentMetrics.tasks_completed, 0).label("tasks_completed"),
+            func.coalesce(AgentMetrics.tasks_failed, 0).label("tasks_failed"),
+            func.coalesce(AgentMetrics.tasks_pending, 0).label("tasks_pending"),
+            func.coalesce(AgentMetrics.success_rate, 0).label("success_rate"),
+        )
+        .outerjoin(AgentMetrics, AgentMetrics.agent_id == Agent.id)
+        .order_by(Agent.id)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Agent.user_id == user_id)
+    return list(db.execute(stmt))
+
+
+def agent_metrics_summary(db: Session, user_id: Optional[int] = None) -> Dict[str, int]:
+    """Totals across agents and the overall success rate, aggregated by the database in one round-trip."""
+    completed = func.coalesce(func.sum(AgentMetrics.tasks_completed), 0)
+    failed = func.coalesce(func.sum(AgentMetrics.tasks_failed), 0)
+    stmt = select(
+        func.count(Agent.id).label("agents"),
+        completed.label("tasks_completed"),
+        failed.label("tasks_failed"),
+        func.coalesce(func.sum(AgentMetrics.tasks_pending), 0).label("tasks_pending"),
+        # raw "/" so both dialects do integer division, matching the generated success_rate column
+        func.coalesce((completed * 100).op("/")(func.nullif(completed + failed, 0)), 0).label("success_rate"),
+    ).outerjoin(AgentMetrics, AgentMetrics.agent_id == Agent.id)
+    if user_id is not None:
+        stmt = stmt.where(Agent.user_id == user_id)
+    return {key: int(value) for key, value in db.execute(stmt).one()._mapping.items()}
@@ -2,20 +2,41 @@
 Builder service: conversation → spec → generated code (HTML/CSS/JS).
 Uses the same LLM config as the rest of the app (OpenAI, Anthropic, or local).
 """
+import hashlib
 import json
 import logging
 import re
+import threading
 import time
-from typing import Dict, Any, List
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional
 
+from app.core import json_codec
 from app.core.config import settings
 from app.core.local_llm import get_local_llm
+from app.services.llm_queue import get_llm_queue
 
 logger = logging.getLogger(__name__)
 
 LLM_MAX_RETRIES = 3
 LLM_RETRY_BACKOFF_BASE = 1.0  # seconds
 
+# Exact-match response cache: sha256(provider, model, prompt, max_tokens) -> text.
+# Only deterministic calls (temperature == 0) are cached; see _llm_cache_key.
+_llm_cache: "OrderedDict[str, str]" = OrderedDict()
+_llm_cache_lock = threading.Lock()
+_llm_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+# Extracted specs per conversation (JSON text), kept apart from the response cache so spec
+# lookups do not skew its hit/miss stats. Same rule: deterministic calls only.
+_SPEC_MEMO_MAX_ENTRIES = 256
+_spec_memo: "OrderedDict[str, str]" = OrderedDict()
+_spec_memo_lock = threading.Lock()
+
+# Semantic cache for free-form prompts (lazy; None until first use, False if unavailable)
+_semantic_cache = None
+
 
 # Try LangChain imports (optional for local-only setups)
 try:
@@ -40,6 +61,24 @@ class _MockLLM:
         )
 
 
+# Process-wide LangChain chat clients keyed by (provider, model, temperature, timeout):
+# constructing one builds an HTTP client, so reuse it across requests and agents.
+_llm_pool: Dict[tuple, Any] = {}
+_llm_pool_lock = threading.Lock()
+
+
+def _pooled_llm(key: tuple, factory):
+    """Return the pooled client for key, creating it with factory() on first use."""
+    llm = _llm_pool.get(key)
+    if llm is None:
+        with _llm_pool_lock:
+            llm = _llm_pool.get(key)
+            if llm is None:
+                llm = factory()
+                _llm_pool[key] = llm
+    return llm
+
+
 def _get_llm():
     """Return LLM instance (LangChain, local, or mock) with timeout from config."""
     timeout = getattr(settings, "LLM_REQUEST_TIMEOUT_SECONDS", 120)
@@ -49,31 +88,184 @@ def _get_llm():
             return ("local", local)
         logger.warning("Local LLM not available, falling back to API or mock")
     if LANGCHAIN_AVAILABLE and settings.OPENAI_API_KEY:
-        return ("openai", ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            temperature=0.5,
-            openai_api_key=settings.OPENAI_API_KEY,
-            timeout=timeout,
+        return ("openai", _pooled_llm(
+            ("openai", settings.OPENAI_MODEL, 0.5, timeout),
+            lambda: ChatOpenAI(
+                model=settings.OPENAI_MODEL,
+                temperature=0.5,
+                openai_api_key=settings.OPENAI_API_KEY,
+                timeout=timeout,
+            ),
         ))
     if LANGCHAIN_AVAILABLE and settings.ANTHROPIC_API_KEY:
-        return ("anthropic", ChatAnthropic(
-            model=settings.ANTHROPIC_MODEL,
-            temperature=0.5,
-            anthropic_api_key=settings.ANTHROPIC_API_KEY,
-            timeout=timeout,
+        return ("anthropic", _pooled_llm(
+            ("anthropic", settings.ANTHROPIC_MODEL, 0.5, timeout),
+            lambda: ChatAnthropic(
+                model=settings.ANTHROPIC_MODEL,
+                temperature=0.5,
+                anthropic_api_key=settings.ANTHROPIC_API_KEY,
+                timeout=timeout,
+            ),
         ))
     # No API keys and no local LLM: use mock so app runs without keys
     return ("local", _MockLLM())
 
 
+def _llm_cache_key(llm_type: str, llm, prompt: str, max_tokens: int) -> Optional[str]:
+    """Return the cache key for a deterministic call, or None when the call must not be cached."""
+    if getattr(llm, "temperature", None) != 0:
+        return None
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or ""
+    payload = json_codec.dumps_bytes(
+        {"provider": llm_type, "model": model, "prompt": prompt, "max_tokens": max_tokens},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _llm_cache_get(key: str) -> Optional[str]:
+    with _llm_cache_lock:
+        text = _llm_cache.get(key)
+        if text is None:
+            _llm_cache_stats["misses"] += 1
+            return None
+        _llm_cache.move_to_end(key)
+        _llm_cache_stats["hits"] += 1
+        return text
+
+
+def _llm_cache_put(key: str, text: str) -> None:
+    max_entries = getattr(settings, "LLM_CACHE_MAX_ENTRIES", 1024)
+    if max_entries <= 0:
+        return
+    with _llm_cache_lock:
+        _llm_cache[key] = text
+        _llm_cache.move_to_end(key)
+        while len(_llm_cache) > max_entries:
+            _llm_cache.popitem(last=False)
+
+
+def get_llm_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters and current size of the exact-match LLM response cache."""
+    with _llm_cache_lock:
+        return {**_llm_cache_stats, "size": len(_llm_cache)}
+
+
+def clear_llm_cache() -> None:
+    """Drop all cached LLM responses and memoized specs, and reset counters."""
+    with _llm_cache_lock:
+        _llm_cache.clear()
+        _llm_cache_stats["hits"] = 0
+        _llm_cache_stats["misses"] = 0
+    with _spec_memo_lock:
+        _spec_memo.clear()
+
+
 def _generate(llm_type: str, llm, prompt: str, max_tokens: int = 2000) -> str:
-    """Generate text from prompt with retries on transient failures."""
+    """Generate text from prompt with retries on transient failures. Deterministic calls are served from cache."""
     if not llm:
         return ""
+    cache_key = _llm_cache_key(llm_type, llm, prompt, max_tokens)
+    if cache_key is not None:
+        cached = _llm_cache_get(cache_key)
+        if cached is not None:
+            return cached
+    text = _generate_uncached(llm_type, llm, prompt, max_tokens)
+    if cache_key is not None and text:
+        _llm_cache_put(cache_key, text)
+    return text
+
+
+def _get_semantic_cache():
+    """Lazy-create the semantic cache when SEMANTIC_CACHE_ENABLED and an embedding model is available."""
+    global _semantic_cache
+    if not getattr(settings, "SEMANTIC_CACHE_ENABLED", False):
+        return None
+    if _semantic_cache is None:
+        from app.services.semantic_context import _get_model
+        from app.services.semantic_cache import SemanticCache
+        model = _get_model()
+        if model is None:
+            _semantic_cache = False  # don't retry the model load on every call
+        else:
+            _semantic_cache = SemanticCache(
+                lambda text: model.encode(text, convert_to_numpy=True),
+                threshold=getattr(settings, "SEMANTIC_CACHE_THRESHOLD", 0.92),
+                ttl=getattr(settings, "SEMANTIC_CACHE_TTL_SECONDS", 3600),
+            )
+    return _semantic_cache or None
+
+
+def _generate_semantic(llm_type: str, llm, prompt: str, max_tokens: int = 2000) -> str:
+    """Like _generate, but reuses a reply for a semantically equivalent prompt (free-form drafting only)."""
+    cache = _get_semantic_cache() if llm else None
+    if cache is not None:
+        cached = cache.lookup(prompt)
+        if cached is not None:
+            return cached
+    text = _generate(llm_type, llm, prompt, max_tokens=max_tokens)
+    if cache is not None and text:
+        cache.insert(prompt, text)
+    return text
+
+
+def _generate_stream(llm_type: str, llm, prompt: str, max_tokens: int = 2000) -> Iterator[str]:
+    """
+    Yield text chunks as the LLM produces them (local generate_stream or LangChain .stream).
+    Backends that can't stream yield the full _generate result as one chunk.
+    """
+    if not llm:
+        return
+    if llm_type == "local":
+        stream_fn = getattr(llm, "generate_stream", None)
+        llm_queue = get_llm_queue(llm) if stream_fn is not None else None
+        if llm_queue is not None:
+            stream_fn = llm_queue.generate_stream
+        if stream_fn is not None:
+            chunks = lambda: stream_fn(prompt, max_tokens=max_tokens)
+        else:
+            chunks = None
+    elif hasattr(llm, "stream"):
+        chunks = lambda: (getattr(c, "content", c) for c in llm.stream(prompt))
+    else:
+        chunks = None
+    if chunks is None:
+        text = _generate(llm_type, llm, prompt, max_tokens=max_tokens)
+        if text:
+            yield text
+        return
+    cache_key = _llm_cache_key(llm_type, llm, prompt, max_tokens)
+    if cache_key is not None:
+        cached = _llm_cache_get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    parts: List[str] = []
+    try:
+        for chunk in chunks():
+            if chunk:
+                parts.append(chunk)
+                yield chunk
+    except Exception as e:
+        logger.warning("LLM stream failed after %s chunks: %s", len(parts), e)
+        if not parts:
+            # Nothing shown yet: fall back to the retrying non-streaming path
+            text = _generate(llm_type, llm, prompt, max_tokens=max_tokens)
+            if text:
+                yield text
+            return
+    if cache_key is not None and parts:
+        _llm_cache_put(cache_key, "".join(parts))
+
+
+def _generate_uncached(llm_type: str, llm, prompt: str, max_tokens: int) -> str:
     last_error = None
     for attempt in range(LLM_MAX_RETRIES):
         try:
             if llm_type == "local":
+                llm_queue = get_llm_queue(llm)
+                if llm_queue is not None:
+                    return llm_queue.generate(prompt, max_tokens=max_tokens)
                 return llm.generate(prompt, max_tokens=max_tokens)
             if hasattr(llm, "invoke"):
                 return llm.invoke(prompt).content
@@ -88,29 +280,71 @@ def _generate(llm_type: str, llm, prompt: str, max_tokens: int = 2000) -> str:
     return ""
 
 
+# Bump when the spec prompt or parsing changes so memoized specs are not reused
+_SPEC_CACHE_VERSION = 1
+
+
+def _spec_cache_key(llm_type: str, llm, conv_text: str) -> Optional[str]:
+    """Memo key for conversation_to_spec (provider, model, whitespace-normalized conversation), or None when sampling."""
+    if getattr(llm, "temperature", None) != 0:
+        return None
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or ""
+    payload = json_codec.dumps_bytes(
+        ["spec", _SPEC_CACHE_VERSION, llm_type, str(model), " ".join(conv_text.split())]
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _spec_memo_get(key: Optional[str]) -> Optional[str]:
+    if key is None:
+        return None
+    with _spec_memo_lock:
+        text = _spec_memo.get(key)
+        if text is not None:
+            _spec_memo.move_to_end(key)
+        return text
+
+
+def _spec_memo_put(key: Optional[str], text: str) -> None:
+    if key is None:
+        return
+    with _spec_memo_lock:
+        _spec_memo[key] = text
+        _spec_memo.move_to_end(key)
+        while len(_spec_memo) > _SPEC_MEMO_MAX_ENTRIES:
+            _spec_memo.popitem(last=False)
+
+
 def conversation_to_spec(messages: List[Dict[str, str]]) -> Dict[str, Any]:
     """
     Turn conversation history into a structured project spec using the LLM.
     Returns dict with: name, type, features, persistence, theme, ui_complexity.
+    With a deterministic LLM (temperature 0) specs are memoized per conversation, so regenerating
+    from the same conversation skips the extraction call.
     """
     conv_text = "\n".join(
         f"{m['role'].upper()}: {m['content']}" for m in messages
     )
-    prompt = f"""You are a product analyst. Based on this conversation about building a web app, extract a project spec.
+    llm_type, llm = _get_llm()
+    cache_key = _spec_cache_key(llm_type, llm, conv_text)
+    cached = _spec_memo_get(cache_key)
+    if cached is not None:
+        return json_codec.loads(cached)  # fresh dict; callers may modify it
+
+    prompt = f"""Extract a web app project spec from this conversation.
 
 Conversation:
 {conv_text}
 
-Reply with ONLY a JSON object (no markdown, no explanation) with exactly these keys:
-- "name": short app name (e.g. "ReadingTracker")
-- "type": one of "dashboard", "tracker", "notes", "todo", "library", "app"
-- "features": list of feature keywords, e.g. ["tracking", "list management", "reminders", "search", "visualization", "theming", "export", "categorization", "streaks"]
-- "persistence": "localStorage" or "session" or "none"
-- "theme": "light" or "dark" or "system"
-- "ui_complexity": "minimal" or "rich"
+Reply with ONLY a JSON object (no markdown) with these keys:
+name: short app name, e.g. "ReadingTracker"
+type: dashboard|tracker|notes|todo|library|app
+features: list of keywords, e.g. tracking, list management, reminders, search, visualization, theming, export, categorization, streaks
+persistence: localStorage|session|none
+theme: light|dark|system
+ui_complexity: minimal|rich
 
 JSON:"""
-    llm_type, llm = _get_llm()
     raw = _generate(llm_type, llm, prompt, max_tokens=600)
     if not raw:
         return _default_spec(messages)
@@ -119,18 +353,20 @@ JSON:"""
     if not json_str:
         return _default_spec(messages)
     try:
-        spec = json.loads(json_str)
-        return {
-            "name": spec.get("name", "MyApp"),
-            "type": spec.get("type", "app"),
-            "features": spec.get("features", []),
-            "persistence": spec.get("persistence", "localStorage"),
-            "theme": spec.get("theme", "dark"),
-            "ui_complexity": spec.get("ui_complexity", "minimal"),
-        }
+        spec = json_codec.loads(json_str)
     except json.JSONDecodeError:
         logger.warning("Could not parse spec JSON, using defaults")
         return _default_spec(messages)
+    result = {
+        "name": spec.get("name", "MyApp"),
+        "type": spec.get("type", "app"),
+        "features": spec.get("features", []),
+        "persistence": spec.get("persistence", "localStorage"),
+        "theme": spec.get("theme", "dark"),
+        "ui_complexity": spec.get("ui_complexity", "minimal"),
+    }
+    _spec_memo_put(cache_key, json_codec.dumps(result))
+    return result
 
 
 def _extract_json_object(raw: str) -> str:
@@ -154,45 +390,55 @@ def _extract_json_object(raw: str) -> str:
     return ""
 
 
+# Keyword -> app type (from Synthesis analyzeInput + special_project patterns)
+_TYPE_HINTS = (
+    (("dashboard", "overview", "summary", "day at a glance"), "dashboard"),
+    (("tracker", "tracking", "log", "habit", "streak"), "tracker"),
+    (("note", "notes", "writing", "memo"), "notes"),
+    (("todo", "task", "checklist", "to-do"), "todo"),
+    (("reading", "book", "library"), "library"),
+)
+
+# Feature keywords (from Synthesis featurePatterns)
+_FEATURE_KEYWORDS = (
+    (("track", "tracking", "monitor"), "tracking"),
+    (("list", "collection", "organize"), "list management"),
+    (("remind", "notification", "alert"), "reminders"),
+    (("search", "find", "filter"), "search"),
+    (("chart", "graph", "visual", "stats"), "visualization"),
+    (("dark", "theme", "light mode"), "theming"),
+    (("export", "download", "backup"), "export"),
+    (("tag", "category", "label"), "categorization"),
+    (("streak", "habit", "daily"), "streaks"),
+)
+
+# Every type/feature keyword, deduplicated. Each is checked on its own (`k in text`): keywords overlap
+# ("track" in "tracker", "list" in "checklist"), so a single alternation would hide the shorter ones.
+_SPEC_KEYWORDS = tuple({k for group in (_TYPE_HINTS, _FEATURE_KEYWORDS) for ks, _ in group for k in ks})
+
+
 def _default_spec(messages: List[Dict[str, str]]) -> Dict[str, Any]:
     """Fallback spec when LLM is unavailable or parse fails. Uses keyword detection (from Synthesis + ai-service pattern)."""
     name = "MyApp"
     all_text = " ".join(m.get("content", "") for m in messages).lower()
     if messages:
         first = messages[0].get("content", "")[: 80]
-        words = [w for w in first.split() if len(w) > 2][:2]
+        words = list(islice((w for w in first.split() if len(w) > 2), 2))
         if words:
             name = "".join(w.capitalize() for w in words)
 
-    # Keyword -> app type (from Synthesis analyzeInput + special_project patterns)
-    type_hints = [
-        (["dashboard", "overview", "summary", "day at a glance"], "dashboard"),
-        (["tracker", "tracking", "log", "habit", "streak"], "tracker"),
-        (["note", "notes", "writing", "memo"], "notes"),
-        (["todo", "task", "checklist", "to-do"], "todo"),
-        (["reading", "book", "library"], "library"),
-    ]
+    # Each keyword is searched once; the hint tables are then checked against a set
+    found = {k for k in _SPEC_KEYWORDS if k in all_text}
+
     app_type = "app"
-    for keywords, t in type_hints:
-        if any(k in all_text for k in keywords):
+    for keywords, t in _TYPE_HINTS:
+        if not found.isdisjoint(keywords):
             app_type = t
             break
 
-    # Feature keywords (from Synthesis featurePatterns)
-    feature_keywords = [
-        (["track", "tracking", "monitor"], "tracking"),
-        (["list", "collection", "organize"], "list management"),
-        (["remind", "notification", "alert"], "reminders"),
-        (["search", "find", "filter"], "search"),
-        (["chart", "graph", "visual", "stats"], "visualization"),
-        (["dark", "theme", "light mode"], "theming"),
-        (["export", "download", "backup"], "export"),
-        (["tag", "category", "label"], "categorization"),
-        (["streak", "habit", "daily"], "streaks"),
-    ]
     features = []
-    for keywords, feat in feature_keywords:
-        if any(k in all_text for k in keywords) and feat not in features:
+    for keywords, feat in _FEATURE_KEYWORDS:
+        if not found.isdisjoint(keywords) and feat not in features:
             features.append(feat)
     if not features:
         features = ["list management", "tracking"]
@@ -256,21 +502,11 @@ def spec_to_code(spec: Dict[str, Any]) -> Dict[str, str]:
         files = _template_code(name, app_type, features, persistence, theme, ui)
     else:
         # Single prompt for all three files to keep context
-        prompt = f"""You are a front-end developer. Generate a complete, working single-page web app as three files.
-
-Spec:
-- App name: {name}
-- App type: {app_type}
-- Features: {", ".join(features)}
-- Data: {persistence} (use localStorage if "localStorage", else in-memory)
-- Theme: {theme}
-- UI: {ui}
-
-Rules:
-- Plain HTML/CSS/JS only. No frameworks. No build step.
-- index.html: one file, include <link rel="stylesheet" href="styles.css"> and <script src="app.js"></script>.
-- styles.css: complete styles; use CSS variables for colors; support dark theme if theme is dark.
-- app.js: implement the core feature (e.g. add/list/delete items for a tracker, with {persistence} if applicable). Use DOM APIs. No placeholder comments.
+        prompt = f"""Generate a complete, working single-page web app as three files.
+
+Spec: name={name}; type={app_type}; features={", ".join(features)}; data={persistence} (localStorage if "localStorage", else in-memory); theme={theme}; UI={ui}
+
+Rules: plain HTML/CSS/JS, no frameworks or build step. index.html links styles.css and app.js. styles.css uses CSS variables for colors (dark theme if theme is dark). app.js implements the core feature with DOM APIs (e.g. add/list/delete items, {persistence} if applicable); no placeholder comments.
 
 Reply in this exact format (no other text):
 ===INDEX.HTML===
@@ -400,7 +636,7 @@ def build_conversation_summary(messages: List[Dict[str, str]], max_len: int = 50
     """Short summary of the conversation for storage."""
     if not messages:
         return ""
-    parts = [m["content"][:200] for m in messages[:5]]
+    parts = [m["content"][:200] for m in islice(messages, 5)]
     summary = " | ".join(parts)
     return summary[:max_len] if len(summary) > max_len else summary
 
@@ -442,18 +678,18 @@ def suggest_questions(messages: List[Dict[str, str]], max_questions: int = 2) ->
 
     llm_type, llm = _get_llm()
     if llm:
-        prompt = f"""You are a product analyst helping someone describe a web app idea. Based on this short conversation, suggest exactly {max_questions} short follow-up questions to clarify what they want. Questions should be practical (e.g. who will use it, persistence, must-have feature). Reply with ONLY a JSON array of strings, e.g. ["Question one?", "Question two?"]. No other text.
+        prompt = f"""Suggest exactly {max_questions} short, practical follow-up questions (e.g. users, persistence, must-have feature) to clarify this web app idea. Reply with ONLY a JSON array of strings.
 
 Conversation:
 {conv_text}
 
-JSON array of {max_questions} questions:"""
-        raw = _generate(llm_type, llm, prompt, max_tokens=200)
+JSON array:"""
+        raw = _generate_semantic(llm_type, llm, prompt, max_tokens=200)
         if raw:
             json_str = _extract_json_array(raw)
             if json_str:
                 try:
-                    arr = json.loads(json_str)
+                    arr = json_codec.loads(json_str)
                     if isinstance(arr, list):
                         return [str(q) for q in arr[:max_questions] if q]
                 except json.JSONDecodeError:
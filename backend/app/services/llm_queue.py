@@ -0,0 +1,101 @@
+"""
+Request queue in front of the in-process local LLM (GPT4All, llama.cpp).
+These backends decode one sequence at a time and are not safe to call from several threads, so
+concurrent generate and stream calls are queued and run one after another by a single worker thread.
+Each caller is released as soon as its own request finishes (streams get chunks as they are decoded).
+Ollama is a server that schedules concurrent requests itself, so it bypasses the queue.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Backends that run the model inside this process
+IN_PROCESS_BACKENDS = ("gpt4all", "llama-cpp")
+
+_STREAM_END = object()
+
+
+class LLMRequestQueue:
+    """Runs queued generate / generate_stream calls on one worker thread, in arrival order."""
+
+    def __init__(self, llm: Any):
+        self.llm = llm
+        self._queue: "queue.Queue[Callable[[], None]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="llm-queue", daemon=True)
+        self._worker.start()
+
+    def generate(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """Queue prompt and block until it has been generated."""
+        future: Future = Future()
+
+        def job() -> None:
+            try:
+                future.set_result(self.llm.generate(prompt, max_tokens=max_tokens))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._queue.put(job)
+        return future.result()
+
+    def generate_stream(self, prompt: str, max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Queue prompt and yield its chunks as they are decoded. Closing the iterator stops the decode."""
+        chunks: "queue.Queue[Any]" = queue.Queue()
+        cancelled = threading.Event()
+
+        def job() -> None:
+            try:
+                for chunk in self.llm.generate_stream(prompt, max_tokens=max_tokens):
+                    if cancelled.is_set():
+                        break
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(_STREAM_END)
+
+        self._queue.put(job)
+        try:
+            while True:
+                item = chunks.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                job()
+            except Exception as e:  # jobs report their own errors; never let the worker die
+                logger.error("Queued LLM request failed: %s", e)
+
+
+_llm_queue: Optional[LLMRequestQueue] = None
+_llm_queue_lock = threading.Lock()
+
+
+def get_llm_queue(llm: Any) -> Optional[LLMRequestQueue]:
+    """
+    Return the process-wide request queue for llm when LOCAL_LLM_SERIALIZE is on and llm runs in-process;
+    None means call llm directly.
+    """
+    global _llm_queue
+    if not getattr(settings, "LOCAL_LLM_SERIALIZE", True):
+        return None
+    if getattr(llm, "backend", None) not in IN_PROCESS_BACKENDS:
+        return None
+    if _llm_queue is None:
+        with _llm_queue_lock:
+            if _llm_queue is None:
+                _llm_queue = LLMRequestQueue(llm)
+    return _llm_queue if _llm_queue.llm is llm else None
@@ -0,0 +1,143 @@
+"""
+Download zips of generated projects: streamed member by member, or deflated once into a private on-disk cache
+(BUILD_ZIP_CACHE_DIR, bounded by BUILD_ZIP_CACHE_MAX_MB) keyed by project id and content hash.
+"""
+import hashlib
+import logging
+import os
+import stat
+import tempfile
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.core import json_codec
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _ZipChunkSink:
+    """Unseekable write target for ZipFile; collects bytes until drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(files: Dict[str, str], compresslevel: int = 1) -> Iterator[bytes]:
+    """Yield a zip of files member by member, so only one compressed file is buffered at a time."""
+    sink = _ZipChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
+        for filename, content in files.items():
+            zf.writestr(filename, content)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()  # central directory, written on close
+
+
+def _zip_cache_root() -> str:
+    return getattr(settings, "BUILD_ZIP_CACHE_DIR", "") or os.path.join(tempfile.gettempdir(), "agentic_ai_project_zips")
+
+
+def _zip_cache_dir() -> Optional[str]:
+    """The zip cache directory, created private (0700) if missing; None if it cannot be used."""
+    cache_dir = _zip_cache_root()
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if not getattr(settings, "BUILD_ZIP_CACHE_DIR", "") and hasattr(os, "getuid"):
+            # Default dir sits in the shared temp dir: refuse one that another user created or opened up
+            st = os.lstat(cache_dir)
+            if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+                raise OSError(f"{cache_dir} is not a private directory of this user")
+    except OSError as e:
+        logger.warning("Project zip cache unavailable (%s); streaming instead", e)
+        return None
+    return cache_dir
+
+
+def _prune_zip_cache(cache_dir: str, keep: str) -> None:
+    """Delete the least recently used zips (oldest mtime) until the cache fits BUILD_ZIP_CACHE_MAX_MB."""
+    limit = getattr(settings, "BUILD_ZIP_CACHE_MAX_MB", 512) * 1024 * 1024
+    if limit <= 0:
+        return
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".zip"):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # removed concurrently
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def cached_zip_path(project_id: int, files: Dict[str, str]) -> Optional[str]:
+    """
+    Path of the zip for a project's files, deflated once and stored under the project id and content hash
+    (so it never goes stale and is found again when the project is deleted). None if the cache is unusable.
+    """
+    cache_dir = _zip_cache_dir()
+    if cache_dir is None:
+        return None
+    digest = hashlib.sha256(json_codec.dumps_bytes(files, sort_keys=True)).hexdigest()
+    path = os.path.join(cache_dir, f"{project_id}-{digest}.zip")
+    try:
+        os.utime(path)  # hit: mark it recently used, so eviction drops the coldest zips first
+        return path
+    except OSError:
+        pass
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter_zip(files, compresslevel=9):
+                    f.write(chunk)
+            os.replace(tmp_path, path)  # atomic: concurrent downloads never see a partial file
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        _prune_zip_cache(cache_dir, keep=path)
+    except OSError as e:
+        logger.warning("Project zip cache unavailable (%s); streaming instead", e)
+        return None
+    return path
+
+
+def discard_project_zips(project_ids: Iterable[int]) -> None:
+    """Delete the cached download zips of deleted projects (call after the delete commits)."""
+    names = {str(project_id) for project_id in project_ids}
+    if not names:
+        return
+    try:
+        with os.scandir(_zip_cache_root()) as it:
+            paths = [e.path for e in it if e.name.endswith(".zip") and e.name.partition("-")[0] in names]
+    except OSError:
+        return  # no cache directory yet
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
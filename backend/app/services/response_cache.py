@@ -0,0 +1,135 @@
+"""
+Short-lived cache for serialized API responses (agent chat replies that did not touch the workspace).
+Backends: in-process LRU with TTL (default) or Redis (CHAT_CACHE_BACKEND=redis, uses REDIS_URL) so
+replicas share hits. Redis is optional: when the package is missing or the server is unreachable the
+in-process backend is used instead.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from app.core import json_codec
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_REDIS_AVAILABLE = False
+try:
+    import redis
+    _REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+
+_KEY_PREFIX = "resp:"
+
+
+def response_cache_key(namespace: str, payload: Any) -> str:
+    """Stable key for a JSON-serializable request payload."""
+    digest = hashlib.sha256(json_codec.dumps_bytes(payload, sort_keys=True)).hexdigest()
+    return f"{_KEY_PREFIX}{namespace}:{digest}"
+
+
+class ResponseCache:
+    """get/set of bytes with a TTL. ttl <= 0 disables the cache."""
+
+    def __init__(self, ttl: int, max_entries: int = 512, redis_client: Any = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._redis = redis_client
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        if self._redis is not None:
+            try:
+                return self._redis.get(key)
+            except Exception as e:
+                logger.debug("Response cache read failed: %s", e)
+                return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if not self.enabled:
+            return
+        if self._redis is not None:
+            try:
+                self._redis.setex(key, self.ttl, value)
+            except Exception as e:
+                logger.debug("Response cache write failed: %s", e)
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        if self._redis is not None:
+            try:
+                self._redis.delete(key)
+            except Exception as e:
+                logger.debug("Response cache delete failed: %s", e)
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _redis_client():
+    """Connected Redis client for REDIS_URL, or None (package missing / server unreachable)."""
+    if not _REDIS_AVAILABLE:
+        logger.warning("CHAT_CACHE_BACKEND=redis but the redis package is not installed; using in-process cache")
+        return None
+    try:
+        client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        client.ping()
+        return client
+    except Exception as e:
+        logger.warning("Redis at REDIS_URL unreachable (%s); using in-process response cache", e)
+        return None
+
+
+def make_response_cache(ttl: int, max_entries: int = 512) -> ResponseCache:
+    """ResponseCache on the configured CHAT_CACHE_BACKEND (Redis when selected and reachable)."""
+    client = None
+    if ttl > 0 and getattr(settings, "CHAT_CACHE_BACKEND", "memory") == "redis":
+        client = _redis_client()
+    return ResponseCache(ttl=ttl, max_entries=max_entries, redis_client=client)
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache configured from CHAT_CACHE_* settings."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = make_response_cache(
+                    ttl=getattr(settings, "CHAT_CACHE_TTL_SECONDS", 3600),
+                    max_entries=getattr(settings, "CHAT_CACHE_MAX_ENTRIES", 512),
+                )
+    return _response_cache
@@ -0,0 +1,125 @@
+"""
+Semantic response cache: reuse an LLM reply when a new prompt means the same thing as a cached one.
+Prompts are embedded (e.g. sentence-transformers via semantic_context) and matched by cosine similarity.
+Optional: lookups miss when numpy is not installed or the embedding call fails.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    _NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 512
+
+
+class SemanticCache:
+    """
+    In-memory semantic cache. Vectors are L2-normalized on insert, so one matrix-vector
+    product scores every entry by cosine similarity.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Any],
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl: int = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Parallel columns: row i of _vectors and _expiry (float64 monotonic deadline) belongs to _responses[i]
+        self._vectors = None
+        self._expiry = None
+        self._responses: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def _embed(self, text: str):
+        """Return a unit-length float32 vector, or None if embedding is unavailable."""
+        if not _NUMPY_AVAILABLE or not text:
+            return None
+        try:
+            vec = np.asarray(self.embed_fn(text), dtype=np.float32).ravel()
+        except Exception as e:
+            logger.debug("Semantic cache embedding failed: %s", e)
+            return None
+        norm = float(np.linalg.norm(vec))
+        if norm == 0.0:
+            return None
+        return vec / norm
+
+    def _evict_expired(self, now: float) -> None:
+        if self._expiry is None:
+            return
+        live = self._expiry > now
+        if live.all():
+            return
+        keep = np.flatnonzero(live)
+        if keep.size == 0:
+            self._clear_unlocked()
+            return
+        self._responses = [self._responses[i] for i in keep]
+        self._expiry = self._expiry[keep]
+        self._vectors = self._vectors[keep]
+
+    def lookup(self, prompt: str) -> Optional[str]:
+        """Return the cached response for the most similar prompt if similarity >= threshold."""
+        vec = self._embed(prompt)
+        if vec is None:
+            return None
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            if self._vectors is None or self._vectors.shape[1] != vec.shape[0]:
+                return None
+            scores = self._vectors @ vec
+            best = int(np.argmax(scores))
+            if float(scores[best]) >= self.threshold:
+                return self._responses[best]
+        return None
+
+    def insert(self, prompt: str, response: str) -> None:
+        """Cache response under prompt's embedding. Oldest entries are dropped past max_entries."""
+        if not response or self.max_entries <= 0:
+            return
+        vec = self._embed(prompt)
+        if vec is None:
+            return
+        with self._lock:
+            if self._vectors is not None and self._vectors.shape[1] != vec.shape[0]:
+                self._clear_unlocked()
+            row = vec.reshape(1, -1)
+            expiry = np.array([time.monotonic() + self.ttl])
+            if self._vectors is None:
+                self._vectors, self._expiry = row, expiry
+            else:
+                self._vectors = np.vstack([self._vectors, row])
+                self._expiry = np.concatenate([self._expiry, expiry])
+            self._responses.append(response)
+            overflow = len(self._responses) - self.max_entries
+            if overflow > 0:
+                self._vectors = self._vectors[overflow:]
+                self._responses = self._responses[overflow:]
+                self._expiry = self._expiry[overflow:]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_unlocked()
+
+    def _clear_unlocked(self) -> None:
+        self._vectors = None
+        self._expiry = None
+        self._responses = []
@@ -13,6 +13,7 @@ _SENTENCE_TRANSFORMERS_AVAILABLE = False
 _embed_model = None
 
 try:
+    import numpy as np
     from sentence_transformers import SentenceTransformer
     _SENTENCE_TRANSFORMERS_AVAILABLE = True
 except ImportError:
@@ -60,7 +61,7 @@ def get_semantic_snippets(workspace_root: str, query: str, max_snippets: int = _
             for name in filenames:
                 if len(snippets) >= _MAX_FILES:
                     break
-                if not any(name.endswith(ext) for ext in _SNIPPET_EXT):
+                if not name.endswith(_SNIPPET_EXT):
                     continue
                 full = os.path.join(dirpath, name)
                 try:
@@ -78,19 +79,25 @@ def get_semantic_snippets(workspace_root: str, query: str, max_snippets: int = _
     if not snippets:
         return []
 
-    paths = [s[0] for s in snippets]
     texts = [s[1] for s in snippets]
     try:
-        query_emb = model.encode(query, convert_to_numpy=True)
-        text_embs = model.encode(texts, convert_to_numpy=True)
-        # Cosine similarity (vectors are normalized by default)
-        scores = (text_embs @ query_emb).tolist()
-        scored = list(zip(paths, texts, scores))
-        scored.sort(key=lambda x: x[2], reverse=True)
-        return scored[:max_snippets]
+        # One encode call for query + snippets (row 0 is the query)
+        embs = model.encode([query] + texts, convert_to_numpy=True, normalize_embeddings=True)
     except Exception as e:
         logger.debug("Semantic snippet search failed: %s", e)
         return []
+    return _top_snippets(snippets, embs[1:] @ embs[0], max_snippets)
+
+
+def _top_snippets(snippets: List[Tuple[str, str]], scores, k: int) -> List[Tuple[str, str, float]]:
+    """Top-k (path, text, score) by cosine score: argpartition selects k in O(n), only those k are sorted."""
+    k = min(k, len(snippets))
+    if k <= 0:
+        return []
+    scores = np.asarray(scores, dtype=np.float32)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(snippets[i][0], snippets[i][1], float(scores[i])) for i in top]
 
 
 def format_semantic_block(workspace_root: str, query: str, max_snippets: int = _MAX_SNIPPETS) -> str:
@@ -0,0 +1,56 @@
+"""
+Task state transitions (tasks table): approve, reject and cancel many tasks at once.
+Each call is a single UPDATE ... WHERE id IN (...) RETURNING id scoped to the owner and the allowed
+source states, so N tasks cost one round-trip and a concurrent transition can never be applied twice.
+A single task is just a one-element list.
+"""
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.models.task import Task, TaskStatus
+
+# Tasks that have not started running yet can still be cancelled
+_CANCELLABLE = (TaskStatus.PENDING, TaskStatus.AWAITING_APPROVAL, TaskStatus.APPROVED)
+
+
+def _transition(
+    db: Session,
+    user_id: int,
+    task_ids: Iterable[int],
+    from_statuses: Tuple[TaskStatus, ...],
+    to_status: TaskStatus,
+    **values,
+) -> List[int]:
+    ids = sorted(set(task_ids))
+    if not ids:
+        return []
+    stmt = (
+        update(Task)
+        .where(Task.id.in_(ids), Task.user_id == user_id, Task.status.in_(from_statuses))
+        .values(status=to_status, updated_at=func.now(), **values)
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+    return sorted(db.execute(stmt).scalars())
+
+
+def approve_tasks(db: Session, user_id: int, task_ids: Iterable[int]) -> List[int]:
+    """
+    Approve user_id's tasks that are awaiting approval (approved_at = now). Runs in the caller's
+    transaction (caller commits). Returns the ids that changed; others were missing, not owned or in another state.
+    """
+    return _transition(
+        db, user_id, task_ids, (TaskStatus.AWAITING_APPROVAL,), TaskStatus.APPROVED, approved_at=func.now()
+    )
+
+
+def reject_tasks(db: Session, user_id: int, task_ids: Iterable[int]) -> List[int]:
+    """Reject user_id's tasks that are awaiting approval. Same contract as approve_tasks."""
+    return _transition(db, user_id, task_ids, (TaskStatus.AWAITING_APPROVAL,), TaskStatus.REJECTED)
+
+
+def cancel_tasks(db: Session, user_id: int, task_ids: Iterable[int]) -> List[int]:
+    """Cancel user_id's tasks that have not started (pending, awaiting approval, approved). Same contract as approve_tasks."""
+    return _transition(db, user_id, task_ids, _CANCELLABLE, TaskStatus.CANCELLED)
@@ -0,0 +1,49 @@
+"""
+Workspace path rules shared by the IDE workspace API and the agent's file/terminal tools:
+every path must resolve under workspace_root, and workspace_root under WORKSPACE_ALLOWED_ROOTS (if set).
+Containment is separator-aware, so /ws never admits /ws_leak.
+"""
+import functools
+import os
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+# os.path functions bound once: the path checks run on every workspace request and agent tool call
+_isabs = os.path.isabs
+_join = os.path.join
+_normpath = os.path.normpath
+_SEP = os.sep
+
+
+def _is_within(full: str, root: str) -> bool:
+    """True if normalized absolute path full is root or below it (not merely sharing a name prefix)."""
+    return full == root or full.startswith(root if root.endswith(_SEP) else root + _SEP)
+
+
+def safe_path(root: str, path: str) -> Optional[str]:
+    """Resolve path under workspace_root; return None if outside."""
+    if not root or not _isabs(root):
+        return None
+    # root is absolute, so normpath gives the same result as abspath without a getcwd() call
+    root_abs = _normpath(root)
+    full = _normpath(_join(root_abs, path.lstrip("/").replace("\\", "/")))
+    return full if _is_within(full, root_abs) else None
+
+
+@functools.lru_cache(maxsize=8)
+def _allowed_prefixes(allowed: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Allowlist entries with exactly one trailing separator, so /data never matches /data_leak."""
+    return tuple(os.path.join(allowed_dir, "") for allowed_dir in allowed)
+
+
+def validate_workspace_allowed(workspace_root: str) -> bool:
+    """If WORKSPACE_ALLOWED_ROOTS is set, workspace_root must be under one of them."""
+    # Allowlist entries are normalized absolute paths (see Settings._normalize_roots)
+    allowed = settings.WORKSPACE_ALLOWED_ROOTS
+    if not allowed:
+        return True
+    if not _isabs(workspace_root):
+        return False
+    # One C-level startswith over every prefix instead of a Python loop
+    return _join(_normpath(workspace_root), "").startswith(_allowed_prefixes(tuple(allowed)))
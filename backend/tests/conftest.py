@@ -35,3 +35,81 @@ def tmp_workspace():
 def agent_context(tmp_workspace):
     """Context dict with workspace_root set to tmp_workspace."""
     return {"workspace_root": tmp_workspace}
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Record SQL statements run on the app engine: `with count_queries() as stmts: ...` then assert on len(stmts).
+    Guards endpoints against N+1 queries and accidental lazy loads.
+    """
+    from contextlib import contextmanager
+
+    from sqlalchemy import event
+
+    from app.db.database import engine
+
+    @contextmanager
+    def recorder():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return recorder
+
+
+@pytest.fixture
+def db():
+    """Session on a fresh in-memory SQLite database with every table created (no server needed)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.database import Base
+    from app.models import agent, integration, project, task, user  # noqa: F401 (register all mappers)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def owner_client():
+    """
+    (TestClient, owner) on the app's configured DB, with get_current_active_user overridden to a new user.
+    owner.id is that user's id; set it to another id to act as someone else.
+    """
+    import uuid
+    from unittest.mock import MagicMock
+
+    from fastapi.testclient import TestClient
+
+    from app.core.security import get_current_active_user
+    from app.db.database import SessionLocal
+    from app.main import app
+    from app.models.user import User
+
+    owner = MagicMock(is_active=True)
+    app.dependency_overrides[get_current_active_user] = lambda: owner
+    try:
+        with TestClient(app) as c:
+            name = f"u{uuid.uuid4().hex[:12]}"
+            with SessionLocal() as session:
+                row = User(email=f"{name}@example.com", username=name, hashed_password="x")
+                session.add(row)
+                session.commit()
+                owner.id = row.id
+            yield c, owner
+    finally:
+        app.dependency_overrides.pop(get_current_active_user, None)
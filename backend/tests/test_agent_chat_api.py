@@ -3,6 +3,7 @@ Tests for agent chat API: /api/v1/agent/config, /chat, /execute-pending.
 Uses dependency override for auth and mocks run_loop/execute_pending_and_continue.
 Skips entire module if full app cannot be imported (e.g. no DB driver).
 """
+import json
 from unittest.mock import patch, MagicMock
 
 import pytest
@@ -11,6 +12,8 @@ try:
     from fastapi.testclient import TestClient
     from app.main import app
     from app.core.security import get_current_active_user
+    from app.api.v1.agent_chat import _chat_cache_key
+    from app.services.response_cache import ResponseCache, get_response_cache
     _AGENT_CHAT_API_AVAILABLE = True
 except Exception:
     _AGENT_CHAT_API_AVAILABLE = False
@@ -37,6 +40,7 @@ def client_with_auth():
         return _mock_user()
 
     app.dependency_overrides[get_current_active_user] = override_get_current_active_user
+    get_response_cache().clear()
     try:
         with TestClient(app) as c:
             yield c
@@ -132,6 +136,174 @@ def test_agent_chat_empty_messages_rejected(client_with_auth):
     assert r.json().get("type") == "validation_error"
 
 
+@patch("app.api.v1.agent_chat.run_loop")
+def test_agent_chat_no_llm_returns_503(mock_run_loop, client_with_auth):
+    mock_run_loop.return_value = ([], "No LLM configured.", None, "no_llm_configured")
+    r = client_with_auth.post(
+        "/api/v1/agent/chat",
+        json={"messages": [{"role": "user", "content": "Hello"}]},
+    )
+    assert r.status_code == 503
+    assert r.json() == {"detail": "No LLM configured.", "type": "no_llm_configured"}
+
+
+@patch("app.api.v1.agent_chat.run_loop")
+def test_agent_chat_runs_on_bounded_worker_thread(mock_run_loop, client_with_auth):
+    import threading
+    from app.core.config import settings
+
+    seen = {}
+
+    def fake_run_loop(**kwargs):
+        seen["thread"] = threading.current_thread()
+        seen["borrowed"] = app.state.agent_run_limiter.borrowed_tokens
+        return [], "OK", None, None
+
+    mock_run_loop.side_effect = fake_run_loop
+    r = client_with_auth.post("/api/v1/agent/chat", json={"messages": [{"role": "user", "content": "Hi"}]})
+    assert r.status_code == 200
+    assert seen["thread"] is not threading.main_thread()
+    assert seen["borrowed"] == 1
+    assert app.state.agent_run_limiter.total_tokens == settings.AGENT_MAX_CONCURRENT_RUNS
+
+
+@patch("app.api.v1.agent_chat.run_loop")
+def test_agent_chat_releases_db_session_before_run(mock_run_loop, client_with_auth):
+    from app.db.database import get_db
+
+    db = MagicMock()
+    order = []
+    db.close.side_effect = lambda: order.append("close")
+
+    def fake_run_loop(**kwargs):
+        order.append("run")
+        return [], "OK", None, None
+
+    mock_run_loop.side_effect = fake_run_loop
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        r = client_with_auth.post("/api/v1/agent/chat", json={"messages": [{"role": "user", "content": "Hi"}]})
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+    assert r.status_code == 200
+    assert order == ["close", "run"]
+
+
+_SYSTEM_PROMPT = {"role": "system", "content": "You are a helpful agent."}
+
+
+@pytest.fixture
+def chat_cache():
+    """Reply cache switched on (it is opt-in via CHAT_CACHE_TTL_SECONDS)."""
+    cache = ResponseCache(ttl=60)
+    with patch("app.api.v1.agent_chat.get_response_cache", return_value=cache):
+        yield cache
+
+
+def test_agent_chat_reply_cache_is_off_by_default():
+    assert not get_response_cache().enabled
+
+
+def test_chat_cache_key_is_per_user():
+    msgs = [{"role": "user", "content": "hi"}]
+    assert _chat_cache_key(1, msgs, {}) != _chat_cache_key(2, msgs, {})
+    assert _chat_cache_key(1, msgs, {"workspace_root": "/w"}) is None
+
+
+@patch("app.api.v1.agent_chat.run_loop")
+def test_agent_chat_reuses_cached_plain_reply(mock_run_loop, client_with_auth, chat_cache):
+    msgs = [{"role": "user", "content": "What is a closure?"}]
+    # Like the real run_loop: the system prompt is prepended to the returned transcript
+    mock_run_loop.return_value = ([_SYSTEM_PROMPT] + msgs, "A function with captured variables.", None, None)
+    first = client_with_auth.post("/api/v1/agent/chat", json={"messages": msgs})
+    second = client_with_auth.post("/api/v1/agent/chat", json={"messages": msgs})
+    assert first.json() == second.json()
+    assert second.json()["reply"] == "A function with captured variables."
+    assert mock_run_loop.call_count == 1
+
+
+@patch("app.api.v1.agent_chat.run_loop")
+def test_agent_chat_does_not_cache_workspace_or_tool_replies(mock_run_loop, client_with_auth, chat_cache):
+    msgs = [{"role": "user", "content": "List files"}]
+    mock_run_loop.return_value = ([_SYSTEM_PROMPT] + msgs, "README.md", None, None)
+    body = {"messages": msgs, "context": {"workspace_root": "/some/path"}}
+    client_with_auth.post("/api/v1/agent/chat", json=body)
+    client_with_auth.post("/api/v1/agent/chat", json=body)
+    assert mock_run_loop.call_count == 2
+
+    tool_turn = {"role": "system", "content": "[Tool suggest_questions result]: {}"}
+    mock_run_loop.return_value = ([_SYSTEM_PROMPT] + msgs + [tool_turn], "Here are questions", None, None)
+    client_with_auth.post("/api/v1/agent/chat", json={"messages": msgs})
+    client_with_auth.post("/api/v1/agent/chat", json={"messages": msgs})
+    assert mock_run_loop.call_count == 4
+
+
+# --- POST /api/v1/agent/chat/stream ---
+
+def _sse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@patch("app.api.v1.agent_chat.run_loop")
+def test_agent_chat_stream_sends_deltas_then_done(mock_run_loop, client_with_auth):
+    def fake_run_loop(messages, context, max_turns, on_reply_chunk):
+        on_reply_chunk("Hi ")
+        on_reply_chunk("there!")
+        return messages + [{"role": "assistant", "content": "Hi there!"}], "Hi there!", None, None
+
+    mock_run_loop.side_effect = fake_run_loop
+    r = client_with_auth.post(
+        "/api/v1/agent/chat/stream",
+        json={"messages": [{"role": "user", "content": "Hello"}]},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(r.text)
+    assert events[:2] == [("delta", {"text": "Hi "}), ("delta", {"text": "there!"})]
+    name, data = events[2]
+    assert name == "done"
+    assert data["reply"] == "Hi there!"
+    assert len(data["messages"]) == 2
+
+
+@patch("app.api.v1.agent_chat.run_loop")
+def test_agent_chat_stream_reports_error_event(mock_run_loop, client_with_auth):
+    mock_run_loop.return_value = ([], "No LLM configured.", None, "no_llm_configured")
+    r = client_with_auth.post(
+        "/api/v1/agent/chat/stream",
+        json={"messages": [{"role": "user", "content": "Hello"}]},
+    )
+    assert _sse_events(r.text) == [("error", {"detail": "No LLM configured.", "type": "no_llm_configured"})]
+
+
+@patch("app.api.v1.agent_chat.run_loop")
+def test_agent_chat_stream_runs_bounded_after_releasing_db(mock_run_loop, client_with_auth):
+    from app.db.database import get_db
+
+    db = MagicMock()
+    order = []
+    db.close.side_effect = lambda: order.append("close")
+
+    def fake_run_loop(messages, context, max_turns, on_reply_chunk):
+        order.append(("run", app.state.agent_run_limiter.borrowed_tokens))
+        on_reply_chunk("OK")
+        return messages, "OK", None, None
+
+    mock_run_loop.side_effect = fake_run_loop
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        r = client_with_auth.post("/api/v1/agent/chat/stream", json={"messages": [{"role": "user", "content": "Hi"}]})
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+    assert [name for name, _ in _sse_events(r.text)] == ["delta", "done"]
+    assert order == ["close", ("run", 1)]
+    assert app.state.agent_run_limiter.borrowed_tokens == 0
+
+
 # --- POST /api/v1/agent/execute-pending ---
 
 @patch("app.api.v1.agent_chat.execute_pending_and_continue")
@@ -11,13 +11,12 @@ import pytest
 
 from app.services.agent_kernel import (
     PENDING_APPROVAL_KEY,
-    _safe_path,
-    _validate_workspace_allowed,
     _is_command_blocked,
     _extract_code_block,
     _tool_read_file,
     _tool_list_dir,
     _tool_search_files,
+    _search_patterns,
     _tool_suggest_fix,
     _tool_edit_file_preview,
     _execute_edit_file,
@@ -28,30 +27,38 @@ from app.services.agent_kernel import (
     execute_pending_and_continue,
     _get_workspace_context_block,
 )
+from app.services.workspace_paths import safe_path, validate_workspace_allowed
 
 
 # --- Workspace allowlist and command blocklist ---
 
 def test_validate_workspace_allowed_empty_allowlist():
     """When WORKSPACE_ALLOWED_ROOTS is empty, any path is allowed."""
-    with patch("app.services.agent_kernel.settings") as s:
+    with patch("app.services.workspace_paths.settings") as s:
         s.WORKSPACE_ALLOWED_ROOTS = []
-        assert _validate_workspace_allowed("/any/path") is True
+        assert validate_workspace_allowed("/any/path") is True
 
 
 def test_validate_workspace_allowed_under_root(tmp_workspace):
-    with patch("app.services.agent_kernel.settings") as s:
+    with patch("app.services.workspace_paths.settings") as s:
         s.WORKSPACE_ALLOWED_ROOTS = [tmp_workspace]
-        assert _validate_workspace_allowed(tmp_workspace) is True
-        assert _validate_workspace_allowed(os.path.join(tmp_workspace, "src")) is True
+        assert validate_workspace_allowed(tmp_workspace) is True
+        assert validate_workspace_allowed(os.path.join(tmp_workspace, "src")) is True
 
 
 def test_validate_workspace_allowed_outside_root(tmp_workspace):
-    with patch("app.services.agent_kernel.settings") as s:
+    with patch("app.services.workspace_paths.settings") as s:
         s.WORKSPACE_ALLOWED_ROOTS = [tmp_workspace]
         # Path that is not under tmp_workspace
         other = os.path.abspath(os.path.join(tmp_workspace, "..", "other_dir"))
-        assert _validate_workspace_allowed(other) is False
+        assert validate_workspace_allowed(other) is False
+
+
+def test_validate_workspace_allowed_rejects_name_prefix_sibling(tmp_workspace):
+    with patch("app.services.workspace_paths.settings") as s:
+        s.WORKSPACE_ALLOWED_ROOTS = [tmp_workspace]
+        assert validate_workspace_allowed(tmp_workspace + "_leak") is False
+        assert validate_workspace_allowed(tmp_workspace + "/") is True
 
 
 def test_is_command_blocked_rm_rf():
@@ -71,31 +78,38 @@ def test_is_command_blocked_safe():
 # --- Path safety (completeness + security) ---
 
 def test_safe_path_empty_root():
-    assert _safe_path("", "foo") is None
-    assert _safe_path(None, "foo") is None  # type: ignore
+    assert safe_path("", "foo") is None
+    assert safe_path(None, "foo") is None  # type: ignore
 
 
 def test_safe_path_under_root(tmp_workspace):
-    assert _safe_path(tmp_workspace, "README.md") == os.path.normpath(os.path.join(tmp_workspace, "README.md"))
-    assert _safe_path(tmp_workspace, "src/main.py") is not None
-    assert _safe_path(tmp_workspace, ".") is not None
+    assert safe_path(tmp_workspace, "README.md") == os.path.normpath(os.path.join(tmp_workspace, "README.md"))
+    assert safe_path(tmp_workspace, "src/main.py") is not None
+    assert safe_path(tmp_workspace, ".") is not None
 
 
 def test_safe_path_traversal_rejected(tmp_workspace):
     # Path traversal must not escape workspace
     root_abs = os.path.abspath(tmp_workspace)
     parent = str(Path(tmp_workspace).parent)
-    assert _safe_path(tmp_workspace, "../other") is None
-    assert _safe_path(tmp_workspace, "..") is None
+    assert safe_path(tmp_workspace, "../other") is None
+    assert safe_path(tmp_workspace, "..") is None
     # Windows: drive-relative or absolute outside
     if os.name == "nt":
         # C:\other when workspace is C:\...\agent_test_xxx
         other_drive = "D:\\other" if not root_abs.startswith("D:") else "C:\\other"
-        assert _safe_path(tmp_workspace, other_drive) is None or _safe_path(tmp_workspace, other_drive) != other_drive
+        assert safe_path(tmp_workspace, other_drive) is None or safe_path(tmp_workspace, other_drive) != other_drive
+
+
+def test_safe_path_rejects_name_prefix_sibling(tmp_workspace):
+    # /tmp/ws must not admit /tmp/ws_leak: agent file reads and terminal cwd go through safe_path
+    sibling = os.path.basename(os.path.normpath(tmp_workspace)) + "_leak"
+    assert safe_path(tmp_workspace, f"../{sibling}/secret") is None
+    assert safe_path(tmp_workspace + "/", f"../{sibling}") is None
 
 
 def test_safe_path_normalizes_slash(tmp_workspace):
-    p = _safe_path(tmp_workspace, "/src/main.py")
+    p = safe_path(tmp_workspace, "/src/main.py")
     assert p is not None
     assert "src" in p and "main" in p
 
@@ -170,6 +184,12 @@ def test_list_dir_subdir(agent_context):
     assert "main.py" in data["entries"]
 
 
+def test_tool_results_are_compact_json(agent_context):
+    out = _tool_list_dir(agent_context, "src")
+    assert ", " not in out and ": " not in out
+    assert json.loads(out)["path"] == "src"
+
+
 # --- search_files ---
 
 def test_search_files_no_workspace():
@@ -193,6 +213,18 @@ def test_search_files_finds_literal(agent_context):
     assert any("main" in m.get("path", "") for m in data["matches"])
 
 
+def test_search_patterns_single_walk_multiple_patterns(tmp_workspace):
+    out = _search_patterns(tmp_workspace, ["TODO", "return a + b", "missing"])
+    assert [m["path"] for m in out["TODO"]] == ["src/main.py"]
+    assert out["return a + b"][0]["path"] == "src/utils.py"
+    assert out["missing"] == []
+
+
+def test_search_patterns_caps_each_pattern(tmp_workspace):
+    out = _search_patterns(tmp_workspace, ["e", "e"], max_matches=2)
+    assert len(out["e"]) == 2
+
+
 def test_search_files_respects_path(agent_context):
     """Search with path='src' returns matches relative to src (e.g. main.py); no results from sub/."""
     out = _tool_search_files(agent_context, "hello", "src")
@@ -314,6 +346,58 @@ def test_run_loop_returns_pending_approval(mock_get_llm, mock_generate, agent_co
     assert pending.get("tool") == "edit_file"
 
 
+@patch("app.services.agent_kernel._generate")
+@patch("app.services.agent_kernel._get_llm")
+def test_run_loop_system_prompt_is_stable_prefix(mock_get_llm, mock_generate, agent_context):
+    """Workspace context goes after the conversation; the system turn is identical across calls."""
+    mock_get_llm.return_value = ("openai", MagicMock())
+    mock_generate.return_value = '{"thought": "ok", "reply": "Done."}'
+    first, _, _, _ = run_loop([{"role": "user", "content": "where is the TODO"}], agent_context, max_turns=1)
+    second_messages = first + [{"role": "user", "content": "show package.json"}]
+    second, _, _, _ = run_loop(second_messages, agent_context, max_turns=1)
+    assert first[0]["role"] == "system"
+    assert "Workspace context" not in first[0]["content"]
+    assert second[0] == first[0]
+    assert sum(1 for m in second if m["role"] == "system") == 1
+    prompt = mock_generate.call_args[0][2]
+    assert prompt.index("show package.json") < prompt.index("Workspace context")
+
+
+@patch("app.services.agent_kernel._generate")
+@patch("app.services.agent_kernel._get_llm")
+def test_run_loop_prompt_includes_each_turn_once(mock_get_llm, mock_generate, agent_context):
+    mock_get_llm.return_value = ("openai", MagicMock())
+    mock_generate.side_effect = [
+        '{"thought": "look", "tool": "list_dir", "args": {"path": "."}}',
+        '{"thought": "done", "reply": "Listed."}',
+    ]
+    _, reply, _, _ = run_loop([{"role": "user", "content": "list files"}], agent_context, max_turns=3)
+    assert reply == "Listed."
+    second_prompt = mock_generate.call_args_list[1][0][2]
+    assert second_prompt.count("USER: list files") == 1
+    assert second_prompt.count("[Tool list_dir result]") == 1
+
+
+@patch("app.services.agent_kernel._generate")
+@patch("app.services.agent_kernel._get_llm")
+def test_run_loop_runs_batched_read_calls_in_one_step(mock_get_llm, mock_generate, agent_context):
+    mock_get_llm.return_value = ("openai", MagicMock())
+    mock_generate.side_effect = [
+        '{"thought": "read both", "calls": ['
+        '{"tool": "read_file", "args": {"path": "README.md"}}, '
+        '{"tool": "run_terminal", "args": {"command": "ls"}}, '
+        '{"tool": "read_file", "args": {"path": "src/utils.py"}}]}',
+        '{"thought": "done", "reply": "Read them."}',
+    ]
+    current, reply, pending, _ = run_loop([{"role": "user", "content": "read files"}], agent_context, max_turns=3)
+    assert reply == "Read them." and pending is None
+    assert mock_generate.call_count == 2
+    turns = [m["content"] for m in current if m["role"] == "system"][1:]
+    assert turns[0].startswith("[Tool read_file result]") and "Test Project" in turns[0]
+    assert turns[1].startswith("[Invalid call: run_terminal")
+    assert turns[2].startswith("[Tool read_file result]") and "def add" in turns[2]
+
+
 @patch("app.services.agent_kernel._get_llm")
 def test_run_loop_no_llm_returns_error_message(mock_get_llm):
     mock_get_llm.return_value = (None, None)
@@ -361,3 +445,49 @@ def test_workspace_context_block_includes_search_when_user_message(agent_context
     messages = [{"role": "user", "content": "where is the TODO"}]
     block = _get_workspace_context_block(agent_context, messages)
     assert "Workspace context" in block
+
+
+def test_workspace_context_block_search_and_semantic_together(agent_context):
+    context = dict(agent_context, use_semantic_context=True)
+    messages = [{"role": "user", "content": "where is the TODO"}]
+    with patch("app.services.agent_kernel._semantic_context_block", return_value="\nRelevant snippets: x"):
+        block = _get_workspace_context_block(context, messages)
+    assert "src/main.py" in block
+    assert block.rstrip().endswith("Relevant snippets: x")
+
+
+def test_replacement_diff_matches_full_file_diff():
+    import difflib
+    from app.services.agent_kernel import _replacement_diff
+
+    current = "".join(f"line {i}\n" for i in range(60))
+    for old, new in [("line 30\n", "changed 30\nextra\n"), ("line 0\n", ""), ("line 59", "last"), ("ne 1", "NE 1")]:
+        new_content = current.replace(old, new, 1)
+        full = "\n".join(difflib.unified_diff(
+            current.splitlines(), new_content.splitlines(), lineterm="", fromfile="f.txt", tofile="f.txt"
+        ))
+        assert _replacement_diff("f.txt", current, old, new) == full
+
+
+# --- streaming (on_reply_chunk) ---
+
+def test_reply_field_streamer_decodes_split_chunks():
+    from app.services.agent_kernel import _ReplyFieldStreamer
+
+    out = []
+    streamer = _ReplyFieldStreamer(out.append)
+    raw = '{"thought": "say \\"hi\\"", "reply": "Line one\\nQuote: \\"x\\" caf\\u00e9"} trailing'
+    for i in range(0, len(raw), 3):
+        streamer.feed(raw[i : i + 3])
+    assert "".join(out) == json.loads(raw.split(" trailing")[0])["reply"]
+
+
+@patch("app.services.agent_kernel._generate_stream")
+@patch("app.services.agent_kernel._get_llm")
+def test_run_loop_streams_reply(mock_get_llm, mock_stream):
+    mock_get_llm.return_value = ("openai", MagicMock())
+    mock_stream.return_value = iter(['{"thought": "ok", "re', 'ply": "Hel', 'lo!"}'])
+    chunks = []
+    _, reply, pending, _ = run_loop([{"role": "user", "content": "Hi"}], {}, max_turns=1, on_reply_chunk=chunks.append)
+    assert reply == "Hello!"
+    assert "".join(chunks) == "Hello!"
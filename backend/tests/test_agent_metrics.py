@@ -0,0 +1,82 @@
+"""
+Tests for agent_metrics against an in-memory SQLite database (no server needed).
+"""
+import pytest
+
+from app.models import agent, integration, project, task, user  # noqa: F401 (register all mappers)
+from app.models.agent import Agent, AgentMetrics, AgentType
+from app.models.task import Task, TaskStatus
+from app.models.user import User
+from app.services.agent_metrics import (
+    agent_metrics_summary,
+    fetch_agent_metrics,
+    record_task_result,
+    refresh_agent_metrics,
+)
+
+
+@pytest.fixture
+def agent_id(db):
+    owner = User(email="a@example.com", username="a", hashed_password="x")
+    db.add(owner)
+    db.flush()
+    row = Agent(user_id=owner.id, agent_type=AgentType.EMAIL, name="mail")
+    db.add(row)
+    db.flush()
+    db.add(AgentMetrics(agent_id=row.id, tasks_pending=1))
+    db.commit()
+    return row.id
+
+
+def test_record_task_result_updates_counters(db, agent_id):
+    assert record_task_result(db, agent_id, success=True)
+    assert record_task_result(db, agent_id, success=False)
+    assert record_task_result(db, agent_id, success=True)
+    db.commit()
+    row = db.get(Agent, agent_id, populate_existing=True)
+    db.refresh(row.metrics)
+    assert (row.tasks_completed, row.tasks_failed, row.tasks_pending) == (2, 1, 0)
+    assert row.success_rate == 66
+    assert row.last_active is not None
+
+
+def test_record_task_result_unknown_agent(db):
+    assert record_task_result(db, 999, success=True) is False
+
+
+def test_fetch_agent_metrics_and_summary(db, agent_id):
+    record_task_result(db, agent_id, success=True)
+    record_task_result(db, agent_id, success=False)
+    db.commit()
+    rows = fetch_agent_metrics(db)
+    assert [(r.id, r.tasks_completed, r.tasks_failed, r.success_rate) for r in rows] == [(agent_id, 1, 1, 50)]
+    assert fetch_agent_metrics(db, user_id=999) == []
+    summary = agent_metrics_summary(db)
+    assert summary == {"agents": 1, "tasks_completed": 1, "tasks_failed": 1, "tasks_pending": 0, "success_rate": 50}
+    assert agent_metrics_summary(db, user_id=999)["success_rate"] == 0
+    record_task_result(db, agent_id, success=True)
+    assert agent_metrics_summary(db)["success_rate"] == 66  # integer percent, like the generated column
+
+
+def test_refresh_agent_metrics_recounts_from_tasks(db, agent_id):
+    owner_id = db.get(Agent, agent_id).user_id
+    idle = Agent(user_id=owner_id, agent_type=AgentType.PLANNING, name="plan")
+    db.add(idle)
+    statuses = [TaskStatus.COMPLETED] * 3 + [TaskStatus.FAILED, TaskStatus.PENDING, TaskStatus.IN_PROGRESS]
+    statuses.append(TaskStatus.CANCELLED)
+    db.add_all(
+        Task(user_id=owner_id, agent_id=agent_id, title=f"t{i}", task_type="email", status=s)
+        for i, s in enumerate(statuses)
+    )
+    db.commit()
+    assert refresh_agent_metrics(db) == 1
+    db.commit()
+    rows = fetch_agent_metrics(db)
+    assert [(r.id, r.tasks_completed, r.tasks_failed, r.tasks_pending, r.success_rate) for r in rows] == [
+        (agent_id, 3, 1, 2, 75),
+        (idle.id, 0, 0, 0, 0),
+    ]
+    # Idempotent: a second run rewrites the same counts
+    refresh_agent_metrics(db)
+    assert agent_metrics_summary(db)["tasks_completed"] == 3
+    assert db.get(Agent, idle.id).tasks_completed == 0
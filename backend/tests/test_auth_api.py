@@ -0,0 +1,86 @@
+"""
+Tests for /api/v1/auth register and login, and password hashing (uses the app's configured DB).
+Skips entire module if full app cannot be imported (e.g. no DB driver).
+"""
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+try:
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.models import agent, integration, project, task, user  # noqa: F401 (register all mappers)
+    _AUTH_API_AVAILABLE = True
+except Exception:
+    _AUTH_API_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(
+    not _AUTH_API_AVAILABLE,
+    reason="App main (e.g. DB) not available; skip auth API tests",
+)
+
+
+@pytest.fixture
+def client():
+    with patch("app.api.v1.auth.get_password_hash", return_value="hashed"):
+        with TestClient(app) as c:
+            yield c
+
+
+def _payload(email: str, username: str):
+    return {"email": email, "username": username, "password": "s3cret-pass", "full_name": "Test"}
+
+
+def test_register_returns_tokens(client):
+    name = f"u{uuid.uuid4().hex[:12]}"
+    r = client.post("/api/v1/auth/register", json=_payload(f"{name}@example.com", name))
+    assert r.status_code == 201
+    assert r.json()["access_token"]
+
+
+def test_register_duplicate_email_or_username_is_400(client):
+    name = f"u{uuid.uuid4().hex[:12]}"
+    assert client.post("/api/v1/auth/register", json=_payload(f"{name}@example.com", name)).status_code == 201
+    same_email = client.post("/api/v1/auth/register", json=_payload(f"{name}@example.com", name + "x"))
+    same_username = client.post("/api/v1/auth/register", json=_payload(f"x{name}@example.com", name))
+    assert same_email.status_code == 400
+    assert same_username.status_code == 400
+    assert same_email.json()["detail"] == "Email or username already registered"
+
+
+def test_register_username_longer_than_column_is_422(client):
+    r = client.post("/api/v1/auth/register", json=_payload(f"{uuid.uuid4().hex}@example.com", "u" * 65))
+    assert r.status_code == 422
+
+
+def test_new_passwords_are_hashed_with_argon2id():
+    from app.core.security import get_password_hash, verify_password
+
+    hashed = get_password_hash("s3cret-pass")
+    assert hashed.startswith("$argon2id$")
+    assert len(hashed) <= 128  # users.hashed_password is VARCHAR(128)
+    assert verify_password("s3cret-pass", hashed)
+    assert not verify_password("wrong", hashed)
+
+
+def test_login_upgrades_outdated_hash():
+    from app.core.security import pwd_context
+    from app.db.database import SessionLocal
+
+    name = f"u{uuid.uuid4().hex[:12]}"
+    outdated = pwd_context.handler("argon2").using(rounds=1).hash("s3cret-pass")
+    with TestClient(app) as c:
+        with SessionLocal() as db:
+            db.add(user.User(email=f"{name}@example.com", username=name, hashed_password=outdated))
+            db.commit()
+        r = c.post("/api/v1/auth/login", data={"username": name, "password": "s3cret-pass"})
+        assert r.status_code == 200
+        assert c.post("/api/v1/auth/login", data={"username": name, "password": "nope"}).status_code == 401
+    with SessionLocal() as db:
+        stored, last_login = db.query(user.User.hashed_password, user.User.last_login).filter(
+            user.User.username == name
+        ).one()
+    assert stored != outdated
+    assert last_login is not None
+    assert not pwd_context.needs_update(stored)
@@ -0,0 +1,172 @@
+"""
+Tests for build API: generate coalescing (no DB) and project endpoints (app's configured DB).
+"""
+import io
+import threading
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import inspect
+
+from app.api.v1 import build
+
+try:
+    from app.main import app  # noqa: F401 (the owner_client fixture needs the full app)
+    from app.core.middleware import _rate_store
+    from app.db.database import SessionLocal
+    from app.models import agent, integration, task, user  # noqa: F401 (register all mappers)
+    from app.models.project import Project
+    _BUILD_API_AVAILABLE = True
+except Exception:
+    _BUILD_API_AVAILABLE = False
+
+_needs_app = pytest.mark.skipif(not _BUILD_API_AVAILABLE, reason="App main (e.g. DB) not available")
+
+
+def test_generate_key_lock_blocks_only_the_same_key():
+    held, release, duplicate_ran = threading.Event(), threading.Event(), threading.Event()
+
+    def first_run():
+        with build._generate_key_lock("a"):
+            held.set()
+            release.wait(5)
+
+    def duplicate_run():
+        with build._generate_key_lock("a"):
+            duplicate_ran.set()
+
+    threads = [threading.Thread(target=first_run), threading.Thread(target=duplicate_run)]
+    threads[0].start()
+    assert held.wait(5)
+    threads[1].start()
+    with build._generate_key_lock("b"):  # another request runs while "a" is still generating
+        assert set(build._generate_inflight) == {"a", "b"}
+    assert not duplicate_ran.wait(0.1)  # the duplicate waits for the first run
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert duplicate_ran.is_set()
+    assert build._generate_inflight == {}  # finished runs leave nothing behind
+
+
+@_needs_app
+def test_delete_project_only_deletes_own_project(owner_client):
+    c, owner = owner_client
+    owner_id = owner.id
+    with SessionLocal() as db:
+        project = Project(user_id=owner_id, name="p", files={"index.html": "<html></html>"})
+        db.add(project)
+        db.commit()
+        project_id = project.id
+    owner.id = owner_id + 1  # someone else
+    assert c.delete(f"/api/v1/build/projects/{project_id}").status_code == 404
+    owner.id = owner_id
+    with patch.object(build, "discard_project_zips") as discard:
+        assert c.delete(f"/api/v1/build/projects/{project_id}").status_code == 204
+    discard.assert_called_once_with([project_id])
+    assert c.delete(f"/api/v1/build/projects/{project_id}").status_code == 404
+
+
+@_needs_app
+def test_list_projects_returns_own_projects_newest_first(owner_client):
+    c, owner = owner_client
+    with SessionLocal() as db:
+        db.add(Project(user_id=owner.id, name="first", files={"index.html": "x" * 1000}))
+        db.commit()
+        db.add(Project(user_id=owner.id, name="second", files={}))
+        db.commit()
+    r = c.get("/api/v1/build/projects")
+    assert r.status_code == 200
+    items = r.json()
+    assert sorted(items[0]) == ["created_at", "id", "name"]
+    assert {item["name"] for item in items} == {"first", "second"}
+
+
+@_needs_app
+def test_list_projects_keyset_pages(owner_client):
+    c, owner = owner_client
+    with SessionLocal() as db:
+        db.add_all([Project(user_id=owner.id, name=f"p{i}", files={}) for i in range(5)])
+        db.commit()
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = c.get("/api/v1/build/projects", params=params)
+        assert r.status_code == 200
+        seen.extend(item["name"] for item in r.json())
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == ["p4", "p3", "p2", "p1", "p0"]
+    assert "x-next-cursor" not in c.get("/api/v1/build/projects").headers
+
+
+@_needs_app
+def test_project_content_is_deferred_but_served_by_detail_download_and_open(owner_client):
+    c, owner = owner_client
+    files = {"index.html": "<html>app</html>"}
+    with SessionLocal() as db:
+        db.add(Project(user_id=owner.id, name="p", spec={"type": "todo"}, files=files))
+        db.commit()
+    with SessionLocal() as db:
+        loaded = db.query(Project).filter(Project.user_id == owner.id).one()
+        assert {"files", "spec", "conversation_summary"} <= inspect(loaded).unloaded
+        project_id = loaded.id
+    detail = c.get(f"/api/v1/build/projects/{project_id}").json()
+    assert detail["files"] == files and detail["spec"] == {"type": "todo"}
+    assert c.get(f"/api/v1/build/projects/{project_id}/open").text == files["index.html"]
+    download = c.get(f"/api/v1/build/projects/{project_id}/download")
+    assert download.headers["cache-control"] == "private, no-cache"  # same URL after delete: revalidate
+    with zipfile.ZipFile(io.BytesIO(download.content)) as zf:
+        assert zf.read("index.html").decode() == files["index.html"]
+
+
+@_needs_app
+def test_duplicate_generate_reuses_first_result(owner_client):
+    c, _ = owner_client
+    build._generate_dedupe_cache().clear()
+    _rate_store.clear()  # other tests' generate calls share the test client's IP
+    with patch.object(build, "conversation_to_spec", return_value={"name": "Todo"}) as to_spec, \
+            patch.object(build, "spec_to_code", return_value={"index.html": "<html></html>"}) as to_code:
+        body = {"messages": [{"role": "user", "content": "a todo app"}]}
+        first = c.post("/api/v1/build/generate", json=body).json()
+        second = c.post("/api/v1/build/generate", json=body).json()
+        c.post("/api/v1/build/generate", json={**body, "project_name": "Other"})
+    assert to_spec.call_count == 2 and to_code.call_count == 2  # the renamed request is a new run
+    assert first["id"] != second["id"]
+    assert second["files"] == first["files"] and second["spec"] == first["spec"]
+
+
+@_needs_app
+def test_full_project_list_streams_in_batches(owner_client, monkeypatch):
+    c, owner = owner_client
+    monkeypatch.setattr(build, "_LIST_STREAM_BATCH", 2)
+    assert c.get("/api/v1/build/projects").json() == []
+    with SessionLocal() as db:
+        db.add_all([Project(user_id=owner.id, name=f"p{i}", files={}) for i in range(5)])
+        db.commit()
+    r = c.get("/api/v1/build/projects")
+    assert r.headers["content-type"] == "application/json"
+    assert [item["name"] for item in r.json()] == ["p4", "p3", "p2", "p1", "p0"]
+    assert all(item["created_at"] for item in r.json())
+
+
+@_needs_app
+def test_project_endpoints_use_one_query_each(owner_client, count_queries):
+    c, owner = owner_client
+    with SessionLocal() as db:
+        project = Project(user_id=owner.id, name="p", spec={}, files={"index.html": "<html></html>"})
+        db.add(project)
+        db.commit()
+        project_id = project.id
+    for path in (
+        f"/api/v1/build/projects/{project_id}",
+        f"/api/v1/build/projects/{project_id}/open",
+        f"/api/v1/build/projects/{project_id}/download",
+        "/api/v1/build/projects?limit=10",
+        "/api/v1/build/projects",
+    ):
+        with count_queries() as stmts:
+            assert c.get(path).status_code == 200, path
+        assert len(stmts) == 1, (path, stmts)
@@ -15,6 +15,11 @@ from app.services.builder_service import (
     suggest_questions,
     spec_to_code,
     conversation_to_spec,
+    _generate,
+    _generate_stream,
+    _pooled_llm,
+    clear_llm_cache,
+    get_llm_cache_stats,
 )
 
 
@@ -91,6 +96,31 @@ def test_default_spec_notes_keywords():
     assert "categorization" in spec["features"] or "list management" in spec["features"]
 
 
+def test_default_spec_keyword_scan_matches_substring_checks():
+    from app.services.builder_service import _TYPE_HINTS, _FEATURE_KEYWORDS
+
+    texts = [
+        "a checklist to track my blog posts",
+        "tracking notes with tags, export and a dark theme",
+        "daily reading log with charts and reminders",
+        "day at a glance summary; search and filter my book collection",
+        "nothing relevant here",
+        # longer keywords contain shorter ones: "tracker" must still count as "track"
+        "I want a habit tracker",
+        "a tracker app",
+    ]
+    for text in texts:
+        expected_type = next((t for ks, t in _TYPE_HINTS if any(k in text for k in ks)), "app")
+        expected_features = [f for ks, f in _FEATURE_KEYWORDS if any(k in text for k in ks)] or [
+            "list management", "tracking",
+        ]
+        spec = _default_spec([{"role": "user", "content": text}])
+        assert spec["type"] == expected_type, text
+        assert spec["features"] == expected_features, text
+    assert _default_spec([{"role": "user", "content": "I want a habit tracker"}])["features"] == ["tracking", "streaks"]
+    assert _default_spec([{"role": "user", "content": "a tracker app"}])["features"] == ["tracking"]
+
+
 def test_default_spec_name_from_first_message():
     messages = [{"role": "user", "content": "Build me a Reading Log app"}]
     spec = _default_spec(messages)
@@ -193,3 +223,102 @@ def test_conversation_to_spec_fallback_without_llm():
         spec = conversation_to_spec(messages)
     assert spec["type"] == "dashboard"
     assert "name" in spec and "features" in spec
+
+
+def test_conversation_to_spec_is_memoized_per_conversation():
+    clear_llm_cache()
+    llm = MagicMock()
+    llm.temperature = 0
+    llm.model = "test-model"
+    llm.generate.return_value = '{"name": "HabitApp", "type": "tracker", "features": ["streaks"]}'
+    with patch("app.services.builder_service._get_llm", return_value=("local", llm)):
+        first = conversation_to_spec([{"role": "user", "content": "habit tracker  with streaks"}])
+        first["name"] = "Renamed"  # callers (e.g. /build/generate) overwrite fields
+        second = conversation_to_spec([{"role": "user", "content": "habit tracker with streaks "}])
+        conversation_to_spec([{"role": "user", "content": "a notes app"}])
+    assert second["name"] == "HabitApp"
+    assert llm.generate.call_count == 2
+    # Spec lookups do not count toward the response cache stats
+    assert get_llm_cache_stats()["hits"] == 0
+    clear_llm_cache()
+
+
+def test_conversation_to_spec_not_memoized_when_sampling():
+    clear_llm_cache()
+    llm = MagicMock()
+    llm.temperature = 0.7
+    llm.model = "test-model"
+    llm.generate.side_effect = ['{"name": "First"}', '{"name": "Second"}']
+    messages = [{"role": "user", "content": "habit tracker"}]
+    with patch("app.services.builder_service._get_llm", return_value=("local", llm)):
+        assert conversation_to_spec(messages)["name"] == "First"
+        assert conversation_to_spec(messages)["name"] == "Second"
+    assert llm.generate.call_count == 2
+    clear_llm_cache()
+
+
+# --- _generate exact-match cache (temperature 0 only) ---
+
+def test_generate_caches_deterministic_calls():
+    clear_llm_cache()
+    llm = MagicMock()
+    llm.temperature = 0
+    llm.model = "test-model"
+    llm.generate.return_value = "cached answer"
+    assert _generate("local", llm, "same prompt", max_tokens=50) == "cached answer"
+    assert _generate("local", llm, "same prompt", max_tokens=50) == "cached answer"
+    assert llm.generate.call_count == 1
+    stats = get_llm_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    # Different max_tokens is a different key
+    _generate("local", llm, "same prompt", max_tokens=60)
+    assert llm.generate.call_count == 2
+    clear_llm_cache()
+
+
+def test_generate_skips_cache_when_sampling():
+    clear_llm_cache()
+    llm = MagicMock()
+    llm.temperature = 0.7
+    llm.generate.return_value = "fresh"
+    _generate("local", llm, "p", max_tokens=10)
+    _generate("local", llm, "p", max_tokens=10)
+    assert llm.generate.call_count == 2
+    assert get_llm_cache_stats()["size"] == 0
+
+
+# --- _pooled_llm (one client per provider/model/temperature) ---
+
+def test_pooled_llm_builds_client_once_per_key():
+    factory = MagicMock(side_effect=lambda: object())
+    key = ("test-provider", "model-a", 0.5, 30)
+    first = _pooled_llm(key, factory)
+    assert _pooled_llm(key, factory) is first
+    assert factory.call_count == 1
+    other = _pooled_llm(("test-provider", "model-b", 0.5, 30), factory)
+    assert other is not first
+
+
+# --- _generate_stream ---
+
+def test_generate_stream_yields_chunks_and_caches():
+    clear_llm_cache()
+    llm = MagicMock()
+    llm.temperature = 0
+    llm.model = "m"
+    llm.generate_stream.return_value = iter(["Hel", "lo"])
+    assert list(_generate_stream("local", llm, "p", max_tokens=5)) == ["Hel", "lo"]
+    # Second call is served whole from the exact-match cache
+    assert list(_generate_stream("local", llm, "p", max_tokens=5)) == ["Hello"]
+    assert llm.generate_stream.call_count == 1
+    # Streaming lookups go through the locked cache accessors and are counted
+    assert get_llm_cache_stats()["hits"] == 1
+    clear_llm_cache()
+
+
+def test_generate_stream_falls_back_without_stream_support():
+    class NoStream:
+        def generate(self, prompt, max_tokens=500, **kwargs):
+            return "whole"
+
+    assert list(_generate_stream("local", NoStream(), "p")) == ["whole"]
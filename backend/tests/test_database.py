@@ -0,0 +1,71 @@
+"""
+Tests for database helpers that need no server: dialect-specific JSON and enum columns.
+"""
+import pytest
+from sqlalchemy import create_engine, create_mock_engine, event, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import agent, integration, project, task, user  # noqa: F401 (register all mappers)
+from app.models.user import SubscriptionTier, User
+
+
+def _create_all_ddl(dialect: str) -> str:
+    statements = []
+    mock = create_mock_engine(
+        f"{dialect}://", lambda sql, *a, **kw: statements.append(str(sql.compile(dialect=mock.dialect)))
+    )
+    Base.metadata.create_all(mock, checkfirst=False)
+    return "\n".join(statements)
+
+
+def test_json_columns_are_jsonb_with_gin_indexes_on_postgres_only():
+    pg = _create_all_ddl("postgresql")
+    assert "input_data JSONB DEFAULT '{}'" in pg
+    assert "CREATE INDEX ix_tasks_input_data_gin ON tasks USING gin (input_data jsonb_path_ops)" in pg
+    assert "CREATE INDEX ix_projects_spec_gin ON projects USING gin (spec jsonb_path_ops)" in pg
+    lite = _create_all_ddl("sqlite")
+    assert "input_data JSON DEFAULT '{}'" in lite
+    assert "_gin" not in lite
+
+
+def test_enum_string_columns_store_names_and_check_them():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    try:
+        owner = User(email="a@example.com", username="a", hashed_password="x")
+        db.add(owner)
+        db.commit()
+        # Same stored form as sqlalchemy.Enum (member names), so existing rows keep reading back
+        assert db.scalar(text("SELECT subscription_tier FROM users")) == "FREE"
+        db.execute(text("UPDATE users SET subscription_tier = 'PRO'"))
+        row = db.get(User, owner.id, populate_existing=True)
+        assert row.subscription_tier is SubscriptionTier.PRO
+        assert db.scalar(select(User.id).where(User.subscription_tier == SubscriptionTier.PRO)) == owner.id
+        assert db.scalar(select(User.id).where(User.subscription_tier == "pro")) == owner.id
+        with pytest.raises(IntegrityError):
+            db.execute(text("UPDATE users SET subscription_tier = 'gold'"))
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_server_defaults_are_fetched_with_the_write():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    try:
+        owner = User(email="a@example.com", username="a", hashed_password="x")
+        db.add(owner)
+        db.commit()
+        owner.full_name = "A"
+        db.commit()
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, stmt, *a: statements.append(stmt))
+        assert owner.created_at is not None and owner.updated_at is not None
+        assert statements == []  # both were loaded by RETURNING, no refresh SELECT
+    finally:
+        db.close()
+        engine.dispose()
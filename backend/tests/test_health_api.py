@@ -0,0 +1,101 @@
+"""
+Tests for startup and the health endpoints: readiness pings are cached briefly and failures are not;
+the periodic agent metrics refresh runs in one worker.
+Skips entire module if full app cannot be imported (e.g. no DB driver).
+"""
+from unittest.mock import MagicMock, patch
+
+import anyio
+import pytest
+
+try:
+    from fastapi.testclient import TestClient
+    from app import main
+    _HEALTH_API_AVAILABLE = True
+except Exception:
+    _HEALTH_API_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(
+    not _HEALTH_API_AVAILABLE,
+    reason="App main (e.g. DB) not available; skip health API tests",
+)
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as c:
+        main._ready_until = 0.0
+        yield c
+    main._ready_until = 0.0
+
+
+def test_ready_ping_is_reused_within_window(client):
+    with patch.object(main, "_ping_db") as ping:
+        assert client.get("/health/ready").json() == {"status": "ready"}
+        assert client.get("/health/ready").status_code == 200
+        assert ping.call_count == 1
+        main._ready_until = 0.0  # window elapsed
+        client.get("/health/ready")
+        assert ping.call_count == 2
+
+
+def test_ready_failure_is_not_cached(client):
+    with patch.object(main, "_ping_db", side_effect=ConnectionError("down")) as ping:
+        assert client.get("/health/ready").status_code == 503
+        assert client.get("/health/ready").status_code == 503
+        assert ping.call_count == 2
+
+
+def test_startup_skips_create_all_when_disabled():
+    with patch.object(main.settings, "DB_CREATE_TABLES", False), \
+            patch.object(main, "_create_tables") as create:
+        with TestClient(main.app):
+            pass
+    create.assert_not_called()
+
+
+def _run_metrics_loop(dialect: str) -> None:
+    async def run():
+        with anyio.move_on_after(0.05):
+            await main._agent_metrics_loop(0.01)
+
+    with patch.object(main, "engine", MagicMock(**{"dialect.name": dialect})):
+        anyio.run(run)
+
+
+def test_metrics_loop_skips_refresh_without_the_lock():
+    with patch.object(main, "_claim_agent_metrics_lock", return_value=None) as claim, \
+            patch.object(main, "_refresh_agent_metrics") as refresh:
+        _run_metrics_loop("postgresql")
+    assert claim.call_count >= 2  # retried every tick
+    refresh.assert_not_called()
+
+
+def test_metrics_loop_leader_keeps_the_lock_until_shutdown():
+    conn = MagicMock()
+    with patch.object(main, "_claim_agent_metrics_lock", return_value=conn) as claim, \
+            patch.object(main, "_refresh_agent_metrics") as refresh, \
+            patch.object(main, "_release_agent_metrics_lock") as release:
+        _run_metrics_loop("postgresql")
+    claim.assert_called_once()
+    assert refresh.call_count >= 2
+    refresh.assert_called_with(conn)
+    release.assert_called_once_with(conn)
+
+
+def test_metrics_loop_gives_up_the_lock_when_a_refresh_fails():
+    conn = MagicMock()
+    with patch.object(main, "_claim_agent_metrics_lock", return_value=conn) as claim, \
+            patch.object(main, "_refresh_agent_metrics", side_effect=ConnectionError("gone")), \
+            patch.object(main, "_release_agent_metrics_lock") as release:
+        _run_metrics_loop("postgresql")
+    assert claim.call_count >= 2
+    assert release.call_count == claim.call_count
+
+
+def test_metrics_loop_refreshes_directly_on_sqlite():
+    with patch.object(main, "_claim_agent_metrics_lock") as claim, \
+            patch.object(main, "_refresh_agent_metrics") as refresh:
+        _run_metrics_loop("sqlite")
+    claim.assert_not_called()
+    refresh.assert_called_with(None)
@@ -0,0 +1,40 @@
+"""
+Tests for json_codec: compact output, sort_keys, and identical behaviour with and without orjson.
+"""
+import json
+
+import pytest
+
+from app.core import json_codec
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def codec(request, monkeypatch):
+    if request.param == "orjson" and not json_codec.ORJSON_AVAILABLE:
+        pytest.skip("orjson not installed")
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_codec, "ORJSON_AVAILABLE", False)
+    return json_codec
+
+
+def test_dumps_is_compact(codec):
+    assert codec.dumps({"a": [1, 2], "b": "x"}) == '{"a":[1,2],"b":"x"}'
+
+
+def test_dumps_sort_keys(codec):
+    assert codec.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a":2,"b":1}'
+
+
+def test_dumps_keeps_unicode(codec):
+    assert codec.dumps({"name": "café"}) == '{"name":"café"}'
+    assert codec.dumps_bytes({"name": "café"}) == '{"name":"café"}'.encode("utf-8")
+
+
+def test_loads_roundtrip(codec):
+    data = {"tool": "read_file", "args": {"path": "a.py"}, "n": [1, 2.5, None, True]}
+    assert codec.loads(codec.dumps(data)) == data
+
+
+def test_loads_error_is_json_decode_error(codec):
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads('{"unterminated": ')
@@ -0,0 +1,127 @@
+"""
+Tests for llm_queue: concurrent requests run one at a time, each caller gets its own result as soon as
+its request finishes, and streams go through the same queue.
+"""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.llm_queue import LLMRequestQueue, get_llm_queue
+
+
+class _RecordingLLM:
+    backend = "llama-cpp"
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _enter(self, prompt):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.calls.append(prompt)
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    def generate(self, prompt, max_tokens=None):
+        self._enter(prompt)
+        try:
+            return f"echo:{prompt}:{max_tokens}"
+        finally:
+            self._exit()
+
+    def generate_stream(self, prompt, max_tokens=None):
+        self._enter(prompt)
+        try:
+            for word in prompt.split():
+                yield word
+        finally:
+            self._exit()
+
+
+def test_single_request_round_trip():
+    llm_queue = LLMRequestQueue(_RecordingLLM())
+    assert llm_queue.generate("hi", max_tokens=5) == "echo:hi:5"
+
+
+def test_concurrent_requests_run_one_at_a_time():
+    llm = _RecordingLLM()
+    llm_queue = LLMRequestQueue(llm)
+    results = {}
+
+    def call(i):
+        if i % 2:
+            results[i] = "".join(llm_queue.generate_stream(f"s{i} x"))
+        else:
+            results[i] = llm_queue.generate(f"p{i}", max_tokens=10)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    assert results == {i: (f"s{i}x" if i % 2 else f"echo:p{i}:10") for i in range(6)}
+    assert llm.max_active == 1
+    assert len(llm.calls) == 6
+
+
+def test_caller_is_released_when_its_own_request_finishes():
+    gate, hold = threading.Event(), threading.Event()
+
+    def generate(prompt, max_tokens=None):
+        {"gate": gate, "second": hold}.get(prompt, threading.Event()).wait(0 if prompt == "first" else 5)
+        return prompt
+
+    llm = MagicMock()
+    llm.generate.side_effect = generate
+    llm_queue = LLMRequestQueue(llm)
+    results = {}
+
+    def call(prompt):
+        results[prompt] = llm_queue.generate(prompt)
+
+    threads = {p: threading.Thread(target=call, args=(p,)) for p in ("gate", "first", "second")}
+    threads["gate"].start()
+    while not llm.generate.called:
+        time.sleep(0.001)
+    for p in ("first", "second"):  # queued behind "gate" in this order
+        threads[p].start()
+        while llm_queue._queue.qsize() < (1 if p == "first" else 2):
+            time.sleep(0.001)
+    gate.set()
+    threads["first"].join(timeout=5)
+    assert results.get("first") == "first"
+    assert threads["second"].is_alive()  # still generating: "first" did not wait for it
+    hold.set()
+    threads["second"].join(timeout=5)
+    assert results["second"] == "second"
+
+
+def test_failure_propagates_to_the_caller():
+    llm = MagicMock()
+    llm.generate.side_effect = RuntimeError("model crashed")
+    llm.generate_stream.side_effect = RuntimeError("stream crashed")
+    llm_queue = LLMRequestQueue(llm)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        llm_queue.generate("x")
+    with pytest.raises(RuntimeError, match="stream crashed"):
+        list(llm_queue.generate_stream("x"))
+    llm.generate.side_effect = None
+    llm.generate.return_value = "ok"
+    assert llm_queue.generate("x") == "ok"  # the worker survived
+
+
+def test_get_llm_queue_skips_server_backends():
+    ollama_llm = MagicMock()
+    ollama_llm.backend = "ollama"
+    assert get_llm_queue(ollama_llm) is None
+    with patch("app.services.llm_queue.settings") as s:
+        s.LOCAL_LLM_SERIALIZE = False
+        assert get_llm_queue(_RecordingLLM()) is None
@@ -0,0 +1,78 @@
+"""
+Tests for LocalLLMService availability probing (no real backend required).
+"""
+from unittest.mock import MagicMock, patch
+
+from app.core.local_llm import LocalLLMService
+
+
+def _service_with_client(client, probe_server=True):
+    with patch.object(LocalLLMService, "_initialize_backend"):
+        svc = LocalLLMService()
+    svc.client = client
+    svc._probe_server = probe_server
+    return svc
+
+
+def test_is_available_without_client():
+    assert _service_with_client(None).is_available() is False
+
+
+def test_in_process_backend_is_not_probed():
+    client = MagicMock()
+    assert _service_with_client(client, probe_server=False).is_available() is True
+    client.list.assert_not_called()
+
+
+def test_ollama_probe_result_is_cached():
+    client = MagicMock()
+    svc = _service_with_client(client)
+    assert svc.is_available() is True
+    assert svc.is_available() is True
+    assert client.list.call_count == 1
+
+
+def test_ollama_unreachable_is_unavailable_until_ttl_expires():
+    client = MagicMock()
+    client.list.side_effect = ConnectionError("refused")
+    svc = _service_with_client(client)
+    assert svc.is_available() is False
+    client.list.side_effect = None
+    assert svc.is_available() is False  # cached
+    svc._available_until = 0.0  # TTL elapsed
+    assert svc.is_available() is True
+
+
+def test_gpt4all_weights_are_loaded_once_per_process():
+    import sys
+    from app.core import local_llm
+
+    fake = MagicMock()
+    local_llm._load_gpt4all.cache_clear()
+    try:
+        with patch.dict(sys.modules, {"gpt4all": fake}), \
+                patch.object(local_llm.settings, "LOCAL_LLM_BACKEND", "gpt4all"):
+            first = LocalLLMService()
+            second = LocalLLMService()
+        assert first.client is second.client
+        assert fake.GPT4All.call_count == 1
+    finally:
+        local_llm._load_gpt4all.cache_clear()
+
+
+def test_ollama_services_share_one_pooled_client():
+    import sys
+    from app.core import local_llm
+
+    fake = MagicMock()
+    local_llm._ollama_client.cache_clear()
+    try:
+        with patch.dict(sys.modules, {"ollama": fake}), \
+                patch.object(local_llm.settings, "LOCAL_LLM_BACKEND", "ollama"):
+            first = LocalLLMService()
+            second = LocalLLMService()
+        assert first.client is second.client is fake.Client.return_value
+        assert fake.Client.call_count == 1
+        assert fake.Client.call_args.kwargs["host"] == local_llm.settings.OLLAMA_HOST
+    finally:
+        local_llm._ollama_client.cache_clear()
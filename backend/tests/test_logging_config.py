@@ -0,0 +1,49 @@
+"""
+Tests for log record filters and the JSON formatter (no app or DB required).
+"""
+import json
+import logging
+from unittest.mock import patch
+
+from app.core.logging_config import JsonFormatter, SecretsRedactionFilter
+
+
+def _record(msg):
+    return logging.LogRecord("t", logging.INFO, __file__, 1, msg, None, None)
+
+
+def test_secrets_redaction_is_case_insensitive():
+    f = SecretsRedactionFilter()
+    for msg in ("OPENAI_API_KEY=sk-123", "Authorization: Bearer abc", "user Password changed"):
+        record = _record(msg)
+        assert f.filter(record) is True
+        assert record.msg == "[REDACTED]"
+
+
+def test_secrets_redaction_leaves_other_messages():
+    f = SecretsRedactionFilter()
+    record = _record("Generated app with 3 files")
+    assert f.filter(record) is True
+    assert record.msg == "Generated app with 3 files"
+    non_str = _record({"k": 1})
+    assert f.filter(non_str) and non_str.msg == {"k": 1}
+
+
+def test_json_formatter_reuses_timestamp_within_a_second():
+    fmt = JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S")
+    first, second, later = _record("a"), _record("b"), _record("c")
+    first.created, second.created, later.created = 1000.1, 1000.9, 1001.0
+    with patch.object(fmt, "formatTime", wraps=fmt.formatTime) as format_time:
+        lines = [json.loads(fmt.format(r)) for r in (first, second, later)]
+    assert format_time.call_count == 2
+    assert lines[0]["timestamp"] == lines[1]["timestamp"] != lines[2]["timestamp"]
+    assert [line["message"] for line in lines] == ["a", "b", "c"]
+
+
+def test_json_formatter_without_datefmt_keeps_milliseconds():
+    fmt = JsonFormatter()
+    first, second = _record("a"), _record("b")
+    first.created, first.msecs = 1000.1, 100.0
+    second.created, second.msecs = 1000.9, 900.0
+    stamps = [json.loads(fmt.format(r))["timestamp"] for r in (first, second)]
+    assert stamps[0].endswith(",100") and stamps[1].endswith(",900")
@@ -0,0 +1,159 @@
+"""
+Tests for middleware helpers and rate limiting on a bare Starlette app (no app, DB or Redis server required).
+"""
+from unittest.mock import patch
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.middleware import (
+    RATE_LIMIT_PATHS,
+    RateLimitMiddleware,
+    RequestBodySizeLimitMiddleware,
+    RequestIDMiddleware,
+    _get_rate_limit_for_path,
+    _rate_store,
+    _take_rate_slot,
+    request_id_ctx,
+)
+
+
+def test_rate_limit_lookup_matches_configured_paths_with_or_without_trailing_slash():
+    for prefix, limit in RATE_LIMIT_PATHS:
+        assert _get_rate_limit_for_path(prefix) == limit
+        assert _get_rate_limit_for_path(prefix + "/") == limit
+
+
+def test_rate_limit_lookup_ignores_other_paths():
+    assert _get_rate_limit_for_path("/api/v1/agent/config") is None
+    assert _get_rate_limit_for_path("/api/v1/agent/chat/other") is None
+    assert _get_rate_limit_for_path("/") is None
+
+
+def test_take_rate_slot_limits_within_window_and_frees_expired_slots():
+    _rate_store.clear()
+    assert [_take_rate_slot("ip", t, 2, 60) for t in (0.0, 1.0, 2.0)] == [True, True, False]
+    # The first hit leaves the window at t=60
+    assert _take_rate_slot("ip", 60.0, 2, 60) is True
+    assert list(_rate_store["ip"]) == [1.0, 60.0]
+    _rate_store.clear()
+
+
+def test_rate_store_evicts_least_recently_seen_keys():
+    _rate_store.clear()
+    with patch("app.core.middleware._RATE_STORE_MAX_KEYS", 2):
+        _take_rate_slot("a", 0.0, 5, 60)
+        _take_rate_slot("b", 0.0, 5, 60)
+        _take_rate_slot("a", 1.0, 5, 60)
+        _take_rate_slot("c", 1.0, 5, 60)
+    assert list(_rate_store) == ["a", "c"]
+    _rate_store.clear()
+
+
+class _FakeRedisPipeline:
+    def __init__(self, store, fail):
+        self.store, self.fail, self.ops = store, fail, []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key):
+        self.ops.append(key)
+        return self
+
+    def expire(self, key, seconds):
+        return self
+
+    async def execute(self):
+        if self.fail:
+            raise ConnectionError("redis down")
+        key = self.ops[0]
+        self.store[key] = self.store.get(key, 0) + 1
+        return [self.store[key], True]
+
+
+class _FakeRedis:
+    def __init__(self, fail=False):
+        self.store, self.fail = {}, fail
+
+    def pipeline(self, transaction=True):
+        return _FakeRedisPipeline(self.store, self.fail)
+
+
+def _limited_app(redis_client):
+    app = Starlette(routes=[Route("/api/v1/build/generate", lambda request: PlainTextResponse("ok"), methods=["POST"])])
+    app.add_middleware(RateLimitMiddleware, redis_client=redis_client)
+    return TestClient(app)
+
+
+def test_rate_limit_counts_in_redis_per_path_and_client():
+    _rate_store.clear()
+    fake = _FakeRedis()
+    client = _limited_app(fake)
+    limit = _get_rate_limit_for_path("/api/v1/build/generate")
+    codes = [client.post("/api/v1/build/generate").status_code for _ in range(limit + 1)]
+    assert codes == [200] * limit + [429]
+    (key,) = fake.store
+    assert key.startswith("rl:/api/v1/build/generate:")
+    assert not _rate_store
+
+
+def test_rate_limit_falls_back_to_memory_when_redis_fails():
+    _rate_store.clear()
+    client = _limited_app(_FakeRedis(fail=True))
+    assert client.post("/api/v1/build/generate").status_code == 200
+    assert {key.rsplit(":", 1)[0]: len(hits) for key, hits in _rate_store.items()} == {"/api/v1/build/generate": 1}
+    _rate_store.clear()
+
+
+def test_memory_rate_limit_counts_each_path_separately():
+    _rate_store.clear()
+    app = Starlette(routes=[
+        Route(path, lambda request: PlainTextResponse("ok"), methods=["POST"])
+        for path in ("/api/v1/build/generate", "/api/v1/agent/chat")
+    ])
+    app.add_middleware(RateLimitMiddleware, redis_client=None)
+    client = TestClient(app)
+    limit = _get_rate_limit_for_path("/api/v1/build/generate")
+    assert [client.post("/api/v1/build/generate/").status_code for _ in range(limit + 1)][-1] == 429
+    assert client.post("/api/v1/agent/chat").status_code == 200  # the exhausted generate count is not shared
+    _rate_store.clear()
+
+
+def _echo_app():
+    async def echo(request):
+        return JSONResponse({"state_id": request.state.request_id, "ctx_id": request_id_ctx.get()})
+
+    app = Starlette(routes=[Route("/echo", echo, methods=["GET", "POST"])])
+    app.add_middleware(RequestBodySizeLimitMiddleware, max_bytes=10)
+    app.add_middleware(RequestIDMiddleware)
+    return TestClient(app)
+
+
+def test_request_id_is_propagated_to_handler_and_response():
+    client = _echo_app()
+    r = client.get("/echo", headers={"X-Request-ID": "abc-123"})
+    assert r.json() == {"state_id": "abc-123", "ctx_id": "abc-123"}
+    assert r.headers["x-request-id"] == "abc-123"
+    generated = client.get("/echo")
+    assert generated.headers["x-request-id"] == generated.json()["state_id"]
+
+
+def test_request_body_size_limit():
+    client = _echo_app()
+    assert client.post("/echo", content=b"small").status_code == 200
+    r = client.post("/echo", content=b"x" * 11)
+    assert r.status_code == 413
+    assert r.json()["type"] == "payload_too_large"
+    assert "x-request-id" in r.headers
+
+
+def test_generated_request_id_is_32_hex_chars():
+    request_id = _echo_app().get("/echo").headers["x-request-id"]
+    assert len(request_id) == 32
+    int(request_id, 16)
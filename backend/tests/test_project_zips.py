@@ -0,0 +1,77 @@
+"""
+Tests for project download zips: member-by-member streaming and the on-disk cache (no app or DB required).
+"""
+import base64
+import io
+import os
+import zipfile
+
+from app.services import project_zips
+from app.services.project_zips import cached_zip_path, discard_project_zips, iter_zip
+
+
+def test_iter_zip_streams_a_valid_archive_per_member():
+    files = {"index.html": "<html>" + "x" * 5000 + "</html>", "app.js": "console.log('hi');", "styles.css": ""}
+    chunks = list(iter_zip(files))
+    assert len(chunks) == len(files) + 1  # one chunk per member (empty file included), then the directory
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert {name: zf.read(name).decode() for name in zf.namelist()} == files
+
+
+def test_iter_zip_empty_project_is_an_empty_archive():
+    with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip({})))) as zf:
+        assert zf.namelist() == []
+
+
+def test_cached_zip_is_built_once_per_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(project_zips.settings, "BUILD_ZIP_CACHE_DIR", str(tmp_path), raising=False)
+    files = {"index.html": "<html>hi</html>"}
+    first = cached_zip_path(1, files)
+    monkeypatch.setattr(project_zips, "iter_zip", lambda *a, **k: (_ for _ in ()).throw(AssertionError("rebuilt")))
+    assert cached_zip_path(1, dict(files)) == first
+    with zipfile.ZipFile(first) as zf:
+        assert zf.read("index.html").decode() == files["index.html"]
+    monkeypatch.undo()
+    monkeypatch.setattr(project_zips.settings, "BUILD_ZIP_CACHE_DIR", str(tmp_path), raising=False)
+    assert cached_zip_path(1, {"index.html": "<html>changed</html>"}) != first
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".zip", ".zip"]  # no .part leftovers
+
+
+def test_cached_zip_unwritable_dir_returns_none(tmp_path, monkeypatch):
+    blocker = tmp_path / "file"
+    blocker.write_text("not a dir")
+    monkeypatch.setattr(project_zips.settings, "BUILD_ZIP_CACHE_DIR", str(blocker / "zips"), raising=False)
+    assert cached_zip_path(1, {"index.html": "x"}) is None
+
+
+def test_default_zip_cache_dir_is_private(tmp_path, monkeypatch):
+    monkeypatch.setattr(project_zips.settings, "BUILD_ZIP_CACHE_DIR", "", raising=False)
+    monkeypatch.setattr(project_zips.tempfile, "gettempdir", lambda: str(tmp_path))
+    path = cached_zip_path(1, {"index.html": "x"})
+    assert path and os.stat(tmp_path / "agentic_ai_project_zips").st_mode & 0o777 == 0o700
+    # A pre-created directory others can read is refused, not reused
+    os.chmod(tmp_path / "agentic_ai_project_zips", 0o755)
+    assert cached_zip_path(1, {"index.html": "x"}) is None
+
+
+def test_zip_cache_evicts_least_recently_used_past_max_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(project_zips.settings, "BUILD_ZIP_CACHE_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(project_zips.settings, "BUILD_ZIP_CACHE_MAX_MB", 1, raising=False)
+    pages = {n: {"index.html": base64.b64encode(os.urandom(400 * 1024)).decode()} for n in (1, 2, 3)}  # ~400 KB zipped
+    first, second = cached_zip_path(1, pages[1]), cached_zip_path(2, pages[2])
+    os.utime(first, (0, 0))
+    os.utime(second, (1, 1))
+    assert cached_zip_path(1, pages[1]) == first  # the hit refreshes first, so second is least recently used
+    third = cached_zip_path(3, pages[3])
+    assert sorted(p.name.partition("-")[0] for p in tmp_path.iterdir()) == ["1", "3"]
+    assert os.path.exists(first) and os.path.exists(third)
+
+
+def test_discard_project_zips_removes_only_those_projects(tmp_path, monkeypatch):
+    monkeypatch.setattr(project_zips.settings, "BUILD_ZIP_CACHE_DIR", str(tmp_path), raising=False)
+    for project_id in (1, 2, 12):
+        cached_zip_path(project_id, {"index.html": str(project_id)})
+    discard_project_zips([1, 2])
+    assert [p.name.partition("-")[0] for p in tmp_path.iterdir()] == ["12"]
+    discard_project_zips([])
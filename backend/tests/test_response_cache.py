@@ -0,0 +1,62 @@
+"""
+Tests for response_cache: TTL, LRU bound, disabled mode, and the Redis client path (fake client).
+"""
+from unittest.mock import MagicMock
+
+from app.services.response_cache import ResponseCache, response_cache_key
+
+
+def test_key_is_stable_and_order_independent():
+    a = response_cache_key("chat", {"messages": [{"role": "user", "content": "hi"}], "context": {}})
+    b = response_cache_key("chat", {"context": {}, "messages": [{"content": "hi", "role": "user"}]})
+    assert a == b
+    assert a != response_cache_key("chat", {"messages": [], "context": {}})
+
+
+def test_memory_get_set_and_expiry(monkeypatch):
+    import app.services.response_cache as rc
+
+    now = [100.0]
+    monkeypatch.setattr(rc.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.set("k", b"v")
+    assert cache.get("k") == b"v"
+    now[0] += 11
+    assert cache.get("k") is None
+
+
+def test_memory_lru_bound():
+    cache = ResponseCache(ttl=60, max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")  # a is now most recent
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+
+
+def test_delete_drops_one_key():
+    cache = ResponseCache(ttl=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None
+    assert cache.get("b") == b"2"
+
+
+def test_disabled_when_ttl_zero():
+    cache = ResponseCache(ttl=0)
+    cache.set("k", b"v")
+    assert cache.get("k") is None
+
+
+def test_redis_backend_uses_setex_and_survives_errors():
+    client = MagicMock()
+    client.get.return_value = b"v"
+    cache = ResponseCache(ttl=30, redis_client=client)
+    cache.set("k", b"v")
+    client.setex.assert_called_once_with("k", 30, b"v")
+    assert cache.get("k") == b"v"
+    client.get.side_effect = ConnectionError("down")
+    assert cache.get("k") is None
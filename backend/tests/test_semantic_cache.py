@@ -0,0 +1,67 @@
+"""
+Tests for semantic_cache: similarity hits, misses, TTL and size bounds (fake embedding, no model download).
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services.semantic_cache import SemanticCache
+
+_VOCAB = ["reply", "john", "quarterly", "report", "weather", "tomorrow", "draft", "write"]
+
+
+def _bag_of_words(text: str):
+    words = text.lower().replace(",", " ").split()
+    return np.array([float(words.count(w)) for w in _VOCAB])
+
+
+def test_lookup_empty_cache_misses():
+    cache = SemanticCache(_bag_of_words)
+    assert cache.lookup("draft reply john") is None
+
+
+def test_similar_prompt_hits():
+    cache = SemanticCache(_bag_of_words, threshold=0.9)
+    cache.insert("draft reply to john about quarterly report", "Hi John, ...")
+    assert cache.lookup("Draft a reply to John about the quarterly report") == "Hi John, ..."
+
+
+def test_dissimilar_prompt_misses():
+    cache = SemanticCache(_bag_of_words, threshold=0.9)
+    cache.insert("draft reply to john about quarterly report", "Hi John, ...")
+    assert cache.lookup("weather tomorrow") is None
+
+
+def test_expired_entries_are_evicted():
+    cache = SemanticCache(_bag_of_words, ttl=-1)
+    cache.insert("quarterly report", "old")
+    assert cache.lookup("quarterly report") is None
+    assert len(cache) == 0
+
+
+def test_only_expired_rows_are_evicted():
+    cache = SemanticCache(_bag_of_words, threshold=0.9)
+    cache.insert("quarterly report", "stale")
+    cache.insert("weather tomorrow", "fresh")
+    cache._expiry[0] = 0.0  # first row past its deadline
+    assert cache.lookup("weather tomorrow") == "fresh"
+    assert len(cache) == 1
+    assert cache.lookup("quarterly report") is None
+
+
+def test_max_entries_drops_oldest():
+    cache = SemanticCache(_bag_of_words, max_entries=1)
+    cache.insert("quarterly report", "first")
+    cache.insert("weather tomorrow", "second")
+    assert len(cache) == 1
+    assert cache.lookup("quarterly report") is None
+    assert cache.lookup("weather tomorrow") == "second"
+
+
+def test_embedding_failure_is_a_miss():
+    def broken(_text):
+        raise RuntimeError("model unavailable")
+
+    cache = SemanticCache(broken)
+    cache.insert("x", "y")
+    assert cache.lookup("x") is None
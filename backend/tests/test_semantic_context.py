@@ -54,3 +54,31 @@ def test_format_semantic_block_returns_string(small_workspace):
     assert isinstance(block, str)
     if block:
         assert "Relevant snippets" in block or "semantic" in block.lower()
+
+
+def test_top_snippets_orders_by_score():
+    np = pytest.importorskip("numpy")
+    from app.services.semantic_context import _top_snippets
+
+    snippets = [("a.py", "a"), ("b.py", "b"), ("c.py", "c"), ("d.py", "d")]
+    out = _top_snippets(snippets, np.array([0.1, 0.9, 0.5, 0.7]), 2)
+    assert [p for p, _, _ in out] == ["b.py", "d.py"]
+    assert out[0][2] == pytest.approx(0.9)
+    assert _top_snippets(snippets, np.zeros(4), 0) == []
+    assert len(_top_snippets(snippets, np.zeros(4), 10)) == 4
+
+
+def test_get_semantic_snippets_embeds_query_and_files_in_one_call(small_workspace):
+    np = pytest.importorskip("numpy")
+    from unittest.mock import MagicMock, patch
+
+    def encode(texts, **kwargs):
+        # query first, then one row per file; only auth.py scores high
+        return np.array([[1.0, 0.0]] + [[1.0, 0.0] if "def login" in t else [0.0, 1.0] for t in texts[1:]])
+
+    model = MagicMock()
+    model.encode.side_effect = encode
+    with patch("app.services.semantic_context._get_model", return_value=model):
+        out = get_semantic_snippets(small_workspace, "login", max_snippets=1)
+    assert model.encode.call_count == 1
+    assert out[0][0] == "auth.py"
@@ -0,0 +1,59 @@
+"""
+Tests for task_transitions against an in-memory SQLite database (no server needed).
+"""
+from app.models import agent, integration, project, task, user  # noqa: F401 (register all mappers)
+from app.models.agent import Agent, AgentType
+from app.models.task import Task, TaskStatus
+from app.models.user import User
+from app.services.task_transitions import approve_tasks, cancel_tasks, reject_tasks
+
+
+def _add_tasks(db, owner_email, statuses):
+    owner = User(email=owner_email, username=owner_email.split("@")[0], hashed_password="x")
+    db.add(owner)
+    db.flush()
+    worker = Agent(user_id=owner.id, agent_type=AgentType.EMAIL, name="mail")
+    db.add(worker)
+    db.flush()
+    rows = [
+        Task(user_id=owner.id, agent_id=worker.id, title=f"t{i}", task_type="email", status=s)
+        for i, s in enumerate(statuses)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return owner.id, [r.id for r in rows]
+
+
+def _status(db, task_id):
+    return db.get(Task, task_id, populate_existing=True).status
+
+
+def test_approve_tasks_only_awaiting_and_owned(db):
+    uid, (waiting, waiting2, done) = _add_tasks(
+        db, "a@example.com", [TaskStatus.AWAITING_APPROVAL, TaskStatus.AWAITING_APPROVAL, TaskStatus.COMPLETED]
+    )
+    _, (other,) = _add_tasks(db, "b@example.com", [TaskStatus.AWAITING_APPROVAL])
+    assert approve_tasks(db, uid, [waiting2, waiting, waiting, done, other, 999]) == [waiting, waiting2]
+    db.commit()
+    assert _status(db, waiting) == TaskStatus.APPROVED
+    assert db.get(Task, waiting).approved_at is not None
+    assert _status(db, done) == TaskStatus.COMPLETED
+    assert _status(db, other) == TaskStatus.AWAITING_APPROVAL
+    # Already approved: a second call is a no-op
+    assert approve_tasks(db, uid, [waiting]) == []
+    assert approve_tasks(db, uid, []) == []
+
+
+def test_reject_and_cancel_tasks(db):
+    uid, (waiting, pending, running) = _add_tasks(
+        db, "a@example.com", [TaskStatus.AWAITING_APPROVAL, TaskStatus.PENDING, TaskStatus.IN_PROGRESS]
+    )
+    assert reject_tasks(db, uid, [waiting, pending]) == [waiting]
+    assert cancel_tasks(db, uid, [waiting, pending, running]) == [pending]
+    db.commit()
+    assert [_status(db, i) for i in (waiting, pending, running)] == [
+        TaskStatus.REJECTED,
+        TaskStatus.CANCELLED,
+        TaskStatus.IN_PROGRESS,
+    ]
+
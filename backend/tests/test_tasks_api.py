@@ -0,0 +1,91 @@
+"""
+Tests for /api/v1/tasks/batch/{approve,reject,cancel}.
+Uses the app's configured DB. Skips entire module if full app cannot be imported (e.g. no DB driver).
+"""
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+try:
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.db.database import SessionLocal
+    from app.models import agent, integration, project, task, user  # noqa: F401 (register all mappers)
+    from app.models.agent import Agent, AgentType
+    from app.models.task import Task, TaskStatus
+    _TASKS_API_AVAILABLE = True
+except Exception:
+    _TASKS_API_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(
+    not _TASKS_API_AVAILABLE,
+    reason="App main (e.g. DB) not available; skip tasks API tests",
+)
+
+
+def _register(c):
+    name = f"u{uuid.uuid4().hex[:12]}"
+    r = c.post(
+        "/api/v1/auth/register",
+        json={"email": f"{name}@example.com", "username": name, "password": "s3cret-pass"},
+    )
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    return headers, c.get("/api/v1/users/me", headers=headers).json()["id"]
+
+
+def _add_tasks(user_id, statuses):
+    with SessionLocal() as db:
+        worker = Agent(user_id=user_id, agent_type=AgentType.EMAIL, name="mail")
+        db.add(worker)
+        db.flush()
+        rows = [
+            Task(user_id=user_id, agent_id=worker.id, title=f"t{i}", task_type="email", status=s)
+            for i, s in enumerate(statuses)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return [r.id for r in rows]
+
+
+def _statuses(ids):
+    with SessionLocal() as db:
+        return [db.get(Task, i).status for i in ids]
+
+
+@pytest.fixture
+def client():
+    with patch("app.api.v1.auth.get_password_hash", return_value="hashed"):
+        with TestClient(app) as c:
+            yield c
+
+
+def test_batch_approve_reject_and_cancel(client):
+    headers, user_id = _register(client)
+    waiting, waiting2, pending, done = _add_tasks(
+        user_id,
+        [TaskStatus.AWAITING_APPROVAL, TaskStatus.AWAITING_APPROVAL, TaskStatus.PENDING, TaskStatus.COMPLETED],
+    )
+    r = client.post("/api/v1/tasks/batch/approve", json={"task_ids": [waiting, done]}, headers=headers)
+    assert r.status_code == 200
+    assert r.json() == {"task_ids": [waiting]}
+    r = client.post("/api/v1/tasks/batch/reject", json={"task_ids": [waiting, waiting2]}, headers=headers)
+    assert r.json() == {"task_ids": [waiting2]}
+    r = client.post("/api/v1/tasks/batch/cancel", json={"task_ids": [waiting, pending, done]}, headers=headers)
+    assert r.json() == {"task_ids": [waiting, pending]}
+    assert _statuses([waiting, waiting2, pending, done]) == [
+        TaskStatus.CANCELLED,
+        TaskStatus.REJECTED,
+        TaskStatus.CANCELLED,
+        TaskStatus.COMPLETED,
+    ]
+
+
+def test_batch_routes_only_touch_own_tasks(client):
+    _, owner_id = _register(client)
+    (theirs,) = _add_tasks(owner_id, [TaskStatus.AWAITING_APPROVAL])
+    other_headers, _ = _register(client)
+    r = client.post("/api/v1/tasks/batch/approve", json={"task_ids": [theirs]}, headers=other_headers)
+    assert r.json() == {"task_ids": []}
+    assert _statuses([theirs]) == [TaskStatus.AWAITING_APPROVAL]
+    assert client.post("/api/v1/tasks/batch/approve", json={"task_ids": [theirs]}).status_code == 401
@@ -0,0 +1,126 @@
+"""
+Tests for /api/v1/users/me caching: ETag/304 and invalidation on profile updates.
+Uses the app's configured DB. Skips entire module if full app cannot be imported (e.g. no DB driver).
+"""
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+try:
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.models import agent, integration, project, task, user  # noqa: F401 (register all mappers)
+    _USERS_API_AVAILABLE = True
+except Exception:
+    _USERS_API_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(
+    not _USERS_API_AVAILABLE,
+    reason="App main (e.g. DB) not available; skip users API tests",
+)
+
+
+@pytest.fixture
+def auth_client():
+    name = f"u{uuid.uuid4().hex[:12]}"
+    with patch("app.api.v1.auth.get_password_hash", return_value="hashed"):
+        with TestClient(app) as c:
+            r = c.post(
+                "/api/v1/auth/register",
+                json={"email": f"{name}@example.com", "username": name, "password": "s3cret-pass"},
+            )
+            c.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+            yield c
+
+
+def test_me_returns_etag_and_304_when_unchanged(auth_client):
+    first = auth_client.get("/api/v1/users/me")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("private")
+    again = auth_client.get("/api/v1/users/me", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def test_me_is_served_from_cache_without_user_query(auth_client):
+    auth_client.get("/api/v1/users/me")
+    with patch("app.api.v1.users.get_current_user", side_effect=AssertionError("queried")):
+        assert auth_client.get("/api/v1/users/me").status_code == 200
+
+
+def test_cached_me_still_refuses_deactivated_and_deleted_users(auth_client):
+    from app.db.database import SessionLocal
+    from app.models.user import User
+
+    user_id = auth_client.get("/api/v1/users/me").json()["id"]
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update({"is_active": False})
+        db.commit()
+    assert auth_client.get("/api/v1/users/me").status_code == 400
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+    assert auth_client.get("/api/v1/users/me").status_code == 401
+
+
+def test_profile_update_invalidates_cached_me(auth_client):
+    before = auth_client.get("/api/v1/users/me")
+    assert auth_client.put("/api/v1/users/me", json={"full_name": "New Name"}).status_code == 200
+    after = auth_client.get("/api/v1/users/me", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()["full_name"] == "New Name"
+
+
+def test_profile_update_returns_updated_row(auth_client):
+    name = f"n{uuid.uuid4().hex[:12]}"
+    r = auth_client.put("/api/v1/users/me", json={"username": name, "full_name": "Renamed"})
+    assert r.status_code == 200
+    assert r.json()["username"] == name and r.json()["full_name"] == "Renamed"
+    assert auth_client.put("/api/v1/users/me", json={}).json()["username"] == name  # no-op update
+
+
+def test_me_requires_valid_token():
+    with TestClient(app) as c:
+        assert c.get("/api/v1/users/me", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_profile_update_reports_which_field_is_taken(auth_client):
+    other = f"o{uuid.uuid4().hex[:12]}"
+    with patch("app.api.v1.auth.get_password_hash", return_value="hashed"):
+        auth_client.post(
+            "/api/v1/auth/register",
+            json={"email": f"{other}@example.com", "username": other, "password": "s3cret-pass"},
+        )
+    email_clash = auth_client.put("/api/v1/users/me", json={"email": f"{other}@example.com"})
+    username_clash = auth_client.put("/api/v1/users/me", json={"username": other})
+    assert (email_clash.status_code, email_clash.json()["detail"]) == (400, "Email already in use")
+    assert (username_clash.status_code, username_clash.json()["detail"]) == (400, "Username already in use")
+
+
+def test_delete_me_loads_owned_rows_without_n_plus_one(auth_client, count_queries):
+    from app.db.database import SessionLocal
+    from app.models.agent import Agent, AgentType
+    from app.models.project import Project
+    from app.models.task import Task
+
+    user_id = auth_client.get("/api/v1/users/me").json()["id"]
+    with SessionLocal() as db:
+        owned_project = Project(user_id=user_id, name="p", files={})
+        db.add(owned_project)
+        for i in range(3):
+            owner_agent = Agent(user_id=user_id, agent_type=AgentType.EMAIL, name=f"a{i}")
+            db.add(owner_agent)
+            db.flush()
+            db.add_all(
+                Task(user_id=user_id, agent_id=owner_agent.id, title="t", task_type="email") for _ in range(2)
+            )
+        db.commit()
+    with count_queries() as stmts, patch("app.api.v1.users.discard_project_zips") as discard:
+        assert auth_client.delete("/api/v1/users/me").status_code == 204
+    discard.assert_called_once_with([owned_project.id])  # its cached download zip goes too
+    task_selects = [s for s in stmts if s.lstrip().upper().startswith("SELECT") and "FROM tasks" in s]
+    assert len(task_selects) <= 2, task_selects  # User.tasks and Agent.tasks, not one per agent
+    with SessionLocal() as db:
+        assert db.query(Task).filter(Task.user_id == user_id).count() == 0
@@ -11,6 +11,8 @@ export default function IDEPage() {
   const [workspaceRoot, setWorkspaceRoot] = useState('');
   const [listPath, setListPath] = useState('.');
   const [entries, setEntries] = useState<string[]>([]);
+  // Entry names the server reported as directories (null: older server, guess from the name)
+  const [dirNames, setDirNames] = useState<Set<string> | null>(null);
   const [selectedPath, setSelectedPath] = useState<string | null>(null);
   const [fileContent, setFileContent] = useState('');
   const [loadingFile, setLoadingFile] = useState(false);
@@ -25,6 +27,7 @@ export default function IDEPage() {
     try {
       const { data } = await workspaceApi.list(workspaceRoot, path);
       setEntries(data.entries);
+      setDirNames(data.items ? new Set(data.items.filter((i) => i.is_dir).map((i) => i.name)) : null);
       setListPath(path);
     } catch {
       setEntries([]);
@@ -50,6 +53,7 @@ export default function IDEPage() {
     try {
       const { data } = await workspaceApi.list(workspaceRoot, path);
       setEntries(data.entries);
+      setDirNames(data.items ? new Set(data.items.filter((i) => i.is_dir).map((i) => i.name)) : null);
       setListPath(path);
     } catch {
       try {
@@ -107,7 +111,7 @@ export default function IDEPage() {
     }
   };
 
-  const isLikelyDir = (name: string) => !name.includes('.');
+  const isLikelyDir = (name: string) => (dirNames ? dirNames.has(name) : !name.includes('.'));
 
   return (
     <div className="flex h-[calc(100vh-0px)] bg-[#0a0a0f] text-[#e8e8ed]">
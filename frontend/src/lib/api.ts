@@ -171,11 +171,16 @@ export const subscriptionsApi = {
 };
 
 // Workspace API (IDE file tree and editor)
+export type WorkspaceEntry = { name: string; is_dir: boolean; size: number };
+
 export const workspaceApi = {
   list: (root: string, path: string = '.') =>
-    api.get<{ path: string; entries: string[] }>('/workspace/list', { params: { root, path } }),
+    api.get<{ path: string; entries: string[]; items?: WorkspaceEntry[] }>('/workspace/list', { params: { root, path } }),
+  /** Raw file text (no JSON wrapping), returned in the same { path, content } shape. */
   read: (root: string, path: string) =>
-    api.get<{ path: string; content: string }>('/workspace/read', { params: { root, path } }),
+    api
+      .get<string>('/workspace/read', { params: { root, path, raw: 1 }, responseType: 'text' })
+      .then((res) => ({ ...res, data: { path, content: res.data } })),
 };
 
 // Build API (conversational app creation)